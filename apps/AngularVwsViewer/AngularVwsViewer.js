@@ -36,6 +36,7 @@ var SESSION_COMMAND_IMAGEFEED = 'imagefeed';
 var SESSION_COMMAND_STATUS = 'status';
 
 var DEFAULT_URI = ''
+var DEFAULT_RETRY_AFTER = 10;
 
 var REST_VERB_POST = 'POST';
 var REST_VERB_DELETE = 'DELETE';
@@ -106,6 +107,16 @@ app.controller('vwsController', function($scope, $attrs){
         oReq.send(bodyStr);
         oReq.onload = function() {
             if (oReq.readyState == XMLHttpRequest.DONE) {
+                if( (command===SESSION_COMMAND_OPEN || command===SESSION_COMMAND_SCHEDULE) &&
+                    oReq.status===503 ) {
+                    // The job submission queue is full, the rendering resource is started again
+                    // once the delay suggested by the service has elapsed. Any other status
+                    // (200 or 202 Accepted) means that the rendering resource is starting
+                    var retryAfter = parseInt(oReq.getResponseHeader('Retry-After')) ||
+                        DEFAULT_RETRY_AFTER;
+                    setTimeout(startRemoteRenderingResource, retryAfter * 1000);
+                    return;
+                }
                 if( command==='status' ) {
                     // The status of the remote rendering resource has been fetched.
                     // {{status}} can be populated accordingly
@@ -240,7 +240,7 @@ function startRenderer(event) {
         };
 
         doRequest('PUT', serviceUrl + '/session/schedule', function (eventSchedule) {
-            if (eventSchedule.target.status === 200) {
+            if (eventSchedule.target.status === 200 || eventSchedule.target.status === 202) {
                 setTimeout(init, secondsBeforeStartSession * 1000);
             } else {
                 var sessionStatusControl = parent.document.getElementById('sessionstatus');
@@ -26,6 +26,7 @@ var STATUS_NONE = 0;
 var STATUS_SESSION_CREATED = 1;
 var STATUS_SESSION_RUNNING = 2;
 var currentStatus = STATUS_NONE;
+var DEFAULT_RETRY_AFTER = 10;
 
 var openSessionParams = {
     owner: 'bbpdemolauncher',
@@ -46,6 +47,15 @@ function doRequest(method, url, body) {
                 startRenderer();
                 break;
                 case STATUS_SESSION_CREATED:
+                if (oReq.status == 503) {
+                    // The job submission queue is full, schedule again once the delay
+                    // suggested by the service has elapsed. 200 and 202 Accepted mean that
+                    // the rendering resource is starting
+                    var retryAfter = parseInt(oReq.getResponseHeader('Retry-After')) ||
+                        DEFAULT_RETRY_AFTER;
+                    retryLater(startRenderer, retryAfter);
+                    break;
+                }
                 currentStatus = STATUS_NONE;
             }
         }
@@ -60,6 +70,16 @@ function doRequest(method, url, body) {
     oReq.send(bodyStr);
 }
 
+function retryLater(callback, seconds) {
+    var timer = Qt.createQmlObject('import QtQuick 2.0; Timer { repeat: false }', Qt.application, 'RetryTimer');
+    timer.interval = seconds * 1000;
+    timer.triggered.connect(function() {
+        timer.destroy();
+        callback();
+    });
+    timer.start();
+}
+
 function createSession(demo) {
     openSessionParams.configuration_id=demo
     doRequest('POST', serviceUrl + '/session/',  openSessionParams  );
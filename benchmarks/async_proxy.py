@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=W0403
+# pylint: disable=R0915
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#                          Daniel Nachbaur <daniel.nachbaur@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+
+"""
+Compares the threaded engine of the service with the asynchronous engine (async_wsgi.py) on
+commands forwarded to slow rendering resources.
+
+A dummy rendering resource answers every request after a fixed delay, as a busy renderer
+does. Each engine runs in its own process on a temporary SQLite database holding running
+sessions, and receives the same load: concurrent viewers sending image commands. The threaded
+engine serves requests with a fixed number of worker threads, as gunicorn threaded workers
+do. The same environment variables as manage.py are needed (SLURM_USERNAME, SLURM_HOSTS, ...),
+and gevent must be installed (requirements_async.txt).
+
+Usage: python benchmarks/async_proxy.py [viewers] [requests] [renderer delay in seconds]
+                                        [threads of the threaded engine]
+"""
+
+import sys
+
+MODES = ('renderer', 'setup', 'threaded', 'async')
+MODE = 'benchmark'
+if len(sys.argv) > 1 and sys.argv[1] in MODES:
+    MODE = sys.argv[1]
+if MODE != 'threaded':
+    from gevent import monkey
+    monkey.patch_all()
+
+# pylint: disable=C0413
+import datetime
+import httplib
+import itertools
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE',
+                      'rendering_resource_manager_service.service.settings')
+
+COMMAND_URL = '/rendering-resource-manager/v1/session/image?session_id='
+NB_SESSIONS = 100
+SESSION_PREFIX = 'bench'
+
+
+def session_id(index):
+    """
+    :param index: Index of a benchmark session
+    :return: The id of the session
+    """
+    return '%s%015d' % (SESSION_PREFIX, index)
+
+
+def serve_renderer(port, delay):
+    """
+    Dummy rendering resource answering every request after the given delay
+    """
+    import gevent
+    from gevent.pywsgi import WSGIServer
+
+    def renderer(_, start_response):
+        """ Busy renderer """
+        gevent.sleep(delay)
+        start_response('200 OK', [('Content-Type', 'application/json')])
+        return ['{}']
+    WSGIServer(('127.0.0.1', port), renderer, log=None).serve_forever()
+
+
+def setup_sessions(renderer_port):
+    """
+    Creates the database and the running sessions of the benchmark
+    """
+    from django.core.management import call_command
+    from rendering_resource_manager_service.session.models import Session, \
+        SESSION_STATUS_RUNNING
+    call_command('syncdb', interactive=False, verbosity=0)
+    now = datetime.datetime.now()
+    Session.objects.bulk_create([
+        Session(id=session_id(i), owner='bench', created=now,
+                valid_until=now + datetime.timedelta(days=1), status=SESSION_STATUS_RUNNING,
+                http_host='127.0.0.1', http_port=renderer_port) for i in range(NB_SESSIONS)])
+
+
+def serve_threaded(port, nb_threads):
+    """
+    Serves the service with a fixed number of worker threads
+    """
+    import Queue
+    import threading
+    from wsgiref.simple_server import WSGIServer, WSGIRequestHandler
+    from rendering_resource_manager_service.service.wsgi import application
+
+    class QuietHandler(WSGIRequestHandler):
+        """ Request handler without access log """
+        def log_message(self, *args):
+            pass
+
+    class ThreadPoolServer(WSGIServer):
+        """ WSGI server dispatching connections to worker threads """
+        request_queue_size = 1024
+
+        def __init__(self, address):
+            WSGIServer.__init__(self, address, QuietHandler)
+            self.connections = Queue.Queue()
+            for _ in range(nb_threads):
+                worker = threading.Thread(target=self.work)
+                worker.setDaemon(True)
+                worker.start()
+
+        def process_request(self, request, client_address):
+            self.connections.put((request, client_address))
+
+        def work(self):
+            """ Serves connections one after the other """
+            while True:
+                request, client_address = self.connections.get()
+                try:
+                    self.finish_request(request, client_address)
+                # pylint: disable=W0703
+                except Exception:
+                    self.handle_error(request, client_address)
+                self.shutdown_request(request)
+
+    server = ThreadPoolServer(('127.0.0.1', port))
+    server.set_app(application)
+    server.serve_forever()
+
+
+def unused_port():
+    """
+    :return: A free TCP port
+    """
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def start(arguments, environment):
+    """
+    Starts a child process running this script in the given mode
+    """
+    with open(os.devnull, 'w') as devnull:
+        return subprocess.Popen([sys.executable, os.path.abspath(__file__)] + arguments,
+                                env=environment, stdout=devnull, stderr=devnull)
+
+
+def wait_for_port(port, timeout=30):
+    """
+    Waits until a server accepts connections on the given port
+    """
+    deadline = time.time() + timeout
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), 1).close()
+            return
+        except socket.error:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def load(port, nb_viewers, nb_requests):
+    """
+    Sends image commands from concurrent viewers
+    :return: A tuple containing the duration, the latencies of successful requests and the
+             number of failures
+    """
+    import gevent
+    latencies = []
+    failures = [0]
+    counter = itertools.count()
+
+    def viewer():
+        """ Sends commands until the requested number is reached """
+        index = next(counter)
+        while index < nb_requests:
+            start_time = time.time()
+            try:
+                connection = httplib.HTTPConnection('127.0.0.1', port, timeout=120)
+                connection.request('GET', COMMAND_URL + session_id(index % NB_SESSIONS))
+                response = connection.getresponse()
+                response.read()
+                connection.close()
+                if response.status == 200:
+                    latencies.append(time.time() - start_time)
+                else:
+                    failures[0] += 1
+            except (socket.error, httplib.HTTPException):
+                failures[0] += 1
+            index = next(counter)
+
+    start_time = time.time()
+    gevent.joinall([gevent.spawn(viewer) for _ in range(nb_viewers)])
+    return time.time() - start_time, latencies, failures[0]
+
+
+def percentile(values, ratio):
+    """
+    :return: The given percentile of the values, in milliseconds
+    """
+    if not values:
+        return 0.0
+    return sorted(values)[min(len(values) - 1, int(len(values) * ratio))] * 1000
+
+
+def main():
+    """
+    Runs the benchmark
+    """
+    arguments = [float(argument) for argument in sys.argv[1:5]]
+    nb_viewers, nb_requests, delay, nb_threads = (arguments + [200, 1000, 1.0, 32][
+        len(arguments):])[:4]
+    temporary_directory = tempfile.mkdtemp()
+    environment = dict(os.environ)
+    environment['RRM_DATABASE_PROFILE'] = 'sqlite-wal'
+    environment['RRM_DATABASE_NAME'] = os.path.join(temporary_directory, 'db.sqlite3')
+    renderer_port = unused_port()
+    renderer = start(['renderer', str(renderer_port), str(delay)], environment)
+    try:
+        wait_for_port(renderer_port)
+        if start(['setup', str(renderer_port)], environment).wait() != 0:
+            raise RuntimeError('Failed to create the benchmark sessions')
+        print '%d viewers, %d requests, renderer delay %.0f ms' % (
+            nb_viewers, nb_requests, delay * 1000)
+        for engine, argument in [('threaded', str(int(nb_threads))), ('async', '')]:
+            port = unused_port()
+            server = start([engine, str(port), argument], environment)
+            try:
+                wait_for_port(port)
+                duration, latencies, failures = load(port, int(nb_viewers), int(nb_requests))
+            finally:
+                server.kill()
+                server.wait()
+            name = engine
+            if engine == 'threaded':
+                name += ' (%d threads)' % nb_threads
+            print '  %-20s %8.0f req/s  p50 %8.2f ms  p99 %8.2f ms  max %8.2f ms  ' \
+                  '%d failures' % (name, len(latencies) / duration, percentile(latencies, 0.5),
+                                   percentile(latencies, 0.99), percentile(latencies, 1.0),
+                                   failures)
+    finally:
+        renderer.kill()
+        renderer.wait()
+        shutil.rmtree(temporary_directory)
+
+
+if __name__ == '__main__':
+    if MODE == 'renderer':
+        serve_renderer(int(sys.argv[2]), float(sys.argv[3]))
+    elif MODE == 'setup':
+        setup_sessions(int(sys.argv[2]))
+    elif MODE == 'threaded':
+        serve_threaded(int(sys.argv[2]), int(sys.argv[3]))
+    elif MODE == 'async':
+        from rendering_resource_manager_service.service import async_wsgi
+        async_wsgi.serve('127.0.0.1', sys.argv[2])
+    else:
+        main()
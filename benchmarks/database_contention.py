@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=W0403
+# pylint: disable=R0915
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#                          Daniel Nachbaur <daniel.nachbaur@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+
+"""
+Measures database contention under the load of a busy service: reader threads query session
+statuses while writer threads flush keep-alive batches and apply status transitions.
+
+The database profile is selected by RRM_DATABASE_PROFILE, as for the service. SQLite
+profiles run on a temporary database file. The postgresql profile runs on the configured
+database, which should be a scratch database: the session table is created if needed and the
+benchmark sessions are deleted at the end. The same environment variables as manage.py are
+needed (SLURM_USERNAME, SLURM_HOSTS, ...).
+
+Usage: python benchmarks/database_contention.py [readers] [writers] [duration in seconds]
+"""
+
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE',
+                      'rendering_resource_manager_service.service.settings')
+
+# pylint: disable=C0413
+from django.conf import settings
+
+TEMPORARY_DIRECTORY = None
+if settings.DATABASE_PROFILE != settings.DATABASE_PROFILE_POSTGRESQL:
+    TEMPORARY_DIRECTORY = tempfile.mkdtemp()
+    settings.DATABASES['default']['NAME'] = os.path.join(TEMPORARY_DIRECTORY, 'db.sqlite3')
+
+from django.core.management import call_command
+from django.db import connection, transaction, DatabaseError
+from rendering_resource_manager_service.session.models import Session, \
+    SESSION_STATUS_RUNNING, SESSION_STATUS_BUSY
+
+NB_SESSIONS = 1000
+KEEP_ALIVE_BATCH_SIZE = 100
+# Benchmark sessions have ids and hosts of the same length as real ones: UUIDs and fully
+# qualified domain names
+SESSION_PREFIX = 'bench000-'
+SESSION_HOST = 'bbpviz001.bbp.epfl.ch'
+
+
+class Statistics(object):
+    """
+    Operation latencies and failures of a thread
+    """
+
+    def __init__(self):
+        self.latencies = []
+        self.failures = 0
+
+    def measure(self, function):
+        """
+        Executes and times an operation
+        :param function: Operation to execute
+        """
+        start = time.time()
+        try:
+            function()
+            self.latencies.append(time.time() - start)
+        except DatabaseError:
+            self.failures += 1
+
+
+def session_id(index):
+    """
+    :param index: Index of a benchmark session
+    :return: The id of the session
+    """
+    return '%s0000-0000-0000-%012d' % (SESSION_PREFIX, index)
+
+
+def reader(index, deadline, statistics):
+    """
+    Queries session statuses, as status polls do
+    """
+    count = 0
+    while time.time() < deadline:
+        sid = session_id((index * 7919 + count) % NB_SESSIONS)
+        statistics.measure(lambda: Session.objects.filter(id=sid).values_list(
+            'status', 'http_host', 'http_port')[0])
+        count += 1
+    connection.close()
+
+
+def writer(index, deadline, statistics):
+    """
+    Alternates keep-alive batch flushes and single session status transitions
+    """
+    count = 0
+    while time.time() < deadline:
+        first = (index * 104729 + count * KEEP_ALIVE_BATCH_SIZE) % NB_SESSIONS
+        if count % 2 == 0:
+            ids = [session_id((first + i) % NB_SESSIONS) for i in range(KEEP_ALIVE_BATCH_SIZE)]
+            valid_until = datetime.datetime.now() + datetime.timedelta(seconds=60)
+
+            def flush():
+                """ Keep-alive flush """
+                with transaction.atomic():
+                    Session.objects.filter(id__in=ids, valid_until__lt=valid_until).update(
+                        valid_until=valid_until)
+            statistics.measure(flush)
+        else:
+            sid = session_id(first)
+            status = (SESSION_STATUS_RUNNING, SESSION_STATUS_BUSY)[count % 4 == 1]
+            statistics.measure(lambda: Session.objects.filter(id=sid).update(status=status))
+        count += 1
+    connection.close()
+
+
+def percentile(values, ratio):
+    """
+    :return: The given percentile of the values, in milliseconds
+    """
+    if not values:
+        return 0.0
+    return sorted(values)[min(len(values) - 1, int(len(values) * ratio))] * 1000
+
+
+def report(name, statistics, duration):
+    """
+    Prints the throughput, latencies and failures of a group of threads
+    """
+    latencies = [latency for s in statistics for latency in s.latencies]
+    failures = sum([s.failures for s in statistics])
+    print '  %-8s %8.0f ops/s  p50 %7.2f ms  p99 %8.2f ms  max %8.2f ms  %d failures' % (
+        name, len(latencies) / duration, percentile(latencies, 0.5),
+        percentile(latencies, 0.99), percentile(latencies, 1.0), failures)
+
+
+def main():
+    """
+    Runs the benchmark
+    """
+    arguments = [int(argument) for argument in sys.argv[1:4]]
+    nb_readers, nb_writers, duration = (arguments + [8, 4, 10][len(arguments):])[:3]
+    call_command('syncdb', interactive=False, verbosity=0)
+    Session.objects.filter(id__startswith=SESSION_PREFIX).delete()
+    now = datetime.datetime.now()
+    Session.objects.bulk_create([
+        Session(id=session_id(i), owner='bench', created=now, valid_until=now,
+                http_host=SESSION_HOST, status=SESSION_STATUS_RUNNING)
+        for i in range(NB_SESSIONS)], batch_size=500)
+    connection.close()
+
+    deadline = time.time() + duration
+    threads = []
+    reader_statistics = [Statistics() for _ in range(nb_readers)]
+    writer_statistics = [Statistics() for _ in range(nb_writers)]
+    for i in range(nb_readers):
+        threads.append(threading.Thread(target=reader, args=(i, deadline, reader_statistics[i])))
+    for i in range(nb_writers):
+        threads.append(threading.Thread(target=writer, args=(i, deadline, writer_statistics[i])))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print 'Database profile %s, %d readers, %d writers, %d seconds' % (
+        settings.DATABASE_PROFILE, nb_readers, nb_writers, duration)
+    report('reads', reader_statistics, duration)
+    report('writes', writer_statistics, duration)
+
+    Session.objects.filter(id__startswith=SESSION_PREFIX).delete()
+    connection.close()
+    if TEMPORARY_DIRECTORY is not None:
+        shutil.rmtree(TEMPORARY_DIRECTORY)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=W0403
+# pylint: disable=R0915
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#                          Daniel Nachbaur <daniel.nachbaur@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+
+"""
+Measures the session queries made by the keep-alive thread, the administration listing and
+the job managers on a populated session table, with and without the session indexes.
+
+The benchmark runs on an in-memory SQLite database and needs the same environment variables
+as manage.py (SLURM_USERNAME, SLURM_HOSTS, ...).
+
+Usage: python benchmarks/session_queries.py [number of sessions]
+"""
+
+import datetime
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE',
+                      'rendering_resource_manager_service.service.settings')
+
+# pylint: disable=C0413
+from django.conf import settings
+settings.DATABASES['default']['NAME'] = ':memory:'
+
+from django.core.management import call_command
+from django.db import connection
+from rendering_resource_manager_service.session.models import Session, job_key, \
+    SESSION_STATUS_RUNNING, SESSION_STATUS_STOPPING, SESSION_STATUS_STOPPED
+
+NB_SESSIONS = 10000
+NB_RUNS = 20
+
+
+def populate(nb_sessions):
+    """
+    Fills the session table. A tenth of the sessions are expired, jobs are identified by
+    UNICORE-like URLs
+    :param nb_sessions: Number of sessions to create
+    """
+    now = datetime.datetime.now()
+    sessions = []
+    for i in range(nb_sessions):
+        job_id = 'https://unicore.example.org:8080/SITE/rest/core/jobs/%08d' % i
+        status = SESSION_STATUS_RUNNING
+        if i % 3 == 0:
+            status = SESSION_STATUS_STOPPED
+        sessions.append(Session(
+            id='%020d' % i, owner='user%d' % (i % 100), configuration_id='livre',
+            created=now, valid_until=now + datetime.timedelta(seconds=i % 10 - 1),
+            job_id=job_id, job_key=job_key(job_id), status=status))
+    Session.objects.bulk_create(sessions, batch_size=500)
+
+
+def queries(nb_sessions):
+    """
+    :param nb_sessions: Number of sessions in the table
+    :return: The list of benchmarked queries, as (name, query set) tuples. The default
+             ordering of the sessions is cleared, as it would prevent the use of the indexes
+    """
+    now = datetime.datetime.now()
+    job_id = 'https://unicore.example.org:8080/SITE/rest/core/jobs/%08d' % (nb_sessions / 2)
+    sessions = Session.objects.order_by()
+    return [
+        ('expired sessions', sessions.filter(valid_until__lte=now).exclude(
+            status=SESSION_STATUS_STOPPING)),
+        ('expired running sessions', sessions.filter(
+            status=SESSION_STATUS_RUNNING, valid_until__lte=now)),
+        ('sessions of an owner', sessions.filter(owner='user42')),
+        ('session by job id', sessions.filter(job_id=job_id)),
+        ('session by job key', Session.by_job_id(job_id).order_by()),
+    ]
+
+
+def explain(query_set, title):
+    """
+    :param query_set: Query set to explain
+    :param title: Title of the run, added as a comment so that the statement is not served
+                  from the statement cache of the previous run
+    :return: The query plan of the database
+    """
+    sql, params = query_set.query.sql_with_params()
+    prefix = 'EXPLAIN '
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    cursor = connection.cursor()
+    cursor.execute(prefix + sql + ' /* ' + title + ' */', params)
+    return ' | '.join([str(row[-1]) for row in cursor.fetchall()])
+
+
+def run(title, nb_sessions):
+    """
+    Prints the plan and the average duration of every query
+    :param title: Title of the run
+    :param nb_sessions: Number of sessions in the table
+    """
+    print '\n' + title
+    for name, query_set in queries(nb_sessions):
+        query_set = query_set.values_list('id', flat=True)
+        duration = timeit.timeit(lambda: list(query_set.all()), number=NB_RUNS) / NB_RUNS
+        print '  %-26s %8.3f ms  %s' % (name, duration * 1000, explain(query_set, title))
+
+
+def drop_indexes():
+    """
+    Drops the indexes of the session table, keeping the primary key
+    """
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND "
+        "name NOT LIKE 'sqlite_autoindex%%'", [Session._meta.db_table])
+    for (name, ) in cursor.fetchall():
+        cursor.execute('DROP INDEX ' + connection.ops.quote_name(name))
+
+
+def main():
+    """
+    Runs the benchmark
+    """
+    nb_sessions = NB_SESSIONS
+    if len(sys.argv) > 1:
+        nb_sessions = int(sys.argv[1])
+    call_command('syncdb', interactive=False, verbosity=0)
+    populate(nb_sessions)
+    run('With indexes (%d sessions)' % nb_sessions, nb_sessions)
+    drop_indexes()
+    run('Without indexes (%d sessions)' % nb_sessions, nb_sessions)
+
+
+if __name__ == '__main__':
+    main()
@@ -36,10 +36,14 @@ from rest_framework.urlpatterns import format_suffix_patterns
 admin_view = AdminViewSet.as_view({
     'put': 'admin_command',
 })
+admin_statistics = AdminViewSet.as_view({
+    'get': 'statistics',
+})
 
 urlpatterns = patterns(
     '',
     url(r'/admin', include(admin.site.urls)),
+    url(r'/admin/statistics$', admin_statistics),
     url(r'/admin/(?P<command>[a-zA-Z0-9]+)', admin_view),
 )
 
@@ -31,7 +31,7 @@ user session
 
 from rest_framework import serializers, viewsets
 from django.http import HttpResponse
-from rendering_resource_manager_service import utils as consts
+import rendering_resource_manager_service.session.management.session_manager_settings as consts
 from rendering_resource_manager_service.session.models import Session
 import rendering_resource_manager_service.session.management.session_manager as session_manager
 
@@ -70,7 +70,7 @@ class AdminViewSet(viewsets.ModelViewSet):
         :rtype : A Json response containing an ok status or a description of the error
         """
         if command == consts.RRM_SPECIFIC_COMMAND_KEEPALIVE:
-            session_id = session_manager.get_session_id_from_request(request)
+            session_id = session_manager.SessionManager.get_session_id_from_request(request)
             sm = session_manager.SessionManager()
             status = sm.keep_alive_session(session_id)
             return HttpResponse(status=status[0], content=status[1])
@@ -84,3 +84,13 @@ class AdminViewSet(viewsets.ModelViewSet):
             return HttpResponse(status=status[0], content=status[1])
         else:
             return HttpResponse(status=401, content=command + ' is an invalid command')
+
+    @classmethod
+    def statistics(cls, request):
+        """
+        Returns the usage counters of the pools, caches and locks of the serving process
+        :param : request: The REST request
+        :rtype : A Json response containing the counters
+        """
+        status = session_manager.SessionManager.statistics()
+        return HttpResponse(status=status[0], content=status[1], content_type='application/json')
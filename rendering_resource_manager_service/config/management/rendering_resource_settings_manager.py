@@ -31,12 +31,34 @@ and ensures persistent storage in a database
 
 from rendering_resource_manager_service.config.models import RenderingResourceSettings
 import rendering_resource_manager_service.utils.custom_logging as log
+from rendering_resource_manager_service.utils.cache import ReadThroughCache
 import rest_framework.status as http_status
 from django.db import IntegrityError, transaction
+from django.db.models.signals import post_save, post_delete
 from rest_framework.renderers import JSONRenderer
 import json
 
 
+# Rendering resource settings are read for every scheduled, started, stopped or polled
+# session, but rarely modified. Lookups by id are therefore cached in each process
+# pylint: disable=E1101
+settings_cache = ReadThroughCache(
+    'rendering_resource_settings',
+    lambda settings_id: RenderingResourceSettings.objects.get(id=settings_id))
+
+
+# pylint: disable=W0613
+def _invalidate_settings_cache(sender, instance, **kwargs):
+    """
+    Invalidates the cached copy of settings modified outside of the manager, for instance
+    through the admin interface
+    """
+    settings_cache.invalidate(instance.id)
+
+post_save.connect(_invalidate_settings_cache, sender=RenderingResourceSettings)
+post_delete.connect(_invalidate_settings_cache, sender=RenderingResourceSettings)
+
+
 class RenderingResourceSettingsManager(object):
     """
     This class is in charge of handling session and ensures persistent storage in a database
@@ -71,6 +93,7 @@ class RenderingResourceSettingsManager(object):
             )
             with transaction.atomic():
                 settings.save(force_insert=True)
+            settings_cache.invalidate(settings_id)
             msg = 'Rendering Resource ' + settings_id + ' successfully configured'
             response = json.dumps({'contents': msg})
             return [http_status.HTTP_201_CREATED, response]
@@ -106,6 +129,7 @@ class RenderingResourceSettingsManager(object):
             settings.description = params['description']
             with transaction.atomic():
                 settings.save()
+            settings_cache.invalidate(settings_id)
             return [http_status.HTTP_200_OK, '']
         except RenderingResourceSettings.DoesNotExist as e:
             log.error(str(e))
@@ -125,10 +149,19 @@ class RenderingResourceSettingsManager(object):
     @staticmethod
     def get_by_id(settings_id):
         """
-        Returns the config rendering resource config
+        Returns the config rendering resource config. Settings are served from the
+        process-local cache, and read from the database on cache miss
         :param settings_id id of rendering resource or which we want the config
         """
-        return RenderingResourceSettings.objects.get(id=settings_id)
+        return settings_cache.get(settings_id)
+
+    @staticmethod
+    def cache_statistics():
+        """
+        Returns the usage counters of the settings cache
+        :return: A dictionary containing the number of hits, misses and the hit ratio
+        """
+        return settings_cache.statistics()
 
     @classmethod
     def delete(cls, settings_id):
@@ -140,6 +173,7 @@ class RenderingResourceSettingsManager(object):
             settings = RenderingResourceSettings.objects.get(id=settings_id)
             with transaction.atomic():
                 settings.delete()
+            settings_cache.invalidate(settings_id)
             return [http_status.HTTP_200_OK, 'Settings successfully deleted']
         except RenderingResourceSettings.DoesNotExist as e:
             log.error(str(e))
@@ -169,4 +203,5 @@ class RenderingResourceSettingsManager(object):
         """
         with transaction.atomic():
             RenderingResourceSettings.objects.all().delete()
+        settings_cache.invalidate()
         return [http_status.HTTP_200_OK, 'Settings cleared']
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=E1101
+# pylint: disable=W0403
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+"""
+This class gives access to the system global settings, such as the session creation flag and
+the session keep-alive timeout. The settings are read on every session request but rarely
+modified, they are therefore cached in each process
+"""
+
+from rendering_resource_manager_service.config.models import SystemGlobalSettings
+from rendering_resource_manager_service.utils.cache import ReadThroughCache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+
+# Identifier of the single row holding the system global settings
+SYSTEM_GLOBAL_SETTINGS_ID = 0
+
+
+# pylint: disable=W0613
+def _load_system_global_settings(settings_id):
+    """
+    Reads the system global settings, creating them with default values if needed
+    :param settings_id: Identifier of the settings row
+    :return: A SystemGlobalSettings instance
+    """
+    # pylint: disable=E1101
+    return SystemGlobalSettings.objects.get_or_create(id=settings_id)[0]
+
+global_settings_cache = ReadThroughCache('system_global_settings', _load_system_global_settings)
+
+
+# pylint: disable=W0613
+def _invalidate_global_settings_cache(sender, instance, **kwargs):
+    """
+    Invalidates the cached settings when they are modified outside of the manager, for
+    instance through the admin interface
+    """
+    global_settings_cache.invalidate()
+
+post_save.connect(_invalidate_global_settings_cache, sender=SystemGlobalSettings)
+post_delete.connect(_invalidate_global_settings_cache, sender=SystemGlobalSettings)
+
+
+class SystemGlobalSettingsManager(object):
+    """
+    This class is in charge of reading and modifying the system global settings
+    """
+
+    @staticmethod
+    def get():
+        """
+        Returns the system global settings. The returned instance is shared by all the threads
+        of the process and must not be modified, use the setters instead
+        :return: A SystemGlobalSettings instance
+        """
+        return global_settings_cache.get(SYSTEM_GLOBAL_SETTINGS_ID)
+
+    @staticmethod
+    def set_session_creation(enabled):
+        """
+        Enables or disables the creation of new sessions
+        :param enabled: True if new sessions can be created
+        :return: True if the setting was modified, False if it already had the given value
+        """
+        with transaction.atomic():
+            # pylint: disable=E1101
+            sgs = SystemGlobalSettings.objects.select_for_update().get_or_create(
+                id=SYSTEM_GLOBAL_SETTINGS_ID)[0]
+            if sgs.session_creation == enabled:
+                return False
+            sgs.session_creation = enabled
+            sgs.save()
+        global_settings_cache.invalidate()
+        return True
+
+    @staticmethod
+    def cache_statistics():
+        """
+        Returns the usage counters of the settings cache
+        :return: A dictionary containing the number of hits, misses and the hit ratio
+        """
+        return global_settings_cache.statistics()
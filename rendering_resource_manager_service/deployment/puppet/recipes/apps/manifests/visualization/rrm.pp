@@ -181,14 +181,16 @@ class apps::visualization::rrm (
     require => Supervisor::Service['rrm']
   }
 
-  # Configure RRM in gunicorn
+  # Configure RRM in gunicorn. Threaded workers keep renderer tunnels from
+  # blocking a whole worker and from being killed by the worker timeout
   supervisor::service { 'rrm':
     ensure      => present,
     name        => 'rrm',
     enable      => true,
     command     => "${rrm_module_bin}/gunicorn \
                     ${rrm_module}.service.wsgi \
-                    -w 4 -b 127.0.0.1:${rrm_service_port} --log-file - ",
+                    -w 4 -k gthread --threads 8 \
+                    -b 127.0.0.1:${rrm_service_port} --log-file - ",
     user        => $user,
     group       => $group,
     directory   => $python_venv,
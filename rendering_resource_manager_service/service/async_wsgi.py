@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+
+"""
+Asynchronous engine of the service, based on gevent. The standard library is patched so that
+every request runs in a greenlet and yields to the event loop while it waits for the network:
+commands forwarded to rendering resources and renderer probes no longer hold a worker thread
+for up to REQUEST_TIMEOUT seconds, and thousands of them can be in flight in one process.
+
+The engine serves the same application as wsgi.py, and can be run next to it, for instance
+with the session commands routed to it by the front-end proxy. The background threads are
+only started by the engine selected by RRM_BACKGROUND_THREADS (threaded by default), so that
+sessions are not reaped and renderers not probed twice:
+    python -m rendering_resource_manager_service.service.async_wsgi 127.0.0.1:8081
+or with gunicorn:
+    gunicorn -k gevent rendering_resource_manager_service.service.async_wsgi
+
+It requires the async extra (requirements_async.txt)
+"""
+
+try:
+    from gevent import monkey
+except ImportError:
+    raise ImportError('The asynchronous engine requires gevent, see requirements_async.txt')
+
+# Patching must happen before the modules using sockets and threads are imported
+monkey.patch_all()
+
+# pylint: disable=C0413
+import os
+import sys
+
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE',
+                      'rendering_resource_manager_service.service.settings')
+
+import rendering_resource_manager_service.service.settings as settings
+import rendering_resource_manager_service.utils.custom_logging as log
+from rendering_resource_manager_service.service.wsgi import application, \
+    start_background_threads
+
+start_background_threads(settings.BACKGROUND_THREADS_ASYNC)
+
+
+def serve(host, port):
+    """
+    Serves the application until the process is stopped
+    :param host: Listening address
+    :param port: Listening port
+    """
+    server = WSGIServer((host, int(port)), application,
+                        spawn=Pool(settings.ASYNC_MAX_CONNECTIONS), log=None)
+    log.info(1, 'Asynchronous engine listening on ' + host + ':' + str(port))
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    ADDRESS = '127.0.0.1:8081'
+    if len(sys.argv) > 1:
+        ADDRESS = sys.argv[1]
+    HOST, PORT = ADDRESS.rsplit(':', 1)
+    serve(HOST, PORT)
@@ -35,6 +35,8 @@ https://docs.djangoproject.com/en/1.7/ref/settings/
 import os
 import sys
 
+from django.core.exceptions import ImproperlyConfigured
+
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 
@@ -109,22 +111,77 @@ WSGI_APPLICATION = 'rendering_resource_manager_service.service.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/1.7/ref/config/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'OPTIONS': {'timeout': 20},
-        'NAME': os.path.join(BASE_DIR + '/tests', 'db.sqlite3'),
+#
+# The database profile is selected with the RRM_DATABASE_PROFILE environment variable:
+# - sqlite: SQLite database file, for development and tests
+# - sqlite-wal: SQLite database file in write-ahead logging mode, for single-node
+#   installations. Status queries no longer wait for keep-alive writes
+# - postgresql: PostgreSQL server, configured by the RRM_DATABASE_* environment variables.
+#   Connections are kept open for RRM_DATABASE_CONN_MAX_AGE seconds. Set it to 0 when
+#   connecting through an external pooler such as PgBouncer
+DATABASE_PROFILE_SQLITE = 'sqlite'
+DATABASE_PROFILE_SQLITE_WAL = 'sqlite-wal'
+DATABASE_PROFILE_POSTGRESQL = 'postgresql'
+DATABASE_PROFILE = os.environ.get('RRM_DATABASE_PROFILE', DATABASE_PROFILE_SQLITE)
+
+if DATABASE_PROFILE == DATABASE_PROFILE_SQLITE:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'OPTIONS': {'timeout': 20},
+            'NAME': os.path.join(BASE_DIR + '/tests', 'db.sqlite3'),
+        }
     }
-}
-
+elif DATABASE_PROFILE == DATABASE_PROFILE_SQLITE_WAL:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'rendering_resource_manager_service.service.sqlite_wal',
+            'OPTIONS': {'timeout': 20},
+            'NAME': os.environ.get(
+                'RRM_DATABASE_NAME', os.path.join(BASE_DIR + '/tests', 'db.sqlite3')),
+        }
+    }
+elif DATABASE_PROFILE == DATABASE_PROFILE_POSTGRESQL:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql_psycopg2',
+            'NAME': os.environ.get('RRM_DATABASE_NAME', 'rrm'),
+            'USER': os.environ.get('RRM_DATABASE_USER', 'rrm'),
+            'PASSWORD': os.environ.get('RRM_DATABASE_PASSWORD', ''),
+            'HOST': os.environ.get('RRM_DATABASE_HOST', 'localhost'),
+            'PORT': os.environ.get('RRM_DATABASE_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('RRM_DATABASE_CONN_MAX_AGE', 600)),
+        }
+    }
+else:
+    raise ImproperlyConfigured('Unknown database profile: ' + DATABASE_PROFILE)
+
+# Cache tier. The default cache lives in the memory of each process. The shared cache is only
+# used to publish invalidations between processes; it defaults to files in /var/tmp, and can
+# be moved to memcached or a Redis server (for instance django_redis.cache.RedisCache) with
+# the RRM_SHARED_CACHE_BACKEND and RRM_SHARED_CACHE_LOCATION environment variables
+SHARED_CACHE_ALIAS = 'shared'
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
-        'LOCATION': '/var/tmp/django_cache',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'rrm',
+        'KEY_PREFIX': 'rrm',
+    },
+    SHARED_CACHE_ALIAS: {
+        'BACKEND': os.environ.get(
+            'RRM_SHARED_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('RRM_SHARED_CACHE_LOCATION', '/var/tmp/django_cache'),
+        'KEY_PREFIX': 'rrm',
+    },
 }
 
+# Process-local caches drop their entries after LOCAL_CACHE_TIMEOUT seconds, keep at most
+# LOCAL_CACHE_MAX_ENTRIES entries, and look for invalidations published by other processes in
+# the shared cache at most every LOCAL_CACHE_GENERATION_CHECK_INTERVAL seconds
+LOCAL_CACHE_TIMEOUT = 300
+LOCAL_CACHE_MAX_ENTRIES = 1000
+LOCAL_CACHE_GENERATION_CHECK_INTERVAL = 2
+
 # Internationalization
 # https://docs.djangoproject.com/en/1.7/topics/i18n/
 
@@ -201,6 +258,19 @@ SOCIAL_AUTH_HBP_KEY = 'TO_BE_MODIFIED'
 IMAGE_STREAMING_SERVICE_URL = 'TO_BE_MODIFIED'
 REQUEST_TIMEOUT = 5
 
+# Asynchronous engine (service/async_wsgi.py). Requests are served by greenlets multiplexed on
+# one event loop, at most ASYNC_MAX_CONNECTIONS at a time per process
+ASYNC_MAX_CONNECTIONS = 10000
+
+# Engine running the background threads (keep-alive, renderer prober and Slurm job poller),
+# selected with the RRM_BACKGROUND_THREADS environment variable. They must run in one process
+# only: when the asynchronous engine runs next to the threaded service, only one of them
+# starts the threads. Set it to none in the other processes of a multi-process deployment
+BACKGROUND_THREADS_THREADED = 'threaded'
+BACKGROUND_THREADS_ASYNC = 'async'
+BACKGROUND_THREADS_NONE = 'none'
+BACKGROUND_THREADS = os.environ.get('RRM_BACKGROUND_THREADS', BACKGROUND_THREADS_THREADED)
+
 try:
     from local_settings import * # pylint: disable=F0401,W0403,W0401,W0614
 except ImportError as e:
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=W0403
+# pylint: disable=R0915
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#                          Daniel Nachbaur <daniel.nachbaur@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+
+"""
+SQLite database backend using write-ahead logging. In WAL mode, readers do not block the
+writer and the writer does not block readers, so status queries are not delayed by the
+keep-alive writes. Writers are still serialized by the database
+"""
+
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+
+# Pragmas executed on every new connection. The journal mode is stored in the database file,
+# the synchronous mode applies to the connection. In WAL mode, NORMAL synchronization is
+# safe against corruption and only syncs the log at checkpoints
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+)
+
+
+class DatabaseWrapper(SQLiteDatabaseWrapper):
+    """
+    SQLite connection switched to write-ahead logging
+    """
+
+    def get_new_connection(self, conn_params):
+        """
+        Opens a connection and applies the WAL pragmas
+        :param conn_params: Connection parameters
+        :return: The database connection
+        """
+        connection = super(DatabaseWrapper, self).get_new_connection(conn_params)
+        for pragma in CONNECTION_PRAGMAS:
+            connection.execute(pragma)
+        return connection
@@ -30,14 +30,55 @@ For more information on this file, see
 https://docs.djangoproject.com/en/1.7/howto/deployment/wsgi/
 """
 
+from threading import Lock
+
 from django.core.wsgi import get_wsgi_application
 from rendering_resource_manager_service.session.management import keep_alive_thread
+from rendering_resource_manager_service.session.management import slurm_job_poller
+from rendering_resource_manager_service.session.management import renderer_prober
 from rendering_resource_manager_service.session.models import Session
+import rendering_resource_manager_service.service.settings as settings
+import rendering_resource_manager_service.utils.custom_logging as log
 
 application = get_wsgi_application()
 
-# Start keep-alive thread
-# pylint: disable=E1101
-thread = keep_alive_thread.KeepAliveThread(Session.objects)
-thread.setDaemon(True)  # This guaranties that the thread is destroyed when the main process ends
-thread.start()
+_background_threads_mutex = Lock()
+_background_threads_started = False
+
+
+def start_background_threads(engine):
+    """
+    Starts the keep-alive thread, the renderer prober and the Slurm job poller, if the given
+    engine is the one selected by BACKGROUND_THREADS. The threads are started at most once
+    per process
+    :param engine: Engine serving the application in this process
+    :return: True if the threads were started
+    """
+    # pylint: disable=W0603
+    global _background_threads_started
+    if engine != settings.BACKGROUND_THREADS:
+        return False
+    with _background_threads_mutex:
+        if _background_threads_started:
+            return False
+        _background_threads_started = True
+
+    # Start keep-alive thread
+    # pylint: disable=E1101
+    thread = keep_alive_thread.KeepAliveThread(Session.objects)
+    # This guaranties that the thread is destroyed when the main process ends
+    thread.setDaemon(True)
+    thread.start()
+
+    # Start renderer prober
+    renderer_prober.globalRendererProber.setDaemon(True)
+    renderer_prober.globalRendererProber.start()
+
+    # Start Slurm job poller
+    if settings.RESOURCE_ALLOCATOR == settings.RESOURCE_ALLOCATOR_SLURM:
+        slurm_job_poller.globalSlurmJobPoller.setDaemon(True)
+        slurm_job_poller.globalSlurmJobPoller.start()
+    log.info(1, 'Background threads started by the ' + engine + ' engine')
+    return True
+
+start_background_threads(settings.BACKGROUND_THREADS_THREADED)
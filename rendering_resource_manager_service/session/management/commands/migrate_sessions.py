@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=W0403
+# pylint: disable=R0915
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#                          Daniel Nachbaur <daniel.nachbaur@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+"""
+Brings the session table of an existing database in line with the Session model: missing
+columns are added, character columns are widened, job keys are computed and missing indexes
+are created. Django 1.6 has no schema migrations, and syncdb does not modify tables that
+already exist
+
+Usage: python manage.py migrate_sessions
+"""
+
+from django.core.management.base import NoArgsCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction, DatabaseError
+from rendering_resource_manager_service.session.models import Session, job_key
+
+
+class Command(NoArgsCommand):
+    """
+    Session table migration
+    """
+    help = 'Adds the missing columns and indexes of the session table, and widens its columns'
+
+    def handle_noargs(self, **options):
+        """
+        Runs the migration. Every step can safely be applied several times
+        """
+        self.add_columns()
+        self.widen_columns()
+        self.compute_job_keys()
+        self.create_indexes()
+
+    def add_columns(self):
+        """
+        Adds the model columns missing from the session table, with their default value
+        """
+        table = Session._meta.db_table
+        cursor = connection.cursor()
+        columns = [column[0] for column in
+                   connection.introspection.get_table_description(cursor, table)]
+        for field in Session._meta.local_fields:
+            if field.column in columns:
+                continue
+            statement = 'ALTER TABLE %s ADD COLUMN %s %s NOT NULL DEFAULT %s' % (
+                connection.ops.quote_name(table), connection.ops.quote_name(field.column),
+                field.db_type(connection), self._literal(field.get_default()))
+            self.stdout.write(statement)
+            with transaction.atomic():
+                cursor.execute(statement)
+
+    def widen_columns(self):
+        """
+        Widens the character columns shorter than their model field. SQLite does not enforce
+        the length of character columns, which are left unchanged
+        """
+        if connection.vendor not in ['postgresql', 'mysql']:
+            return
+        table = Session._meta.db_table
+        cursor = connection.cursor()
+        cursor.execute(
+            'SELECT column_name, character_maximum_length FROM information_schema.columns '
+            'WHERE table_name = %s', [table])
+        lengths = dict(cursor.fetchall())
+        for field in Session._meta.local_fields:
+            length = lengths.get(field.column)
+            if field.get_internal_type() != 'CharField' or length is None or \
+                    length >= field.max_length:
+                continue
+            if connection.vendor == 'postgresql':
+                statement = 'ALTER TABLE %s ALTER COLUMN %s TYPE %s'
+            else:
+                statement = 'ALTER TABLE %s MODIFY %s %s NOT NULL'
+            statement = statement % (
+                connection.ops.quote_name(table), connection.ops.quote_name(field.column),
+                field.db_type(connection))
+            self.stdout.write(statement)
+            with transaction.atomic():
+                cursor.execute(statement)
+
+    def compute_job_keys(self):
+        """
+        Computes the job key of the sessions that have a job but no key
+        """
+        # pylint: disable=E1101
+        sessions = Session.objects.exclude(job_id='').filter(job_key='')
+        count = 0
+        for session_id, job_id in sessions.values_list('id', 'job_id'):
+            Session.objects.filter(id=session_id, job_id=job_id).update(job_key=job_key(job_id))
+            count += 1
+        self.stdout.write('Job keys computed for %d sessions' % count)
+
+    def create_indexes(self):
+        """
+        Creates the indexes declared by the Session model. Statements failing because the
+        index already exists are skipped
+        """
+        cursor = connection.cursor()
+        for statement in connection.creation.sql_indexes_for_model(Session, no_style()):
+            try:
+                with transaction.atomic():
+                    cursor.execute(statement)
+                self.stdout.write(statement)
+            except DatabaseError as e:
+                self.stdout.write('Skipped (%s): %s' % (str(e).strip(), statement))
+
+    @staticmethod
+    def _literal(value):
+        """
+        Formats a column default value as a SQL literal. DDL statements cannot take
+        parameters on every database
+        :param value: Default value of a model field
+        :return: The SQL literal
+        """
+        if isinstance(value, bool):
+            return str(int(value))
+        if isinstance(value, (int, long, float)):
+            return str(value)
+        return "'" + str(value).replace("'", "''") + "'"
@@ -34,6 +34,12 @@ import rendering_resource_manager_service.session.management.unicore_job_manager
     as unicore_job_manager
 import rendering_resource_manager_service.service.settings \
     as global_settings
+import rendering_resource_manager_service.session.management.session_manager_settings \
+    as settings
+import rendering_resource_manager_service.utils.custom_logging as log
+from rendering_resource_manager_service.utils.worker_pool import WorkerPool
+from rendering_resource_manager_service.session.models import Session, \
+    SESSION_STATUS_FAILED
 
 
 class JobInformation(object):
@@ -66,3 +72,49 @@ if global_settings.RESOURCE_ALLOCATOR == global_settings.RESOURCE_ALLOCATOR_SLUR
     globalJobManager = slurm_job_manager.SlurmJobManager()
 elif global_settings.RESOURCE_ALLOCATOR == global_settings.RESOURCE_ALLOCATOR_UNICORE:
     globalJobManager = unicore_job_manager.UnicoreJobManager()
+
+# Worker pool processing job submissions in the background
+globalJobSubmissionPool = WorkerPool(
+    'JobSubmission', settings.JOB_SUBMISSION_WORKERS, settings.JOB_SUBMISSION_QUEUE_SIZE)
+
+
+def submit_job(session_id, job_information, auth_token=None, http_port=None):
+    """
+    Queues the scheduling of a job for the given session
+    :param session_id: Id of the session for which the job is scheduled
+    :param job_information: Information about the job
+    :param auth_token: Authentication token passed to the job manager
+    :param http_port: Port assigned to the rendering resource, None if the session already
+                      holds it
+    :return: True if the job submission was queued, False if the submission queue is full
+    """
+    return globalJobSubmissionPool.submit(
+        _process_job_submission, session_id, job_information, auth_token, http_port)
+
+
+def _process_job_submission(session_id, job_information, auth_token, http_port=None):
+    """
+    Schedules a job using the global job manager. Progress is reported through the session
+    status, which is set to SESSION_STATUS_FAILED if the job could not be scheduled
+    :param session_id: Id of the session for which the job is scheduled
+    :param job_information: Information about the job
+    :param auth_token: Authentication token passed to the job manager
+    :param http_port: Port assigned to the rendering resource, None if the session already
+                      holds it
+    """
+    try:
+        # pylint: disable=E1101
+        session = Session.objects.get(id=session_id)
+    except Session.DoesNotExist:
+        log.info(1, 'Session ' + str(session_id) + ' was destroyed before its job was scheduled')
+        return
+    if http_port is not None:
+        session.transition(http_port=http_port)
+    try:
+        status = globalJobManager.schedule(session, job_information, auth_token)
+    except Exception:
+        session.transition(SESSION_STATUS_FAILED)
+        raise
+    if status is None or status[0] != 200:
+        log.error('Failed to schedule job for session ' + str(session_id) + ': ' + str(status))
+        session.transition(SESSION_STATUS_FAILED)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=W0403
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+"""
+The keep-alive buffer records the keep-alive messages in memory, and periodically writes
+the new session expiry dates to the database in bulk, instead of saving every session each
+time it is kept alive
+"""
+
+import threading
+import time
+
+from django.db import close_old_connections, transaction
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
+import rendering_resource_manager_service.utils.custom_logging as log
+from rendering_resource_manager_service.session.models import Session
+
+
+class KeepAliveBuffer(object):
+    """
+    In-memory table of pending session expiry dates, flushed every KEEP_ALIVE_FLUSH_INTERVAL
+    seconds by a background thread
+    """
+
+    def __init__(self, background_flush=True):
+        """
+        :param background_flush: If False, no flushing thread is started and the pending expiry
+                                 dates are only written by explicit calls to flush()
+        """
+        self._mutex = threading.Lock()
+        self._pending = dict()
+        self._background_flush = background_flush
+        self._thread = None
+        self._records = 0
+        self._flushes = 0
+        self._updates = 0
+
+    def record(self, session_id, valid_until):
+        """
+        Records a keep-alive message
+        :param session_id: Id of the session
+        :param valid_until: New expiry date of the session
+        """
+        self._start()
+        with self._mutex:
+            self._pending[session_id] = max(valid_until, self._pending.get(session_id, valid_until))
+            self._records += 1
+
+    def discard(self, session_id):
+        """
+        Forgets the pending keep-alive of a session, for instance when it is deleted
+        :param session_id: Id of the session
+        """
+        with self._mutex:
+            self._pending.pop(session_id, None)
+
+    def pending(self):
+        """
+        :return: A dictionary of the expiry dates not yet written, indexed by session id
+        """
+        with self._mutex:
+            return dict(self._pending)
+
+    def flush(self):
+        """
+        Writes the pending expiry dates to the database. Sessions are updated by batches of
+        KEEP_ALIVE_FLUSH_BATCH_SIZE with one UPDATE statement each. All sessions of a batch
+        receive the latest expiry date of the batch, which extends some of them by at most the
+        flush interval
+        """
+        with self._mutex:
+            pending = self._pending
+            self._pending = dict()
+        if not pending:
+            return
+        session_ids = pending.keys()
+        updates = 0
+        try:
+            for i in range(0, len(session_ids), settings.KEEP_ALIVE_FLUSH_BATCH_SIZE):
+                batch = session_ids[i:i + settings.KEEP_ALIVE_FLUSH_BATCH_SIZE]
+                valid_until = max([pending[session_id] for session_id in batch])
+                with transaction.atomic():
+                    # pylint: disable=E1101
+                    updates += Session.objects.filter(
+                        id__in=batch, valid_until__lt=valid_until).update(valid_until=valid_until)
+        except Exception:
+            # Keep the expiry dates for the next flush
+            with self._mutex:
+                for session_id, valid_until in pending.items():
+                    self._pending[session_id] = max(
+                        valid_until, self._pending.get(session_id, valid_until))
+            raise
+        with self._mutex:
+            self._flushes += 1
+            self._updates += updates
+        log.debug(1, 'Flushed ' + str(len(pending)) + ' keep-alive messages')
+
+    def statistics(self):
+        """
+        Returns the buffer usage counters
+        :return: A dictionary containing the number of recorded keep-alive messages, pending
+                 sessions, flushes and updated sessions
+        """
+        with self._mutex:
+            return {
+                'records': self._records,
+                'pending': len(self._pending),
+                'flushes': self._flushes,
+                'updates': self._updates
+            }
+
+    def _start(self):
+        """
+        Starts the flushing thread if it is not running yet
+        """
+        with self._mutex:
+            if self._thread is not None or not self._background_flush:
+                return
+            self._thread = threading.Thread(target=self._run, name='KeepAliveBuffer')
+            self._thread.setDaemon(True)
+            self._thread.start()
+
+    def _run(self):
+        """
+        Flushing loop
+        """
+        while True:
+            time.sleep(settings.KEEP_ALIVE_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            # pylint: disable=W0703
+            except Exception as e:
+                log.error(str(e))
+            close_old_connections()
+
+
+# Global keep-alive buffer
+globalKeepAliveBuffer = KeepAliveBuffer()
@@ -27,24 +27,129 @@ This module is the main class of the rendering resource manager. It registers ha
 starts the web server application.
 """
 
+import heapq
 import threading
-import time
 import datetime
 
 from django.db import transaction
+from django.db.models import Q
 import rendering_resource_manager_service.utils.custom_logging as log
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
 from rendering_resource_manager_service.session.models import SESSION_STATUS_STOPPING
+from rendering_resource_manager_service.utils.worker_pool import WorkerPool
 import job_manager
 import process_manager
+from renderer_connection_pool import globalRendererConnectionPool
+from keep_alive_buffer import globalKeepAliveBuffer
+from renderer_liveness_cache import globalRendererLivenessCache
+from session_status_notifier import globalSessionStatusNotifier
+from session_routing_table import globalSessionRoutingTable
 
 
 # Delay after which a session is closed if no keep-alive message is received (in seconds)
 KEEP_ALIVE_TIMEOUT = 300
 
-# Frequency at which the keep-alive messages are checked
+# Frequency at which the expiry index is rebuilt from the database, so that sessions created
+# or kept alive by other processes are taken into account (in seconds)
 KEEP_ALIVE_FREQUENCY = 120
 
 
+class SessionExpiryIndex(object):
+    """
+    Deadline-ordered index of the sessions. Deadlines are kept in a heap; when a session is
+    kept alive, a new entry is pushed and the outdated one is skipped when it reaches the top
+    of the heap
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._heap = []
+        self._deadlines = dict()
+
+    def schedule(self, session_id, valid_until):
+        """
+        Sets the expiry deadline of a session
+        :param session_id: Id of the session
+        :param valid_until: Date and time after which the session expires
+        """
+        with self._condition:
+            self._deadlines[session_id] = valid_until
+            heapq.heappush(self._heap, (valid_until, session_id))
+            # Wake the reaper up if the session now expires before the deadline it waits for
+            if self._heap[0][1] == session_id:
+                self._condition.notify()
+
+    def remove(self, session_id):
+        """
+        Removes a session from the index
+        :param session_id: Id of the session
+        """
+        with self._condition:
+            self._deadlines.pop(session_id, None)
+
+    def deadline(self, session_id):
+        """
+        :param session_id: Id of the session
+        :return: The expiry deadline of the session, or None if the session is not indexed
+        """
+        with self._condition:
+            return self._deadlines.get(session_id)
+
+    def reset(self, deadlines):
+        """
+        Replaces the content of the index
+        :param deadlines: Dictionary of expiry deadlines indexed by session id
+        """
+        with self._condition:
+            self._deadlines = dict(deadlines)
+            self._heap = [(valid_until, session_id)
+                          for session_id, valid_until in self._deadlines.items()]
+            heapq.heapify(self._heap)
+            self._condition.notify()
+
+    def pop_expired(self, now):
+        """
+        Removes the expired sessions from the index
+        :param now: Current date and time
+        :return: The list of expired session ids
+        """
+        expired = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                valid_until, session_id = heapq.heappop(self._heap)
+                if self._deadlines.get(session_id) == valid_until:
+                    del self._deadlines[session_id]
+                    expired.append(session_id)
+        return expired
+
+    def wait(self, timeout, grace_period=0):
+        """
+        Waits until the next deadline, a deadline change or the given timeout, whichever comes
+        first
+        :param timeout: Maximum waiting time (in seconds)
+        :param grace_period: Delay after which a deadline is considered reached (in seconds)
+        """
+        with self._condition:
+            # Skip outdated entries so that they do not cause spurious wake-ups
+            while self._heap and \
+                    self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            if self._heap:
+                delay = (self._heap[0][0] - datetime.datetime.now()).total_seconds() + \
+                    grace_period
+                timeout = min(timeout, delay)
+            if timeout > 0:
+                self._condition.wait(timeout)
+
+    def __len__(self):
+        with self._condition:
+            return len(self._deadlines)
+
+
+# Global expiry index, updated whenever the validity of a session changes
+globalSessionExpiryIndex = SessionExpiryIndex()
+
+
 class KeepAliveThread(threading.Thread):
     """
     Session Information Data Structure
@@ -53,28 +158,110 @@ class KeepAliveThread(threading.Thread):
         threading.Thread.__init__(self)
         self.signal = True
         self.sessions = sessions
+        self._teardown_pool = WorkerPool(
+            'SessionTeardown', settings.SESSION_TEARDOWN_WORKERS,
+            settings.SESSION_TEARDOWN_QUEUE_SIZE)
         log.info(1, "Keep-Alive thread started...")
 
     def run(self):
         """
-        Checks for active sessions. If no keep-alive message was received in the last
-        n seconds, the session is closed.
+        Closes the sessions for which no keep-alive message was received in the last n
+        seconds. The thread sleeps until the next expiry deadline, and hands teardowns over to
+        a pool of workers. Sessions are closed SESSION_EXPIRY_GRACE_PERIOD seconds after their
+        deadline, once the keep-alive messages buffered by other processes are flushed
         """
+        last_synchronization = None
         while self.signal:
-            log.info(1, 'Checking for inactive sessions')
-            for session in self.sessions.all():
-                log.info(1, 'Session ' + str(session.id) +
-                         ' is valid until ' + str(session.valid_until))
-                if datetime.datetime.now() > session.valid_until:
-                    log.info(1, "Session " + str(session.id) +
-                             " timed out. Session will now be closed")
-                    session.status = SESSION_STATUS_STOPPING
-                    with transaction.atomic():
-                        session.save()
-                    if session.process_pid != -1:
-                        process_manager.ProcessManager.stop(session)
-                    if session.job_id is not None and session.job_id != '':
-                        job_manager.globalJobManager.stop(session)
-                    with transaction.atomic():
-                        session.delete()
-            time.sleep(KEEP_ALIVE_FREQUENCY)
+            now = datetime.datetime.now()
+            if last_synchronization is None or (now - last_synchronization).total_seconds() > \
+                    KEEP_ALIVE_FREQUENCY:
+                self.synchronize()
+                last_synchronization = now
+            expired_before = now - datetime.timedelta(seconds=settings.SESSION_EXPIRY_GRACE_PERIOD)
+            try:
+                for session_id in globalSessionExpiryIndex.pop_expired(expired_before):
+                    self.expire(session_id, expired_before)
+            # pylint: disable=W0703
+            except Exception as e:
+                log.error(str(e))
+            globalSessionExpiryIndex.wait(
+                KEEP_ALIVE_FREQUENCY - (datetime.datetime.now() -
+                                        last_synchronization).total_seconds(),
+                settings.SESSION_EXPIRY_GRACE_PERIOD)
+
+    def synchronize(self):
+        """
+        Rebuilds the expiry index from the database
+        """
+        log.info(1, 'Synchronizing session expiry index')
+        globalKeepAliveBuffer.flush()
+        deadlines = dict(
+            (session_id, self.deadline(status, valid_until)) for session_id, status, valid_until
+            in self.sessions.values_list('id', 'status', 'valid_until'))
+        # Keep-alive messages received since the flush are not in the database yet
+        for session_id, valid_until in globalKeepAliveBuffer.pending().items():
+            if session_id in deadlines:
+                deadlines[session_id] = max(deadlines[session_id], valid_until)
+        globalSessionExpiryIndex.reset(deadlines)
+
+    def expire(self, session_id, now):
+        """
+        Queues the teardown of an expired session
+        :param session_id: Id of the expired session
+        :param now: Date and time at which the session expired
+        """
+        if not self._teardown_pool.submit(self.teardown, session_id, now):
+            # Retry once the workers have caught up
+            globalSessionExpiryIndex.schedule(
+                session_id, now + datetime.timedelta(seconds=settings.SESSION_TEARDOWN_RETRY_DELAY))
+
+    def teardown(self, session_id, now):
+        """
+        Stops the rendering resource of an expired session and deletes the session. The
+        session is closed only if its validity was not extended in the meantime, for instance
+        by another process. Sessions already stopping are closed again once their stopping
+        grace period is over
+        :param session_id: Id of the expired session
+        :param now: Date and time before which the session must have expired
+        """
+        deadline = globalSessionExpiryIndex.deadline(session_id)
+        if deadline is not None and deadline > now:
+            # Kept alive after the expiry, the new deadline is already indexed
+            return
+        globalKeepAliveBuffer.flush()
+        stopping_until = now - datetime.timedelta(seconds=settings.SESSION_STOPPING_GRACE_PERIOD)
+        with transaction.atomic():
+            # The deadline is moved so that concurrent teardowns do not close the session twice
+            expired = self.sessions.filter(
+                (Q(valid_until__lte=now) & ~Q(status=SESSION_STATUS_STOPPING)) |
+                Q(valid_until__lte=stopping_until, status=SESSION_STATUS_STOPPING),
+                id=session_id).update(status=SESSION_STATUS_STOPPING, valid_until=now)
+        if expired == 0:
+            for status, valid_until in self.sessions.filter(id=session_id).values_list(
+                    'status', 'valid_until'):
+                globalSessionExpiryIndex.schedule(session_id, self.deadline(status, valid_until))
+            return
+        log.info(1, "Session " + str(session_id) + " timed out. Session will now be closed")
+        globalSessionRoutingTable.remove(session_id)
+        session = self.sessions.get(id=session_id)
+        if session.process_pid != -1:
+            process_manager.ProcessManager.stop(session)
+        if session.job_id is not None and session.job_id != '':
+            job_manager.globalJobManager.stop(session)
+        globalRendererConnectionPool.evict(session.http_host, session.http_port)
+        globalRendererLivenessCache.invalidate(session_id)
+        with transaction.atomic():
+            session.delete()
+        globalSessionStatusNotifier.forget(session_id)
+
+    @staticmethod
+    def deadline(status, valid_until):
+        """
+        Returns the date and time at which a session is torn down
+        :param status: Status of the session
+        :param valid_until: Date and time after which the session expires
+        :return: The expiry deadline, extended by the grace period of stopping sessions
+        """
+        if status == SESSION_STATUS_STOPPING:
+            return valid_until + datetime.timedelta(seconds=settings.SESSION_STOPPING_GRACE_PERIOD)
+        return valid_until
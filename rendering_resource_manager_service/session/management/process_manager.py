@@ -144,8 +144,8 @@ class ProcessManager(object):
             return [404, 'Process does not exist']
 
         try:
-            settings = \
-                manager.RenderingResourceSettings.objects.get(id=session_info.configuration_id)
+            settings = manager.RenderingResourceSettingsManager.get_by_id(
+                session_info.configuration_id.lower())
             if settings.graceful_exit:
                 try:
                     url = 'http://' + session_info.http_host + ':' + \
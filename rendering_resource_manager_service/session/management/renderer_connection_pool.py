@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=W0403
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+"""
+The renderer connection pool keeps HTTP keep-alive connections to the rendering resources,
+so that forwarded commands do not open a new TCP connection every time.
+"""
+
+import httplib
+import socket
+from contextlib import contextmanager
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
+import rendering_resource_manager_service.utils.custom_logging as log
+
+
+class _PipelineReader(object):
+    """
+    Buffered reader of a connection, handed to the successive responses of a pipeline. Data
+    read ahead by a response is kept for the next one
+    """
+
+    def __init__(self, sock):
+        self._file = sock.makefile('rb')
+
+    def makefile(self, *_):
+        """
+        :return: The reader itself, as httplib reads responses from the socket file
+        """
+        return self
+
+    def readline(self, *args):
+        """
+        Reads a line of the connection
+        """
+        return self._file.readline(*args)
+
+    def read(self, *args):
+        """
+        Reads data from the connection
+        """
+        return self._file.read(*args)
+
+    def close(self):
+        """
+        Responses close their file when they have been read, the connection stays open
+        """
+        pass
+
+
+def _format_request(host, port, method, command, headers, body):
+    """
+    Formats an HTTP/1.1 request sent to a rendering resource. Responses are read with httplib,
+    which does not decode compressed bodies, so the client's Accept-Encoding is not passed on
+    :return: The request, as a string
+    """
+    lines = [method + ' /' + command + ' HTTP/1.1', 'Host: ' + str(host) + ':' + str(port)]
+    for name, value in headers.items():
+        if name.lower() not in ('host', 'content-length', 'connection', 'transfer-encoding',
+                                'accept-encoding'):
+            lines.append(name + ': ' + value)
+    lines.append('Content-Length: ' + str(len(body)))
+    request = '\r\n'.join(lines) + '\r\n\r\n' + body
+    if isinstance(request, unicode):
+        request = request.encode('utf-8')
+    return request
+
+
+class RendererConnectionPool(object):
+    """
+    Process-wide pool of HTTP sessions, keyed by renderer endpoint
+    """
+
+    def __init__(self):
+        """
+        Setup the connection pool
+        """
+        self._mutex = Lock()
+        self._sessions = dict()
+        self._hits = 0
+        self._misses = 0
+
+    def session(self, host, port):
+        """
+        Returns the HTTP session holding the connections to the given renderer endpoint
+        :param host: Hostname of the rendering resource
+        :param port: Port of the rendering resource
+        :return: A requests session
+        """
+        key = (str(host), int(port))
+        with self._mutex:
+            session = self._sessions.get(key)
+            if session is not None:
+                self._hits += 1
+                return session
+            self._misses += 1
+            session = requests.Session()
+            session.mount('http://', HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=settings.RENDERER_POOL_MAX_CONNECTIONS,
+                pool_block=settings.RENDERER_POOL_BLOCK))
+            self._sessions[key] = session
+            return session
+
+    def request(self, host, port, method, command, **kwargs):
+        """
+        Sends an HTTP request to the given renderer endpoint using a pooled connection
+        :param host: Hostname of the rendering resource
+        :param port: Port of the rendering resource
+        :param method: HTTP method
+        :param command: Command passed to the rendering resource
+        :param kwargs: Extra arguments passed to requests
+        :return: A requests response
+        """
+        url = 'http://' + str(host) + ':' + str(port) + '/' + command
+        return self.session(host, port).request(method=method, url=url, **kwargs)
+
+    def pipeline(self, host, port, commands, headers=None, stop_on_failure=False, timeout=None):
+        """
+        Sends several requests to the given renderer endpoint over a single pooled keep-alive
+        connection. The requests are pipelined: at most RENDERER_PIPELINE_DEPTH requests are
+        written ahead of the responses, which are read in order, so that large bodies cannot
+        fill the socket buffers of both sides. When stopping on failure, each request is only
+        sent once the previous one has succeeded. If the connection fails before any response
+        is read, the requests are sent again once over a new connection
+        :param host: Hostname of the rendering resource
+        :param port: Port of the rendering resource
+        :param commands: List of (method, command, body) tuples
+        :param headers: Headers sent with every request
+        :param stop_on_failure: True to stop at the first command failing with an HTTP error
+                                status or a connection error
+        :param timeout: Socket timeout (in seconds)
+        :return: A list containing a (status, content type, content) tuple per executed
+                 command. The status and content type are None for commands that failed
+                 because of a connection error
+        """
+        if headers is None:
+            headers = dict()
+        results = []
+        for attempt in range(2):
+            try:
+                with self.connection(host, port, timeout, fresh=attempt > 0) as connection:
+                    self._exchange(
+                        connection, host, port, commands, headers, stop_on_failure, results)
+                break
+            except (socket.error, httplib.HTTPException) as e:
+                log.info(1, 'Pipeline to ' + str(host) + ':' + str(port) + ' failed: ' + str(e))
+                if attempt == 0 and not results and not isinstance(e, socket.timeout):
+                    # The rendering resource may have closed the pooled connection while it
+                    # was idle: like requests, retry once on a new connection
+                    continue
+                # Pipelined commands that were not answered have an unknown outcome
+                failed = 1
+                if not stop_on_failure:
+                    failed = len(commands) - len(results)
+                results.extend([(None, None, str(e))] * failed)
+                break
+        return results
+
+    @staticmethod
+    def _exchange(connection, host, port, commands, headers, stop_on_failure, results):
+        """
+        Sends the pipelined requests over a connection and reads their responses
+        :param connection: Connection to the rendering resource
+        :param host: Hostname of the rendering resource
+        :param port: Port of the rendering resource
+        :param commands: List of (method, command, body) tuples
+        :param headers: Headers sent with every request
+        :param stop_on_failure: True to stop at the first command failing with an HTTP error
+                                status
+        :param results: List to which a (status, content type, content) tuple is appended for
+                        each response
+        """
+        depth = 1 if stop_on_failure else max(1, settings.RENDERER_PIPELINE_DEPTH)
+        reader = _PipelineReader(connection.sock)
+        sent = 0
+        reusable = True
+        for index, (method, _, _) in enumerate(commands):
+            while sent < len(commands) and sent < index + depth:
+                method_sent, command, body = commands[sent]
+                connection.sock.sendall(
+                    _format_request(host, port, method_sent, command, headers, body))
+                sent += 1
+            response = httplib.HTTPResponse(reader, method=method)
+            response.begin()
+            results.append(
+                (response.status, response.getheader('Content-Type'), response.read()))
+            reusable = reusable and not response.will_close
+            if stop_on_failure and response.status >= 400:
+                break
+            if response.will_close and index < len(commands) - 1:
+                raise httplib.HTTPException('Connection closed by the rendering resource')
+        if not reusable:
+            connection.close()
+
+    @contextmanager
+    def connection(self, host, port, timeout=None, fresh=False):
+        """
+        Borrows a connected keep-alive connection to the given renderer endpoint, for
+        exchanges that requests cannot express, such as pipelining. The connection goes back
+        to the pool when the block exits, and is closed if the block raises an exception.
+        Borrowing relies on the connection pool of the urllib3 bundled with requests (pinned
+        in requirements.txt). If it is not available, a new connection is used and closed
+        :param host: Hostname of the rendering resource
+        :param port: Port of the rendering resource
+        :param timeout: Socket timeout (in seconds)
+        :param fresh: True to reconnect a pooled connection instead of reusing it
+        :return: An httplib connection
+        """
+        url = 'http://' + str(host) + ':' + str(port)
+        connection_pool = self.session(host, port).get_adapter(url).poolmanager. \
+            connection_from_url(url)
+        get_connection = getattr(connection_pool, '_get_conn', None)
+        put_connection = getattr(connection_pool, '_put_conn', None)
+        if get_connection is None or put_connection is None:
+            log.debug(1, 'Connection pool does not lend connections, connecting to ' + url)
+            connection = httplib.HTTPConnection(str(host), int(port), timeout=timeout)
+        else:
+            connection = get_connection()
+        try:
+            if fresh:
+                connection.close()
+            if connection.sock is None:
+                connection.timeout = timeout
+                connection.connect()
+            connection.sock.settimeout(timeout)
+            yield connection
+        # pylint: disable=W0702
+        except:
+            connection.close()
+            raise
+        finally:
+            if put_connection is None:
+                connection.close()
+            else:
+                put_connection(connection)
+
+    def evict(self, host, port):
+        """
+        Closes the connections to the given renderer endpoint
+        :param host: Hostname of the rendering resource
+        :param port: Port of the rendering resource
+        """
+        with self._mutex:
+            session = self._sessions.pop((str(host), int(port)), None)
+        if session is not None:
+            log.info(1, 'Closing connections to ' + str(host) + ':' + str(port))
+            session.close()
+
+    def statistics(self):
+        """
+        Returns the pool usage counters
+        :return: A dictionary containing the number of hits, misses and pooled endpoints
+        """
+        with self._mutex:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'endpoints': len(self._sessions)
+            }
+
+
+# Global connection pool used for all requests sent to rendering resources
+globalRendererConnectionPool = RendererConnectionPool()
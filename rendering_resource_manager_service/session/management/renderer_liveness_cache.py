@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=W0403
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+"""
+The renderer liveness cache keeps the result of the last probe sent to each rendering
+resource, so that sessions polled by many viewers do not probe their renderer every time
+"""
+
+import time
+
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
+from rendering_resource_manager_service.utils.cache import LocalCache
+from rendering_resource_manager_service.utils.single_flight import SingleFlight
+
+
+class RendererLivenessCache(object):
+    """
+    Per-session probe results, valid for RENDERER_LIVENESS_TTL seconds. Concurrent probes of
+    the same session are collapsed into a single request to the renderer
+    """
+
+    def __init__(self):
+        """
+        Setup the cache
+        """
+        self._probes = LocalCache(
+            'renderer-liveness', settings.RENDERER_LIVENESS_RETENTION,
+            settings.RENDERER_LIVENESS_MAX_ENTRIES)
+        self._single_flight = SingleFlight('Renderer probe')
+
+    def probe(self, session_id, function):
+        """
+        Returns the cached probe result of the given session, or probes the renderer if the
+        cached result has expired
+        :param session_id: Id of the session
+        :param function: Function probing the renderer, called with the session id. It returns
+                         a list starting with an HTTP status code
+        :return: A tuple containing the probe result and its age (in seconds)
+        """
+        probe = self._probes.get_entry(session_id, settings.RENDERER_LIVENESS_TTL)
+        if probe is not None:
+            return probe
+        result = self._single_flight.do(session_id, self._probe, session_id, function)
+        if result[0][0] == 404:
+            # The session is destroyed when its job has been cancelled
+            self.invalidate(session_id)
+        return result[0], time.time() - result[1]
+
+    def record(self, session_id, result):
+        """
+        Stores the result of a probe made outside of the cache, for instance by the
+        background prober
+        :param session_id: Id of the session
+        :param result: Probe result
+        """
+        self._probes.set(session_id, result)
+
+    def age(self, session_id):
+        """
+        :param session_id: Id of the session
+        :return: The age of the last probe result of the session (in seconds), 0 if the
+                 session was never probed
+        """
+        probe = self._probes.get_entry(session_id)
+        if probe is None:
+            return 0
+        return probe[1]
+
+    def invalidate(self, session_id):
+        """
+        Forgets the probe result of the given session
+        :param session_id: Id of the session
+        """
+        self._probes.delete(session_id)
+
+    def statistics(self):
+        """
+        Returns the cache usage counters
+        :return: A dictionary containing the number of lookups served from the cache, and the
+                 number of probes executed and shared between concurrent requests
+        """
+        statistics = self._probes.statistics()
+        statistics['sessions'] = statistics.pop('entries')
+        statistics.update(self._single_flight.statistics())
+        return statistics
+
+    def _probe(self, session_id, function):
+        """
+        Probes the renderer and stores the result
+        :param session_id: Id of the session
+        :param function: Function probing the renderer
+        :return: A tuple containing the probe result and its timestamp
+        """
+        result = function(session_id)
+        self.record(session_id, result)
+        return result, time.time()
+
+
+# Global liveness cache used by the session status queries
+globalRendererLivenessCache = RendererLivenessCache()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=W0403
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+"""
+The renderer prober watches the rendering resources of the starting, running and busy
+sessions in the background, and updates the session status when a renderer becomes ready,
+busy or responsive again. Session status queries then only read the session table
+"""
+
+import threading
+import time
+
+from django.db import close_old_connections
+import requests
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
+import rendering_resource_manager_service.service.settings as global_settings
+import rendering_resource_manager_service.utils.custom_logging as log
+from rendering_resource_manager_service.session.models import Session, \
+    SESSION_STATUS_STARTING, SESSION_STATUS_RUNNING, SESSION_STATUS_BUSY
+from rendering_resource_manager_service.utils.worker_pool import WorkerPool
+from job_manager import globalJobManager
+from renderer_connection_pool import globalRendererConnectionPool
+from renderer_liveness_cache import globalRendererLivenessCache
+
+
+# Statuses of the sessions watched by the prober
+PROBED_STATUSES = [SESSION_STATUS_STARTING, SESSION_STATUS_RUNNING, SESSION_STATUS_BUSY]
+
+
+class RendererProber(threading.Thread):
+    """
+    Background thread scheduling renderer probes. Starting sessions are probed every
+    RENDERER_PROBE_MIN_INTERVAL seconds. The interval doubles after every successful probe of a
+    healthy renderer, up to RENDERER_PROBE_MAX_INTERVAL, and is reset on every status change.
+    Probes are executed by a pool of workers, with at most RENDERER_PROBE_MAX_PER_HOST
+    concurrent probes per host
+    """
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.signal = True
+        self._mutex = threading.Lock()
+        self._schedule = dict()
+        self._in_flight = dict()
+        self._probes = 0
+        self._deferred = 0
+        self._transitions = 0
+        self._pool = WorkerPool(
+            'RendererProbe', settings.RENDERER_PROBE_WORKERS, settings.RENDERER_PROBE_QUEUE_SIZE)
+
+    def is_active(self):
+        """
+        :return: True if the prober is running, in which case session status queries do not
+                 need to probe the renderers themselves
+        """
+        return self.is_alive() and self.signal
+
+    def run(self):
+        """
+        Looks for due probes every RENDERER_PROBE_TICK seconds
+        """
+        log.info(1, 'Renderer prober started...')
+        while self.signal:
+            try:
+                self.tick(time.time())
+            # pylint: disable=W0703
+            except Exception as e:
+                log.error(str(e))
+            close_old_connections()
+            time.sleep(settings.RENDERER_PROBE_TICK)
+
+    def tick(self, now):
+        """
+        Synchronizes the probe schedule with the session table and submits the due probes
+        :param now: Current time
+        """
+        # pylint: disable=E1101
+        sessions = Session.objects.filter(status__in=PROBED_STATUSES).values_list(
+            'id', 'status', 'http_host', 'http_port')
+        watched = set()
+        for session_id, status, http_host, http_port in sessions:
+            watched.add(session_id)
+            if not http_host:
+                continue
+            with self._mutex:
+                schedule = self._schedule.get(session_id)
+                if schedule is None or schedule['status'] != status:
+                    # New session, or status changed by someone else: probe now
+                    schedule = {'status': status, 'due': now,
+                                'interval': settings.RENDERER_PROBE_MIN_INTERVAL}
+                    self._schedule[session_id] = schedule
+                if schedule['due'] > now or schedule.get('probing'):
+                    continue
+                if self._in_flight.get(http_host, 0) >= settings.RENDERER_PROBE_MAX_PER_HOST:
+                    self._deferred += 1
+                    continue
+                self._in_flight[http_host] = self._in_flight.get(http_host, 0) + 1
+                schedule['probing'] = True
+            if not self._pool.submit(self.probe, session_id, status, http_host, http_port):
+                self._probe_done(session_id, http_host, None)
+
+        with self._mutex:
+            for session_id in self._schedule.keys():
+                if session_id not in watched:
+                    del self._schedule[session_id]
+
+    def probe(self, session_id, status, http_host, http_port):
+        """
+        Probes the renderer of a session and applies the resulting status transition
+        :param session_id: Id of the session
+        :param status: Status of the session when the probe was scheduled
+        :param http_host: Hostname of the rendering resource
+        :param http_port: Port of the rendering resource
+        """
+        outcome = None
+        try:
+            try:
+                response = globalRendererConnectionPool.request(
+                    http_host, http_port,
+                    settings.REST_VERB_PUT, settings.RR_SPECIFIC_COMMAND_VOCABULARY,
+                    timeout=global_settings.REQUEST_TIMEOUT)
+                result = [200, response.text]
+                response.close()
+                healthy = True
+            except requests.exceptions.RequestException as e:
+                result = [503, str(e)]
+                healthy = False
+            with self._mutex:
+                self._probes += 1
+            globalRendererLivenessCache.record(session_id, result)
+
+            new_status = None
+            if healthy and status in [SESSION_STATUS_STARTING, SESSION_STATUS_BUSY]:
+                new_status = SESSION_STATUS_RUNNING
+            elif not healthy and status == SESSION_STATUS_RUNNING:
+                new_status = SESSION_STATUS_BUSY
+            elif not healthy and status == SESSION_STATUS_BUSY:
+                self._check_job(session_id)
+
+            # The probed values are all the transition needs, the session is not read again.
+            # The routing table and the status notifier are updated by the transition
+            session = Session(
+                id=session_id, status=status, http_host=http_host, http_port=http_port)
+            if new_status is not None and session.transition(new_status, expected=status):
+                log.info(1, 'Session ' + str(session_id) + ' is now ' + str(new_status))
+                with self._mutex:
+                    self._transitions += 1
+                outcome = False
+            else:
+                outcome = healthy
+        finally:
+            self._probe_done(session_id, http_host, outcome)
+
+    def statistics(self):
+        """
+        Returns the prober counters
+        :return: A dictionary containing the number of watched sessions, executed probes,
+                 probes deferred because of the per-host limit and applied status transitions
+        """
+        with self._mutex:
+            return {
+                'sessions': len(self._schedule),
+                'probes': self._probes,
+                'deferred': self._deferred,
+                'transitions': self._transitions
+            }
+
+    def _probe_done(self, session_id, http_host, healthy):
+        """
+        Releases the host slot of a probe and schedules the next one
+        :param session_id: Id of the session
+        :param http_host: Hostname of the rendering resource
+        :param healthy: True if the renderer is healthy and its status is unchanged, in which
+                        case the probe interval is increased. False if the interval must be
+                        reset. None if the probe did not complete
+        """
+        with self._mutex:
+            self._in_flight[http_host] -= 1
+            if self._in_flight[http_host] == 0:
+                del self._in_flight[http_host]
+            schedule = self._schedule.get(session_id)
+            if schedule is None:
+                return
+            schedule['probing'] = False
+            if healthy:
+                schedule['interval'] = min(
+                    schedule['interval'] * 2, settings.RENDERER_PROBE_MAX_INTERVAL)
+            elif healthy is not None:
+                schedule['interval'] = settings.RENDERER_PROBE_MIN_INTERVAL
+            schedule['due'] = time.time() + schedule['interval']
+
+    @staticmethod
+    def _check_job(session_id):
+        """
+        Destroys the session if the job of an unresponsive renderer has been cancelled
+        :param session_id: Id of the session
+        """
+        # Imported here since the session manager depends on the modules imported above
+        from session_manager import SessionManager
+        try:
+            # pylint: disable=E1101
+            session = Session.objects.get(id=session_id)
+        except Session.DoesNotExist:
+            return
+        if not session.job_id:
+            return
+        try:
+            hostname = globalJobManager.hostname(session)
+        except AttributeError as e:
+            log.error(str(e))
+            return
+        if hostname == '':
+            log.info(1, 'Job has been cancelled. Destroying session ' + str(session_id))
+            SessionManager.delete_session(session_id)
+
+
+# Global renderer prober, started by the WSGI application
+globalRendererProber = RendererProber()
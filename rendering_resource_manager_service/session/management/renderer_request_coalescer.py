@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=W0403
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+"""
+The renderer request coalescer merges the identical GET commands that many viewers of the
+same session send at the same time into a single request to the rendering resource
+"""
+
+from threading import Lock
+import requests
+
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
+import rendering_resource_manager_service.utils.custom_logging as log
+from rendering_resource_manager_service.utils.cache import LocalCache
+from rendering_resource_manager_service.utils.single_flight import SingleFlight
+
+
+class RendererRequestCoalescer(object):
+    """
+    Single-flight execution of renderer GET commands, with an optional micro-cache of the
+    successful responses
+    """
+
+    def __init__(self):
+        """
+        Setup the coalescer
+        """
+        self._single_flight = SingleFlight('Renderer GET')
+        self._responses = LocalCache(
+            'renderer-responses', settings.RENDERER_COALESCING_WINDOW,
+            settings.RENDERER_COALESCING_MAX_ENTRIES)
+        self._mutex = Lock()
+        self._requests = 0
+        self._cached = 0
+
+    @staticmethod
+    def key(session_id, command, headers):
+        """
+        Builds the key identifying equivalent GET commands
+        :param session_id: Id of the session
+        :param command: Command passed to the rendering resource, including its query string
+        :param headers: Headers of the request
+        :return: The key
+        """
+        return (str(session_id), command) + tuple(
+            headers.get(name) for name in settings.RENDERER_COALESCING_HEADERS)
+
+    def get(self, key, function, *args):
+        """
+        Returns the response of a GET command, shared with the identical commands in flight
+        or received within the micro-cache window
+        :param key: Key returned by the key method
+        :param function: Function sending the command to the rendering resource. It returns a
+                         tuple starting with the HTTP status code of the response
+        :param args: Arguments passed to the function
+        :return: The result of the function
+        """
+        response, call = self.join(key)
+        if response is not None:
+            return response
+        if call is None:
+            return function(*args)
+        try:
+            response = function(*args)
+        # pylint: disable=W0703
+        except Exception as e:
+            self.share(key, call, error=e)
+            raise
+        self.share(key, call, response)
+        return response
+
+    def join(self, key):
+        """
+        Returns the response of an identical GET command in flight or received within the
+        micro-cache window. When there is none, the caller sends the command and completes the
+        returned call with the share or stream method. The response of a command in flight is
+        awaited for RENDERER_COALESCING_TIMEOUT seconds at most, since it is only shared once
+        its own client has read it. After that, the caller sends the command without sharing
+        it
+        :param key: Key returned by the key method
+        :return: A tuple containing the shared response and None, None and the call to
+                 complete, or None and None if the command must be sent without sharing it
+        """
+        with self._mutex:
+            self._requests += 1
+        while True:
+            if settings.RENDERER_COALESCING_WINDOW > 0:
+                response = self._responses.get(key)
+                if response is not None:
+                    with self._mutex:
+                        self._cached += 1
+                    return response, None
+            call, leader = self._single_flight.begin(key)
+            if leader:
+                return None, call
+            completed, response = self._single_flight.wait(
+                call, settings.RENDERER_COALESCING_TIMEOUT)
+            if not completed:
+                log.info(1, 'Renderer GET for ' + str(key) + ' still in flight, sending it again')
+                return None, None
+            if response is not None:
+                return response, None
+            # The call in flight ended without a complete response: send the command again
+
+    def share(self, key, call, response=None, error=None):
+        """
+        Completes a call returned by the join method. Successful responses are kept for the
+        micro-cache window
+        :param key: Key returned by the key method
+        :param call: Call returned by the join method
+        :param response: Response of the rendering resource, None if it could not be read
+                         entirely, in which case the waiting commands are sent again
+        :param error: Exception raised for the waiting commands instead of sharing a response
+        """
+        if settings.RENDERER_COALESCING_WINDOW > 0 and response is not None and \
+                response[0] == 200:
+            self._responses.set(key, response, settings.RENDERER_COALESCING_WINDOW)
+        self._single_flight.end(key, call, response, error)
+
+    def stream(self, key, call, response):
+        """
+        Passes the body of a streamed response through and shares it, once read entirely,
+        with the identical GET commands received meanwhile
+        :param key: Key returned by the key method
+        :param call: Call returned by the join method
+        :param response: Streamed response of the rendering resource
+        :return: An iterable over the chunks of the body, completing the call when closed
+        """
+        return _SharedStream(self, key, call, response)
+
+    def statistics(self):
+        """
+        Returns the coalescing counters
+        :return: A dictionary containing the number of GET commands, of requests sent to the
+                 rendering resources, of responses served from the micro-cache or shared with
+                 a request in flight, and the fan-out ratio (commands per request sent)
+        """
+        statistics = self._single_flight.statistics()
+        with self._mutex:
+            statistics['requests'] = self._requests
+            statistics['cached'] = self._cached
+        statistics['fan_out'] = 0.0
+        if statistics['executions'] != 0:
+            statistics['fan_out'] = float(statistics['requests']) / statistics['executions']
+        return statistics
+
+
+class _SharedStream(object):
+    """
+    Body of a streamed GET response, kept in memory while it is passed through so that it can
+    be shared. Closing the stream completes the coalesced call, even if the client went away
+    before reading it
+    """
+
+    def __init__(self, coalescer, key, call, response):
+        self._coalescer = coalescer
+        self._key = key
+        self._call = call
+        self._response = response
+        self._chunks = response.iter_content(settings.PROXY_STREAMING_CHUNK_SIZE)
+        self._data = []
+        self._complete = False
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        """
+        Returns the next chunk of the body
+        """
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._complete = True
+            raise
+        except requests.exceptions.RequestException as e:
+            log.error(str(e))
+            raise StopIteration
+        self._data.append(chunk)
+        return chunk
+
+    def close(self):
+        """
+        Releases the response and shares the body with the waiting commands
+        """
+        if self._call is None:
+            return
+        self._response.close()
+        shared = None
+        if self._complete:
+            shared = (self._response.status_code,
+                      self._response.headers.get('Content-Type', 'text/html; charset=utf-8'),
+                      ''.join(self._data))
+        self._coalescer.share(self._key, self._call, shared)
+        self._call = None
+
+
+# Global coalescer used for the GET commands forwarded to rendering resources
+globalRendererRequestCoalescer = RendererRequestCoalescer()
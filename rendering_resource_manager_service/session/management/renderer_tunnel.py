@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=W0403
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+"""
+Renderer tunnels relay the WebSocket (or any other upgraded) connection of a viewer to its
+rendering resource. The session is checked once when the tunnel is opened, then bytes are
+passed through in both directions without going through the HTTP proxy
+"""
+
+import errno
+import select
+import socket
+import struct
+import threading
+
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
+import rendering_resource_manager_service.utils.custom_logging as log
+
+# Headers of the viewer that are replaced when the handshake is sent to the rendering resource
+TUNNEL_REWRITTEN_HEADERS = ('Host', 'Content-Length')
+
+
+class WebSocketFrameCounter(object):
+    """
+    Counts the WebSocket frames of a byte stream, fed in arbitrary chunks. Only frame headers
+    are decoded, payloads are skipped
+    """
+
+    def __init__(self, skip_http_header=False):
+        """
+        :param skip_http_header: True if the stream starts with an HTTP header, for instance
+                                 the handshake response of the rendering resource
+        """
+        self.frames = 0
+        self._in_http_header = skip_http_header
+        self._http_tail = ''
+        self._header = ''
+        self._remaining = 0
+
+    def feed(self, data):
+        """
+        Processes the next chunk of the stream
+        :param data: Bytes of the stream
+        """
+        if self._in_http_header:
+            data = self._http_tail + data
+            end = data.find('\r\n\r\n')
+            if end == -1:
+                self._http_tail = data[-3:]
+                return
+            self._in_http_header = False
+            self._http_tail = ''
+            data = data[end + 4:]
+        position = 0
+        while position < len(data):
+            if self._remaining > 0:
+                skipped = min(self._remaining, len(data) - position)
+                self._remaining -= skipped
+                position += skipped
+                continue
+            taken = data[position:position + self._header_length() - len(self._header)]
+            self._header += taken
+            position += len(taken)
+            if len(self._header) < self._header_length():
+                continue
+            self._remaining = self._payload_length()
+            self._header = ''
+            self.frames += 1
+
+    def _header_length(self):
+        """
+        :return: The length of the current frame header, as far as it is known
+        """
+        if len(self._header) < 2:
+            return 2
+        second_byte = ord(self._header[1])
+        length = 2
+        if second_byte & 0x7f == 126:
+            length += 2
+        elif second_byte & 0x7f == 127:
+            length += 8
+        if second_byte & 0x80:
+            # Masking key
+            length += 4
+        return length
+
+    def _payload_length(self):
+        """
+        :return: The payload length of the frame whose header is complete
+        """
+        length = ord(self._header[1]) & 0x7f
+        if length == 126:
+            return struct.unpack('!H', self._header[2:4])[0]
+        if length == 127:
+            return struct.unpack('!Q', self._header[2:10])[0]
+        return length
+
+
+class RendererTunnel(object):
+    """
+    Bidirectional relay between a viewer connection and a rendering resource connection,
+    using non-blocking sockets multiplexed with poll
+    """
+
+    def __init__(self, session_id, client, renderer):
+        """
+        :param session_id: Id of the session
+        :param client: Socket connected to the viewer
+        :param renderer: Socket connected to the rendering resource, on which the handshake
+                         has been sent
+        """
+        self.session_id = session_id
+        self._client = client
+        self._renderer = renderer
+        self._client_fd = client.fileno()
+        self._renderer_fd = renderer.fileno()
+        self._sockets = {client.fileno(): client, renderer.fileno(): renderer}
+        self._peers = {client.fileno(): renderer.fileno(), renderer.fileno(): client.fileno()}
+        # Bytes waiting to be written to each socket
+        self._pending = {client.fileno(): '', renderer.fileno(): ''}
+        self._frame_counters = {
+            client.fileno(): WebSocketFrameCounter(),
+            renderer.fileno(): WebSocketFrameCounter(skip_http_header=True)}
+        self._bytes_read = {client.fileno(): 0, renderer.fileno(): 0}
+
+    def relay(self, idle_timeout=None):
+        """
+        Relays data until one of the connections is closed, or until no data went through for
+        the given time. Data read before a connection is closed is still delivered to the
+        other side
+        :param idle_timeout: Idle timeout (in seconds). Defaults to RENDERER_TUNNEL_IDLE_TIMEOUT
+        """
+        if idle_timeout is None:
+            idle_timeout = settings.RENDERER_TUNNEL_IDLE_TIMEOUT
+        for connection in self._sockets.values():
+            connection.setblocking(0)
+        poller = select.poll()
+        closing = False
+        while True:
+            if closing and not any(self._pending.values()):
+                break
+            for fd in self._sockets:
+                events = 0
+                # Stop reading when the other side does not keep up
+                if not closing and \
+                        len(self._pending[self._peers[fd]]) < settings.RENDERER_TUNNEL_BUFFER_SIZE:
+                    events |= select.POLLIN
+                if self._pending[fd]:
+                    events |= select.POLLOUT
+                poller.register(fd, events)
+            ready = poller.poll(idle_timeout * 1000)
+            if not ready:
+                log.info(1, 'Tunnel of session ' + str(self.session_id) + ' is idle, closing')
+                break
+            for fd, event in ready:
+                if event & select.POLLOUT:
+                    self._write(fd)
+                if not closing and event & (select.POLLIN | select.POLLHUP | select.POLLERR):
+                    closing = not self._read(fd)
+        self.close()
+
+    def close(self):
+        """
+        Shuts both connections down
+        """
+        for connection in self._sockets.values():
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+        self._renderer.close()
+
+    def statistics(self):
+        """
+        :return: A dictionary containing the number of bytes and frames sent by the viewer
+                 (up) and by the rendering resource (down)
+        """
+        return {
+            'bytes_up': self._bytes_read[self._client_fd],
+            'bytes_down': self._bytes_read[self._renderer_fd],
+            'frames_up': self._frame_counters[self._client_fd].frames,
+            'frames_down': self._frame_counters[self._renderer_fd].frames
+        }
+
+    def _read(self, fd):
+        """
+        Reads available data from a socket and queues it for the other side
+        :param fd: File descriptor of the socket
+        :return: False if the connection is closed
+        """
+        try:
+            data = self._sockets[fd].recv(settings.RENDERER_TUNNEL_BUFFER_SIZE)
+        except socket.error as e:
+            if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return True
+            data = ''
+        if not data:
+            return False
+        self._bytes_read[fd] += len(data)
+        self._frame_counters[fd].feed(data)
+        self._pending[self._peers[fd]] += data
+        return True
+
+    def _write(self, fd):
+        """
+        Writes as much queued data as possible to a socket. Data that cannot be delivered
+        because the connection is broken is dropped
+        :param fd: File descriptor of the socket
+        """
+        try:
+            sent = self._sockets[fd].send(self._pending[fd])
+            self._pending[fd] = self._pending[fd][sent:]
+        except socket.error as e:
+            if e.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                self._pending[fd] = ''
+
+
+class RendererTunnels(object):
+    """
+    Registry of the open tunnels, keeping the counters of the closed ones
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._tunnels = set()
+        self._opened = 0
+        self._totals = {'bytes_up': 0, 'bytes_down': 0, 'frames_up': 0, 'frames_down': 0}
+
+    def open(self, session_id, client, http_host, http_port, handshake):
+        """
+        Connects to a rendering resource and sends the handshake of the viewer
+        :param session_id: Id of the session
+        :param client: Socket connected to the viewer
+        :param http_host: Hostname of the rendering resource
+        :param http_port: Port of the rendering resource
+        :param handshake: Upgrade request sent to the rendering resource
+        :return: The tunnel, ready to relay
+        :raise socket.error: if the rendering resource cannot be reached
+        """
+        renderer = socket.create_connection(
+            (http_host, int(http_port)), settings.global_settings.REQUEST_TIMEOUT)
+        try:
+            renderer.sendall(handshake)
+        except socket.error:
+            renderer.close()
+            raise
+        tunnel = RendererTunnel(session_id, client, renderer)
+        with self._mutex:
+            self._tunnels.add(tunnel)
+            self._opened += 1
+        return tunnel
+
+    def relay(self, tunnel):
+        """
+        Relays the data of a tunnel until it is closed, and records its counters
+        :param tunnel: Tunnel returned by open
+        """
+        try:
+            tunnel.relay()
+        finally:
+            statistics = tunnel.statistics()
+            with self._mutex:
+                self._tunnels.discard(tunnel)
+                for name, value in statistics.items():
+                    self._totals[name] += value
+            log.info(1, 'Tunnel of session ' + str(tunnel.session_id) + ' closed: ' +
+                     str(statistics))
+
+    def statistics(self):
+        """
+        :return: A dictionary containing the number of open and opened tunnels, and the
+                 bytes and frames relayed by the closed tunnels
+        """
+        with self._mutex:
+            statistics = dict(self._totals)
+            statistics['active'] = len(self._tunnels)
+            statistics['opened'] = self._opened
+            return statistics
+
+
+def handshake(method, path, headers, http_host, http_port):
+    """
+    Builds the upgrade request sent to a rendering resource
+    :param method: HTTP method of the viewer request
+    :param path: Path of the WebSocket endpoint on the rendering resource, with its query
+    :param headers: Headers of the viewer request
+    :param http_host: Hostname of the rendering resource
+    :param http_port: Port of the rendering resource
+    :return: The request, as a string
+    """
+    lines = [method + ' /' + path.lstrip('/') + ' HTTP/1.1',
+             'Host: ' + http_host + ':' + str(http_port)]
+    for name, value in sorted(headers.items()):
+        if name not in TUNNEL_REWRITTEN_HEADERS:
+            lines.append(name + ': ' + value)
+    return '\r\n'.join(lines) + '\r\n\r\n'
+
+
+# Global tunnel registry
+globalRendererTunnels = RendererTunnels()
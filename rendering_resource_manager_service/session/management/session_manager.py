@@ -30,13 +30,15 @@ This class is in charge of handling session and ensures persistent storage in a
 """
 
 import requests
+import base64
 import datetime
+import random
 import uuid
 import json
 
 from django.db import IntegrityError, transaction
-from django.http import HttpResponse
-from rendering_resource_manager_service.config.models import SystemGlobalSettings
+from rendering_resource_manager_service.config.management.system_global_settings_manager \
+    import SystemGlobalSettingsManager
 from rendering_resource_manager_service.session.models import Session, \
     SESSION_STATUS_STOPPED, SESSION_STATUS_SCHEDULED, SESSION_STATUS_STARTING, \
     SESSION_STATUS_RUNNING, SESSION_STATUS_STOPPING, SESSION_STATUS_BUSY, \
@@ -46,28 +48,28 @@ from rest_framework.parsers import JSONParser
 import rest_framework.status as http_status
 import rendering_resource_manager_service.utils.custom_logging as log
 import rendering_resource_manager_service.session.management.session_manager_settings as consts
-from rendering_resource_manager_service.session.management import keep_alive_thread
 from rendering_resource_manager_service.config.management import \
     rendering_resource_settings_manager as manager
 import rendering_resource_manager_service.service.settings as global_settings
+from rendering_resource_manager_service.utils.worker_pool import WorkerPool
+import job_manager
 from job_manager import globalJobManager
+from renderer_connection_pool import globalRendererConnectionPool
+from keep_alive_thread import globalSessionExpiryIndex
+from keep_alive_buffer import globalKeepAliveBuffer
+from renderer_liveness_cache import globalRendererLivenessCache
+from renderer_prober import globalRendererProber
+from session_status_notifier import globalSessionStatusNotifier
+from session_routing_table import globalSessionRoutingTable
+from renderer_tunnel import globalRendererTunnels
+from renderer_request_coalescer import globalRendererRequestCoalescer
+from ssh_connection_pool import globalSshConnectionPool
 import process_manager
 
 
-class JSONResponse(HttpResponse):
-    """
-    This class constructs HTTP response with JSON formatted body
-    """
-    def __len__(self):
-        pass
-
-    def __getitem__(self, item):
-        pass
-
-    def __init__(self, data, **kwargs):
-        content = JSONRenderer().render(data)
-        kwargs['content_type'] = 'application/json'
-        super(JSONResponse, self).__init__(content, **kwargs)
+# Worker pool stopping the rendering resources of sessions deleted in bulk
+globalSessionBulkPool = WorkerPool(
+    'SessionBulk', consts.SESSION_BULK_WORKERS, consts.SESSION_BULK_QUEUE_SIZE)
 
 
 class SessionManager(object):
@@ -78,16 +80,10 @@ class SessionManager(object):
     def __init__(self):
         """
         Initializes the SessionManager class and creates the global config if
-        they do not already exist in the database
+        they do not already exist in the database. The global config is cached, so that this
+        does not cost a database query for every request
         """
-        try:
-            SystemGlobalSettings.objects.get(id=0)
-        except SystemGlobalSettings.DoesNotExist:
-            sgs = SystemGlobalSettings(
-                id=0,
-                session_creation=True,
-                session_keep_alive_timeout=keep_alive_thread.KEEP_ALIVE_TIMEOUT)
-            sgs.save(force_insert=True)
+        SystemGlobalSettingsManager.get()
 
     @classmethod
     def create_session(cls, session_id, owner, configuration_id):
@@ -98,7 +94,7 @@ class SessionManager(object):
         :param configuration_id: Id of the configuration associated to the session
         :rtype A tuple containing the status and the description of the potential error
         """
-        sgs = SystemGlobalSettings.objects.get()
+        sgs = SystemGlobalSettingsManager.get()
         if sgs.session_creation:
             try:
                 session = Session(
@@ -110,6 +106,7 @@ class SessionManager(object):
                     datetime.timedelta(seconds=sgs.session_keep_alive_timeout))
                 with transaction.atomic():
                     session.save(force_insert=True)
+                globalSessionExpiryIndex.schedule(session.id, session.valid_until)
                 msg = 'Session successfully created'
                 log.debug(1, msg)
                 response = json.dumps({'contents': msg})
@@ -165,14 +162,11 @@ class SessionManager(object):
         try:
             session = Session.objects.get(id=session_id)
             log.info(1, 'Removing session ' + str(session_id))
-            session.status = SESSION_STATUS_STOPPING
-            session.save()
-            if session.process_pid != -1:
-                process_manager.ProcessManager.stop(session)
-            if session.job_id is not None and session.job_id != '':
-                globalJobManager.stop(session)
-                globalJobManager.kill(session)
+            cls.__forget_session(session.id)
+            session.transition(SESSION_STATUS_STOPPING)
+            cls.stop_rendering_resource(session)
             session.delete()
+            globalSessionStatusNotifier.forget(session_id)
             msg = 'Session successfully destroyed'
             log.info(1, msg)
             response = json.dumps({'contents': str(msg)})
@@ -191,13 +185,296 @@ class SessionManager(object):
         return [http_status.HTTP_200_OK, response]
 
     @classmethod
-    def list_sessions(cls, serializer):
+    def create_sessions(cls, owner, configuration_id, count):
+        """
+        Creates several user sessions, written to the database with bulk inserts
+        :param owner: Owner of the sessions
+        :param configuration_id: Id of the configuration associated to the sessions
+        :param count: Number of sessions to create
+        :rtype A tuple containing the status and a JSON string with the result of every
+               creation, or a potential error description
+        """
+        if count < 1 or count > consts.SESSION_BULK_MAX_ITEMS:
+            return cls.__bulk_size_error()
+        sgs = SystemGlobalSettingsManager.get()
+        if not sgs.session_creation:
+            msg = 'Session creation is currently suspended'
+            log.error(msg)
+            return [http_status.HTTP_403_FORBIDDEN, json.dumps({'contents': msg})]
+        created = datetime.datetime.utcnow()
+        valid_until = datetime.datetime.now() + \
+            datetime.timedelta(seconds=sgs.session_keep_alive_timeout)
+        sessions = [Session(id=str(cls.get_session_id()), owner=owner,
+                            configuration_id=configuration_id, created=created,
+                            valid_until=valid_until) for _ in range(count)]
+        try:
+            with transaction.atomic():
+                # pylint: disable=E1101
+                Session.objects.bulk_create(sessions, batch_size=consts.SESSION_BULK_BATCH_SIZE)
+        except IntegrityError as e:
+            log.error(e)
+            return [http_status.HTTP_409_CONFLICT, json.dumps({'contents': str(e)})]
+        results = []
+        for session in sessions:
+            globalSessionExpiryIndex.schedule(session.id, session.valid_until)
+            results.append({
+                'session_id': session.id,
+                'status': http_status.HTTP_201_CREATED,
+                'contents': 'Session successfully created'})
+        log.info(1, str(count) + ' sessions created for ' + str(owner))
+        return [http_status.HTTP_201_CREATED, json.dumps({'contents': results})]
+
+    @classmethod
+    def schedule_jobs(cls, session_ids, job_information, auth_token=None):
+        """
+        Schedules a job for each of the given sessions. The sessions are moved to the
+        scheduling status with a single UPDATE statement, and the job submissions are queued
+        to the job submission pool. Sessions that are not stopped or failed already have a job
+        and are left untouched
+        :param session_ids: Ids of the sessions
+        :param job_information: Information about the jobs
+        :param auth_token: Authentication token passed to the job manager
+        :rtype A tuple containing the status and a JSON string with the result of every
+               submission, or a potential error description
+        """
+        session_ids = cls.__unique_ids(session_ids)
+        if session_ids is None:
+            return cls.__bulk_size_error()
+        with transaction.atomic():
+            # pylint: disable=E1101
+            existing = dict(Session.objects.select_for_update().filter(
+                id__in=session_ids).values_list('id', 'status'))
+            schedulable = set([session_id for session_id, status in existing.items()
+                               if status in [SESSION_STATUS_STOPPED, SESSION_STATUS_FAILED]])
+            Session.objects.filter(id__in=schedulable).update(
+                status=SESSION_STATUS_SCHEDULING, http_host='')
+        results = []
+        rejected = []
+        for session_id in session_ids:
+            if session_id not in existing:
+                results.append(cls.__bulk_result(
+                    session_id, http_status.HTTP_404_NOT_FOUND, 'Session does not exist'))
+                continue
+            if session_id not in schedulable:
+                results.append(cls.__bulk_result(
+                    session_id, http_status.HTTP_409_CONFLICT, 'Session already has a job'))
+                continue
+            globalSessionRoutingTable.remove(session_id)
+            globalSessionStatusNotifier.notify(session_id)
+            http_port = consts.DEFAULT_RENDERER_HTTP_PORT + random.randint(0, 1000)
+            if job_manager.submit_job(session_id, job_information, auth_token, http_port):
+                results.append(cls.__bulk_result(
+                    session_id, http_status.HTTP_202_ACCEPTED, 'Job submission queued'))
+            else:
+                rejected.append(session_id)
+                results.append(cls.__bulk_result(
+                    session_id, http_status.HTTP_503_SERVICE_UNAVAILABLE,
+                    'Job submission queue is full'))
+        if rejected:
+            with transaction.atomic():
+                Session.objects.filter(
+                    id__in=rejected, status=SESSION_STATUS_SCHEDULING).update(
+                        status=SESSION_STATUS_STOPPED)
+            for session_id in rejected:
+                globalSessionStatusNotifier.notify(session_id)
+        return [http_status.HTTP_200_OK, json.dumps({'contents': results})]
+
+    @classmethod
+    def query_statuses(cls, session_ids):
+        """
+        Queries the status of several sessions. Renderer probes are shared with the single
+        status queries through the liveness cache
+        :param session_ids: Ids of the sessions
+        :rtype A tuple containing the status and a JSON string with the status of every
+               session, or a potential error description
+        """
+        session_ids = cls.__unique_ids(session_ids)
+        if session_ids is None:
+            return cls.__bulk_size_error()
+        results = []
+        for session_id in session_ids:
+            status = cls.query_status(session_id)
+            try:
+                contents = json.loads(status[1])
+            except ValueError:
+                contents = status[1]
+            results.append(cls.__bulk_result(session_id, status[0], contents))
+        return [http_status.HTTP_200_OK, json.dumps({'contents': results})]
+
+    @classmethod
+    def delete_sessions(cls, session_ids):
+        """
+        Deletes several sessions with a single DELETE statement. Their rendering resources
+        are stopped in the background
+        :param session_ids: Ids of the sessions to delete
+        :rtype A tuple containing the status and a JSON string with the result of every
+               deletion, or a potential error description
+        """
+        session_ids = cls.__unique_ids(session_ids)
+        if session_ids is None:
+            return cls.__bulk_size_error()
+        # pylint: disable=E1101
+        sessions = Session.objects.in_bulk(session_ids)
+        for session_id in sessions:
+            cls.__forget_session(session_id)
+        with transaction.atomic():
+            Session.objects.filter(id__in=sessions.keys()).delete()
+        results = []
+        for session_id in session_ids:
+            session = sessions.get(session_id)
+            if session is None:
+                results.append(cls.__bulk_result(
+                    session_id, http_status.HTTP_404_NOT_FOUND, 'Session does not exist'))
+                continue
+            globalSessionStatusNotifier.forget(session_id)
+            if not globalSessionBulkPool.submit(cls.stop_rendering_resource, session):
+                cls.stop_rendering_resource(session)
+            results.append(cls.__bulk_result(
+                session_id, http_status.HTTP_200_OK, 'Session is being destroyed'))
+        log.info(1, str(len(sessions)) + ' sessions removed')
+        return [http_status.HTTP_200_OK, json.dumps({'contents': results})]
+
+    @staticmethod
+    def stop_rendering_resource(session):
+        """
+        Stops the process or job running the rendering resource of a session
+        :param session: Session holding the rendering resource
+        """
+        if session.process_pid != -1:
+            process_manager.ProcessManager.stop(session)
+        if session.job_id is not None and session.job_id != '':
+            globalJobManager.stop(session)
+            globalJobManager.kill(session)
+        globalRendererConnectionPool.evict(session.http_host, session.http_port)
+
+    @staticmethod
+    def __forget_session(session_id):
+        """
+        Removes a session from the in-memory expiry index, keep-alive buffer, liveness cache and
+        routing table
+        :param session_id: Id of the session
+        """
+        globalSessionExpiryIndex.remove(session_id)
+        globalKeepAliveBuffer.discard(session_id)
+        globalRendererLivenessCache.invalidate(session_id)
+        globalSessionRoutingTable.remove(session_id)
+
+    @staticmethod
+    def __unique_ids(session_ids):
         """
-        Returns a JSON formatted list of active session according to a given serializer
-        :param serializer: Serializer used for formatting the list of session
+        Removes duplicates from a list of session ids, keeping the original order
+        :param session_ids: Ids of the sessions
+        :return: The list of unique ids, None if the list is empty or too long
         """
-        sessions = Session.objects.all()
-        return [http_status.HTTP_200_OK, JSONResponse(serializer(sessions, many=True).data)]
+        unique_ids = []
+        for session_id in session_ids:
+            if str(session_id) not in unique_ids:
+                unique_ids.append(str(session_id))
+        if len(unique_ids) == 0 or len(unique_ids) > consts.SESSION_BULK_MAX_ITEMS:
+            return None
+        return unique_ids
+
+    @staticmethod
+    def __bulk_size_error():
+        """
+        :return: The response to a bulk request with no session or too many sessions
+        """
+        msg = 'Number of sessions must be between 1 and ' + str(consts.SESSION_BULK_MAX_ITEMS)
+        log.error(msg)
+        return [http_status.HTTP_400_BAD_REQUEST, json.dumps({'contents': msg})]
+
+    @staticmethod
+    def __bulk_result(session_id, code, contents):
+        """
+        :return: The result of a bulk operation for a single session
+        """
+        return {'session_id': session_id, 'status': code, 'contents': contents}
+
+    @classmethod
+    def list_sessions(cls, serializer, filters=None, fields=None, cursor=None, limit=None):
+        """
+        Returns a page of the JSON formatted list of sessions. Sessions are ordered by id, and
+        the next page starts after the last id of the current one
+        :param serializer: Serializer defining the fields that can be listed
+        :param filters: Dictionary of field values the sessions must match. Supported fields
+                        are defined by SESSION_LIST_FILTERS
+        :param fields: Fields to return, all the serializer fields if None
+        :param cursor: Cursor returned with the previous page, None for the first page
+        :param limit: Maximum number of sessions in the page
+        :rtype A tuple containing the status and a JSON string with the sessions and the cursor
+               of the next page (None on the last page), or a potential error description
+        """
+        allowed_fields = serializer.Meta.fields
+        if fields is None:
+            fields = allowed_fields
+        unknown_fields = [field for field in fields if field not in allowed_fields]
+        if unknown_fields:
+            msg = 'Unknown fields: ' + ', '.join(unknown_fields)
+            log.error(msg)
+            return [http_status.HTTP_400_BAD_REQUEST, json.dumps({'contents': msg})]
+        if limit is None:
+            limit = consts.SESSION_LIST_PAGE_SIZE
+        limit = max(1, min(int(limit), consts.SESSION_LIST_MAX_PAGE_SIZE))
+
+        # pylint: disable=E1101
+        sessions = Session.objects.order_by('id')
+        for name, value in (filters or dict()).items():
+            if name not in consts.SESSION_LIST_FILTERS:
+                msg = 'Sessions cannot be filtered by ' + str(name)
+                log.error(msg)
+                return [http_status.HTTP_400_BAD_REQUEST, json.dumps({'contents': msg})]
+            sessions = sessions.filter(**{name: value})
+        if cursor is not None:
+            try:
+                sessions = sessions.filter(id__gt=base64.urlsafe_b64decode(str(cursor)))
+            except TypeError:
+                msg = 'Invalid cursor'
+                log.error(msg)
+                return [http_status.HTTP_400_BAD_REQUEST, json.dumps({'contents': msg})]
+
+        # The id is always read to build the next cursor, and one extra row tells whether
+        # there is a next page
+        columns = list(fields)
+        if 'id' not in columns:
+            columns.append('id')
+        rows = list(sessions.values(*columns)[:limit + 1])
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = base64.urlsafe_b64encode(str(rows[-1]['id']))
+        if 'id' not in fields:
+            for row in rows:
+                del row['id']
+        content = JSONRenderer().render({'sessions': rows, 'next': next_cursor})
+        return [http_status.HTTP_200_OK, content]
+
+    @staticmethod
+    def statistics():
+        """
+        Returns the usage counters of the connection pools, caches, locks and worker pools of
+        the current process
+        :return: A list containing the HTTP status and a JSON string with the counters
+        """
+        statistics = {
+            'renderer_connections': globalRendererConnectionPool.statistics(),
+            'renderer_liveness': globalRendererLivenessCache.statistics(),
+            'renderer_prober': globalRendererProber.statistics(),
+            'renderer_requests': globalRendererRequestCoalescer.statistics(),
+            'renderer_tunnels': globalRendererTunnels.statistics(),
+            'session_routes': globalSessionRoutingTable.statistics(),
+            'session_status_notifier': globalSessionStatusNotifier.statistics(),
+            'keep_alive': globalKeepAliveBuffer.statistics(),
+            'settings_cache': manager.RenderingResourceSettingsManager.cache_statistics(),
+            'global_settings_cache': SystemGlobalSettingsManager.cache_statistics(),
+            'ssh_connections': globalSshConnectionPool.statistics(),
+            'job_submission': job_manager.globalJobSubmissionPool.statistics(),
+            'session_bulk': globalSessionBulkPool.statistics()
+        }
+        if globalJobManager is not None:
+            statistics['job_locks'] = globalJobManager.lock_statistics()
+            if hasattr(globalJobManager, 'host_statistics'):
+                statistics['allocation_hosts'] = globalJobManager.host_statistics()
+        return [http_status.HTTP_200_OK, json.dumps(statistics)]
 
     @classmethod
     def suspend_sessions(cls):
@@ -205,12 +482,9 @@ class SessionManager(object):
         Suspends the creation of new session. This administration feature is
         here to prevent overloading of the system
         """
-        sgs = SystemGlobalSettings.objects.get(id=0)
-        if not sgs.session_creation:
+        if not SystemGlobalSettingsManager.set_session_creation(False):
             msg = 'Session creation already suspended'
         else:
-            sgs.session_creation = False
-            sgs.save()
             msg = 'Creation of new session now suspended'
         log.debug(1, msg)
         return [http_status.HTTP_200_OK, msg]
@@ -218,10 +492,13 @@ class SessionManager(object):
     @classmethod
     def clear_sessions(cls):
         """
-        Suspends the creation of new session. This administration feature is
-        here to prevent overloading of the system
+        Destroys all sessions and stops their rendering resources
         """
-        Session.objects.all().delete()
+        # pylint: disable=E1101
+        session_ids = list(Session.objects.values_list('id', flat=True))
+        for first in range(0, len(session_ids), consts.SESSION_BULK_MAX_ITEMS):
+            cls.delete_sessions(session_ids[first:first + consts.SESSION_BULK_MAX_ITEMS])
+        globalSessionExpiryIndex.reset(dict())
         return [http_status.HTTP_200_OK, 'Sessions cleared']
 
     @classmethod
@@ -229,12 +506,9 @@ class SessionManager(object):
         """
         Resumes the creation of new session.
         """
-        sgs = SystemGlobalSettings.objects.get(id=0)
-        if sgs.session_creation:
+        if not SystemGlobalSettingsManager.set_session_creation(True):
             msg = 'Session creation already resumed'
         else:
-            sgs.session_creation = True
-            sgs.save()
             msg = 'Creation of new session now resumed'
         log.debug(1, msg)
         return [http_status.HTTP_200_OK, msg]
@@ -250,11 +524,11 @@ class SessionManager(object):
         try:
             session = Session.objects.get(id=session_id)
             try:
-                url = 'http://' + session.http_host + ':' + \
-                      str(session.http_port) + '/' + consts.RR_SPECIFIC_COMMAND_VOCABULARY
-                log.info(1, 'Requesting vocabulary from ' + url)
-                r = requests.put(
-                    url=url,
+                log.info(1, 'Requesting vocabulary from ' + session.http_host + ':' +
+                         str(session.http_port))
+                r = globalRendererConnectionPool.request(
+                    session.http_host, session.http_port,
+                    consts.REST_VERB_PUT, consts.RR_SPECIFIC_COMMAND_VOCABULARY,
                     timeout=global_settings.REQUEST_TIMEOUT)
                 response = r.text
                 r.close()
@@ -280,7 +554,7 @@ class SessionManager(object):
             return [http_status.HTTP_404_NOT_FOUND, str(e)]
 
     @staticmethod
-    def __status_response(http_code, session_id, code, description, hostname, port):
+    def __status_response(http_code, session_id, code, description, hostname, port, age=0):
         """
         Builds a JSon representation of the given parameters for HTTP responses
         :param http_code: HTTP code
@@ -289,6 +563,7 @@ class SessionManager(object):
         :param description: Status description
         :param hostname: Hostname of the rendering resource
         :param port: Port of the rendering resource
+        :param age: Age of the renderer probe the status is based on (in seconds)
         :return: JSon representation of the given parameters
         """
         return [http_code, json.dumps({
@@ -296,9 +571,27 @@ class SessionManager(object):
             'code': code,
             'description': description,
             'hostname': hostname,
-            'port': str(port)
+            'port': str(port),
+            'age': round(age, 1)
         })]
 
+    @staticmethod
+    def __probe_renderer(session):
+        """
+        Returns the liveness of the rendering resource of a session. When the background
+        prober is running, it is in charge of the status transitions and the result is
+        derived from the current session status. Otherwise, the renderer is probed, unless a
+        recent probe result is available
+        :param session: Session holding the rendering resource
+        :return: A tuple containing the probe result and its age (in seconds)
+        """
+        if globalRendererProber.is_active():
+            code = http_status.HTTP_503_SERVICE_UNAVAILABLE
+            if session.status == SESSION_STATUS_RUNNING:
+                code = http_status.HTTP_200_OK
+            return [code, ''], globalRendererLivenessCache.age(session.id)
+        return globalRendererLivenessCache.probe(session.id, SessionManager.request_vocabulary)
+
     @staticmethod
     def status_as_string(status):
         """
@@ -342,6 +635,7 @@ class SessionManager(object):
         try:
             session = Session.objects.get(id=session_id)
             status_description = 'Undefined'
+            probe_age = 0
             session_status = session.status
 
             log.info(1, 'Current session status is: ' +
@@ -354,8 +648,9 @@ class SessionManager(object):
                 if session.http_host != '':
                     status_description = session.configuration_id + ' is starting'
                     log.info(1, status_description)
-                    session.status = SESSION_STATUS_STARTING
-                    session.save()
+                    session.transition(
+                        SESSION_STATUS_STARTING,
+                        expected=[SESSION_STATUS_SCHEDULED, SESSION_STATUS_GETTING_HOSTNAME])
                 else:
                     status_description = str(session.configuration_id + ' is scheduled')
             elif session_status == SESSION_STATUS_STARTING:
@@ -369,17 +664,16 @@ class SessionManager(object):
                 if not rr_settings.wait_until_running:
                     status_description = session.configuration_id + ' is up and running'
                     log.info(1, status_description)
-                    session.status = SESSION_STATUS_RUNNING
-                    session.save()
+                    session.transition(SESSION_STATUS_RUNNING, expected=SESSION_STATUS_STARTING)
                 else:
                     log.info(1, 'Requesting rendering resource vocabulary')
-                    status = SessionManager.request_vocabulary(session_id)
+                    status, probe_age = SessionManager.__probe_renderer(session)
                     if status[0] == http_status.HTTP_200_OK and \
                                     status[0] != http_status.HTTP_404_NOT_FOUND:
                         status_description = session.configuration_id + ' is up and running'
                         log.info(1, status_description)
-                        session.status = SESSION_STATUS_RUNNING
-                        session.save()
+                        session.transition(
+                            SESSION_STATUS_RUNNING, expected=SESSION_STATUS_STARTING)
                     elif status[0] == http_status.HTTP_404_NOT_FOUND:
                         return [http_status.HTTP_404_NOT_FOUND, 'Job has been cancelled']
                     else:
@@ -387,15 +681,17 @@ class SessionManager(object):
                             ' is starting but the HTTP interface is not yet available'
             elif session_status == SESSION_STATUS_RUNNING:
                 # Update the timestamp if the current value is expired
-                sgs = SystemGlobalSettings.objects.get()
+                sgs = SystemGlobalSettingsManager.get()
                 if datetime.datetime.now() > session.valid_until:
-                    session.valid_until = datetime.datetime.now() + datetime.timedelta(
-                        seconds=sgs.session_keep_alive_timeout)
-                    session.save()
-                status = SessionManager.request_vocabulary(session_id)
+                    session.transition(valid_until=datetime.datetime.now() + datetime.timedelta(
+                        seconds=sgs.session_keep_alive_timeout))
+                    globalSessionExpiryIndex.schedule(session.id, session.valid_until)
+                status, probe_age = SessionManager.__probe_renderer(session)
                 if status[0] == http_status.HTTP_200_OK:
                     # Rendering resource is currently running
                     status_description = session.configuration_id + ' is up and running'
+                    globalSessionRoutingTable.update(
+                        session.id, session.status, session.http_host, session.http_port)
                 elif status[0] == http_status.HTTP_404_NOT_FOUND:
                     return SessionManager.__status_response(
                         http_code=status[0], session_id=session_id,
@@ -404,16 +700,14 @@ class SessionManager(object):
                 else:
                     # Rendering resource has been started but is not responding anymore, it is busy
                     status_description = session.configuration_id + ' is busy'
-                    session.status = SESSION_STATUS_BUSY
-                    session.save()
+                    session.transition(SESSION_STATUS_BUSY, expected=SESSION_STATUS_RUNNING)
 
             elif session_status == SESSION_STATUS_BUSY:
-                status = SessionManager.request_vocabulary(session_id)
+                status, probe_age = SessionManager.__probe_renderer(session)
                 if status[0] == http_status.HTTP_200_OK:
                     # Rendering resource is not busy anymore
                     status_description = session.configuration_id + ' is up and running'
-                    session.status = SESSION_STATUS_RUNNING
-                    session.save()
+                    session.transition(SESSION_STATUS_RUNNING, expected=SESSION_STATUS_BUSY)
                 else:
                     if status[0] == http_status.HTTP_404_NOT_FOUND:
                         return SessionManager.__status_response(
@@ -438,30 +732,35 @@ class SessionManager(object):
             return SessionManager.__status_response(
                 http_code=http_status.HTTP_200_OK, session_id=session_id,
                 code=status_code, description=status_description,
-                hostname=session.http_host, port=session.http_port)
+                hostname=session.http_host, port=session.http_port, age=probe_age)
         except Session.DoesNotExist as e:
             # Requested session does not exist
             log.error(str(e))
             return [http_status.HTTP_404_NOT_FOUND, str(e)]
 
     @classmethod
-    def keep_alive_session(cls, session_id):
+    def keep_alive_session(cls, session_id, check_existence=True):
         """
-        Updated the specified session with a new expiration timestamp
+        Updated the specified session with a new expiration timestamp. The timestamp is
+        recorded in memory and written to the database by the keep-alive buffer
         :param session_id: Id of the session to update
+        :param check_existence: False if the session is known to exist, for instance because
+                                a command was just forwarded to its rendering resource
         """
         log.debug(1, 'Session ' + str(session_id) + ' is being updated')
-        try:
-            sgs = SystemGlobalSettings.objects.get(id=0)
-            session = Session.objects.get(id=session_id)
-            session.valid_until = datetime.datetime.now() + \
-                datetime.timedelta(seconds=sgs.session_keep_alive_timeout)
-            session.save()
-            msg = 'Session ' + str(session_id) + ' successfully updated'
-            return [http_status.HTTP_200_OK, msg]
-        except Session.DoesNotExist as e:
-            log.error(str(e))
-            return [http_status.HTTP_404_NOT_FOUND, str(e)]
+        # Sessions known to the expiry index exist, no need to check the database
+        if check_existence and globalSessionExpiryIndex.deadline(session_id) is None and \
+                not Session.objects.filter(id=session_id).exists():
+            msg = 'Session matching query does not exist.'
+            log.error(msg)
+            return [http_status.HTTP_404_NOT_FOUND, msg]
+        sgs = SystemGlobalSettingsManager.get()
+        valid_until = datetime.datetime.now() + \
+            datetime.timedelta(seconds=sgs.session_keep_alive_timeout)
+        globalKeepAliveBuffer.record(session_id, valid_until)
+        globalSessionExpiryIndex.schedule(session_id, valid_until)
+        msg = 'Session ' + str(session_id) + ' successfully updated'
+        return [http_status.HTTP_200_OK, msg]
 
     @staticmethod
     def get_session_id():
@@ -65,6 +65,129 @@ SLURM_ERR_FILE = 'err.log'
 SLURM_OUT_FILE = 'out.log'
 SLURM_ALLOCATION_TIMEOUT = 10
 
+# Allocation mode. In sequential mode, cluster nodes are tried one after the other. In race
+# mode, the allocation is submitted to the SLURM_ALLOCATION_RACE_WIDTH best cluster nodes at
+# the same time and the first grant wins
+SLURM_ALLOCATION_MODE_SEQUENTIAL = 'sequential'
+SLURM_ALLOCATION_MODE_RACE = 'race'
+SLURM_ALLOCATION_MODE = SLURM_ALLOCATION_MODE_SEQUENTIAL
+SLURM_ALLOCATION_RACE_WIDTH = 3
+# Maximum time (in seconds) waited for a granted allocation in race mode
+SLURM_ALLOCATION_RACE_TIMEOUT = 60
+SLURM_ALLOCATION_LATENCY_SMOOTHING = 0.2
+
+# SSH connection pool
+SLURM_SSH_CONTROL_DIR = '/tmp'
+SLURM_SSH_CONTROL_PERSIST = 600
+SLURM_SSH_IDLE_TIMEOUT = 300
+SLURM_SSH_CHECK_INTERVAL = 60
+SLURM_SSH_MAX_CHANNELS = 8
+
+# Slurm job poller (in seconds)
+SLURM_POLL_FREQUENCY = 10
+SLURM_JOB_STATE_STALENESS = 30
+SLURM_JOB_STATE_MAX_ENTRIES = 10000
+
+# Job submission
+JOB_SUBMISSION_WORKERS = 4
+JOB_SUBMISSION_QUEUE_SIZE = 32
+JOB_SUBMISSION_RETRY_AFTER = 10
+
+# Teardown of expired sessions
+SESSION_TEARDOWN_WORKERS = 4
+SESSION_TEARDOWN_QUEUE_SIZE = 64
+SESSION_TEARDOWN_RETRY_DELAY = 5
+# Sessions left in the stopping status, for instance because their rendering resource could not
+# be stopped, are torn down again SESSION_STOPPING_GRACE_PERIOD seconds after their deadline
+SESSION_STOPPING_GRACE_PERIOD = 300
+
+# Bulk session operations. Rendering resources of sessions deleted in bulk are stopped by
+# SESSION_BULK_WORKERS background threads
+SESSION_BULK_MAX_ITEMS = 200
+SESSION_BULK_BATCH_SIZE = 100
+SESSION_BULK_WORKERS = 4
+SESSION_BULK_QUEUE_SIZE = 256
+
+# Session listing
+SESSION_LIST_PAGE_SIZE = 100
+SESSION_LIST_MAX_PAGE_SIZE = 1000
+SESSION_LIST_FILTERS = ('owner', 'status', 'configuration_id', 'cluster_node')
+
+# Keep-alive messages are written to the database every KEEP_ALIVE_FLUSH_INTERVAL seconds,
+# with one UPDATE statement per batch of sessions
+KEEP_ALIVE_FLUSH_INTERVAL = 5
+KEEP_ALIVE_FLUSH_BATCH_SIZE = 500
+# The keep-alive messages buffered by other processes are not visible to the process tearing
+# down expired sessions until they are flushed, so sessions are only torn down
+# SESSION_EXPIRY_GRACE_PERIOD seconds after their deadline
+SESSION_EXPIRY_GRACE_PERIOD = 2 * KEEP_ALIVE_FLUSH_INTERVAL
+
+# Renderer connection pool
+RENDERER_POOL_MAX_CONNECTIONS = 10
+RENDERER_POOL_BLOCK = False
+
+# Renderer proxy. When streaming, request and response bodies are passed through
+# chunk by chunk instead of being buffered in memory
+PROXY_STREAMING = True
+PROXY_STREAMING_CHUNK_SIZE = 64 * 1024
+
+# Coalescing of renderer GET commands. Concurrent GETs of a session with the same command,
+# query and RENDERER_COALESCING_HEADERS share a single request to the rendering resource. The
+# first one is streamed, the others wait for its response to be complete. Cookies are forwarded
+# to the rendering resource, so they are part of the key. Successful responses are also reused
+# for RENDERER_COALESCING_WINDOW seconds (0 disables this micro-cache). The first response is
+# only complete once its client has read it, the others wait for RENDERER_COALESCING_TIMEOUT
+# seconds at most before sending their own request
+RENDERER_COALESCING = True
+RENDERER_COALESCING_HEADERS = ('Accept', 'Accept-Encoding', 'Accept-Language', 'Authorization',
+                               'Cookie', 'Range')
+RENDERER_COALESCING_TIMEOUT = 5
+RENDERER_COALESCING_WINDOW = 0
+RENDERER_COALESCING_MAX_ENTRIES = 1000
+
+# Maximum number of commands of a batch sent to a rendering resource
+SESSION_BATCH_MAX_COMMANDS = 64
+# Maximum number of pipelined requests sent to a rendering resource ahead of their responses
+RENDERER_PIPELINE_DEPTH = 4
+
+# Renderer tunnels. Data is relayed in chunks of RENDERER_TUNNEL_BUFFER_SIZE bytes, and a
+# tunnel is closed when no data went through for RENDERER_TUNNEL_IDLE_TIMEOUT seconds
+RENDERER_TUNNEL_BUFFER_SIZE = 64 * 1024
+RENDERER_TUNNEL_IDLE_TIMEOUT = 300
+
+# Renderer probes sent by status queries are reused for RENDERER_LIVENESS_TTL seconds. Probe
+# results are kept for RENDERER_LIVENESS_RETENTION seconds to report their age, which must
+# exceed the maximum interval of the background prober
+RENDERER_LIVENESS_TTL = 5
+RENDERER_LIVENESS_RETENTION = 60
+RENDERER_LIVENESS_MAX_ENTRIES = 10000
+
+# Background renderer prober (intervals in seconds)
+RENDERER_PROBE_TICK = 0.5
+RENDERER_PROBE_MIN_INTERVAL = 1
+RENDERER_PROBE_MAX_INTERVAL = 30
+RENDERER_PROBE_MAX_PER_HOST = 2
+RENDERER_PROBE_WORKERS = 8
+RENDERER_PROBE_QUEUE_SIZE = 128
+
+# Routes of running sessions are kept for SESSION_ROUTE_TTL seconds. Routing tables are local
+# to each process and only updated by the status changes made in that process: when another
+# worker, or the asynchronous engine, stops a session, commands can still be forwarded to the
+# stopped rendering resource for up to SESSION_ROUTE_TTL seconds. Forwarding errors drop the
+# route immediately
+SESSION_ROUTE_TTL = 5
+SESSION_ROUTE_MAX_ENTRIES = 10000
+
+# Session status stream (in seconds). Waiting requests only re-read the status when they are
+# woken up by a status change made in the same process. Changes made by other processes are
+# caught every SESSION_STATUS_STREAM_RECHECK seconds
+SESSION_STATUS_LONG_POLL_TIMEOUT = 25
+SESSION_STATUS_STREAM_RECHECK = 30
+SESSION_STATUS_STREAM_HEARTBEAT = 15
+SESSION_STATUS_STREAM_DURATION = 300
+# Reconnection delay advertised to server-sent event clients (in milliseconds)
+SESSION_STATUS_STREAM_RETRY = 2000
+
 # Session management
 RRM_SPECIFIC_COMMAND_KEEPALIVE = 'keepalive'
 RRM_SPECIFIC_COMMAND_RESUME = 'resume'
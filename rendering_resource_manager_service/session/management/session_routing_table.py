@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=W0403
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+"""
+The session routing table holds the address of the rendering resources of running sessions,
+so that commands can be forwarded without reading the session and querying its status
+"""
+
+import itertools
+import threading
+
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
+from rendering_resource_manager_service.utils.cache import LocalCache
+from rendering_resource_manager_service.session.models import session_status_changed, \
+    SESSION_STATUS_RUNNING
+
+
+class Route(object):
+    """
+    Address of the rendering resource of a running session
+    """
+
+    def __init__(self, http_host, http_port, version):
+        """
+        :param http_host: Hostname of the rendering resource
+        :param http_port: Port of the rendering resource
+        :param version: Version of the route, incremented on every update of the table
+        """
+        self.http_host = http_host
+        self.http_port = http_port
+        self.version = version
+
+
+class SessionRoutingTable(object):
+    """
+    Routes of the running sessions, kept up to date by the status transitions. Routes expire
+    after SESSION_ROUTE_TTL seconds, and are removed when forwarding a command fails
+    """
+
+    def __init__(self):
+        self._routes = LocalCache(
+            'session-routes', settings.SESSION_ROUTE_TTL, settings.SESSION_ROUTE_MAX_ENTRIES)
+        self._versions = itertools.count(1)
+        self._mutex = threading.Lock()
+        self._failures = 0
+
+    def update(self, session_id, status, http_host, http_port):
+        """
+        Records the status of a session. Running sessions with a known host are routed, the
+        others are removed from the table
+        :param session_id: Id of the session
+        :param status: Status of the session
+        :param http_host: Hostname of the rendering resource
+        :param http_port: Port of the rendering resource
+        """
+        if status == SESSION_STATUS_RUNNING and http_host:
+            with self._mutex:
+                version = next(self._versions)
+            self._routes.set(str(session_id), Route(http_host, http_port, version))
+        else:
+            self._routes.delete(str(session_id))
+
+    def lookup(self, session_id):
+        """
+        :param session_id: Id of the session
+        :return: The route of the session, None if the session is not known to be running
+        """
+        return self._routes.get(str(session_id))
+
+    def remove(self, session_id, version=None):
+        """
+        Removes the route of a session
+        :param session_id: Id of the session
+        :param version: Version of the route that failed. The route is only removed if it has
+                        not been updated since. None to remove any route
+        """
+        route = self._routes.get(str(session_id))
+        if route is None:
+            return
+        if version is not None:
+            if route.version != version:
+                return
+            with self._mutex:
+                self._failures += 1
+        self._routes.delete(str(session_id))
+
+    def statistics(self):
+        """
+        Returns the routing counters
+        :return: A dictionary containing the number of routing hits and misses, routed
+                 sessions and routes removed after a forwarding failure
+        """
+        statistics = self._routes.statistics()
+        statistics['sessions'] = statistics.pop('entries')
+        with self._mutex:
+            statistics['failures'] = self._failures
+        return statistics
+
+
+# Global routing table
+globalSessionRoutingTable = SessionRoutingTable()
+
+
+# pylint: disable=W0613
+def _on_session_status_changed(sender, session, **kwargs):
+    """
+    Applies the status changes made through Session.transition to the routing table
+    """
+    globalSessionRoutingTable.update(
+        session.id, session.status, session.http_host, session.http_port)
+
+session_status_changed.connect(_on_session_status_changed)
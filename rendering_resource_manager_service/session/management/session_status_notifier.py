@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=W0403
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+"""
+The session status notifier wakes up the requests waiting for the status of a session to
+change, so that status streams do not need to poll the database
+"""
+
+import threading
+
+from rendering_resource_manager_service.session.models import session_status_changed
+
+
+class SessionStatusNotifier(object):
+    """
+    Per-session change counters, with a condition variable signalled on every change
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._versions = dict()
+        self._waiters = dict()
+
+    def notify(self, session_id):
+        """
+        Records a change of the given session and wakes up the threads waiting for it
+        :param session_id: Id of the session
+        """
+        with self._condition:
+            self._versions[session_id] = self._versions.get(session_id, 0) + 1
+            self._condition.notify_all()
+
+    def forget(self, session_id):
+        """
+        Wakes up the threads waiting for a deleted session, and drops its change counter
+        :param session_id: Id of the session
+        """
+        with self._condition:
+            if session_id in self._waiters:
+                self._versions[session_id] = self._versions.get(session_id, 0) + 1
+                self._condition.notify_all()
+            else:
+                self._versions.pop(session_id, None)
+
+    def version(self, session_id):
+        """
+        :param session_id: Id of the session
+        :return: The current change counter of the session
+        """
+        with self._condition:
+            return self._versions.get(session_id, 0)
+
+    def wait(self, session_id, version, timeout):
+        """
+        Waits until the session changes, or until the timeout expires
+        :param session_id: Id of the session
+        :param version: Change counter returned by version() before the session was read
+        :param timeout: Maximum waiting time (in seconds)
+        :return: True if the session changed
+        """
+        with self._condition:
+            if self._versions.get(session_id, 0) != version:
+                return True
+            self._waiters[session_id] = self._waiters.get(session_id, 0) + 1
+            try:
+                self._condition.wait(timeout)
+                return self._versions.get(session_id, 0) != version
+            finally:
+                self._waiters[session_id] -= 1
+                if self._waiters[session_id] == 0:
+                    del self._waiters[session_id]
+
+    def statistics(self):
+        """
+        :return: A dictionary containing the number of sessions being waited for
+        """
+        with self._condition:
+            return {'sessions': len(self._waiters)}
+
+
+# Global status notifier
+globalSessionStatusNotifier = SessionStatusNotifier()
+
+
+# pylint: disable=W0613
+def _on_session_status_changed(sender, session, **kwargs):
+    """
+    Forwards the status changes made through Session.transition to the notifier
+    """
+    globalSessionStatusNotifier.notify(session.id)
+
+session_status_changed.connect(_on_session_status_changed)
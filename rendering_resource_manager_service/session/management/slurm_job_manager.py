@@ -29,10 +29,11 @@
 The Slurm job manager is in charge of managing slurm jobs.
 """
 
-import subprocess
 import requests
 import traceback
-from threading import Lock
+import time
+import Queue
+from threading import Lock, Thread
 import json
 import re
 from string import Template
@@ -45,11 +46,11 @@ from rendering_resource_manager_service.session.models import \
     SESSION_STATUS_STARTING, SESSION_STATUS_RUNNING, \
     SESSION_STATUS_SCHEDULING, SESSION_STATUS_SCHEDULED, SESSION_STATUS_FAILED
 import rendering_resource_manager_service.service.settings as global_settings
-
-
-SLURM_SSH_COMMAND = '/usr/bin/ssh -i ' + \
-                  global_settings.SLURM_SSH_KEY + ' ' + \
-                  global_settings.SLURM_USERNAME + '@'
+from rendering_resource_manager_service.utils.keyed_lock import KeyedLock
+from rendering_resource_manager_service.session.management.ssh_connection_pool import \
+    globalSshConnectionPool
+from rendering_resource_manager_service.session.management.slurm_job_poller import \
+    globalSlurmJobPoller
 
 
 class SlurmJobManager(object):
@@ -59,9 +60,12 @@ class SlurmJobManager(object):
 
     def __init__(self):
         """
-        Setup job manager
+        Setup job manager. State transitions are serialized per session, while concurrent
+        SSH commands are bounded per cluster node by the SSH connection pool
         """
-        self._mutex = Lock()
+        self._session_locks = KeyedLock('Session')
+        self._statistics_mutex = Lock()
+        self._host_statistics = dict()
 
     def schedule(self, session, job_information, auth_token=None):
         """
@@ -74,7 +78,7 @@ class SlurmJobManager(object):
         """
         status = self.allocate(session, job_information)
         if status[0] == 200:
-            session.http_host = self.hostname(session)
+            session.transition(http_host=self.hostname(session))
             status = self.start(session, job_information)
         return status
 
@@ -82,56 +86,207 @@ class SlurmJobManager(object):
         """
         Allocates a job according to rendering resource configuration. If the allocation is
         successful, the session job_id is populated and the session status is set to
-        SESSION_STATUS_SCHEDULED
+        SESSION_STATUS_SCHEDULED. Depending on SLURM_ALLOCATION_MODE, cluster nodes are tried
+        one after the other, or raced against each other
         :param session: Current user session
         :param job_information: Information about the job
         :return: A Json response containing on ok status or a description of the error
         """
+        cluster_nodes = self._ordered_cluster_nodes()
+        if settings.SLURM_ALLOCATION_MODE == settings.SLURM_ALLOCATION_MODE_RACE and \
+                len(cluster_nodes) > 1:
+            return self._race_allocation(
+                session, job_information, cluster_nodes[:settings.SLURM_ALLOCATION_RACE_WIDTH])
+
         status = None
-        for cluster_node in global_settings.SLURM_HOSTS:
+        for cluster_node in cluster_nodes:
             try:
-                self._mutex.acquire()
-                session.status = SESSION_STATUS_SCHEDULING
-                session.cluster_node = cluster_node
-                session.save()
-
-                log.info(1, 'Scheduling job for session ' + session.id)
-
-                job_information.cluster_node = cluster_node
-                command_line = self._build_allocation_command(session, job_information)
-                process = subprocess.Popen(
-                    [command_line],
-                    shell=True,
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE)
-
-                error = process.communicate()[1]
-                if len(re.findall('Granted', error)) != 0:
-                    session.job_id = re.findall('\\d+', error)[0]
-                    log.info(1, 'Allocated job ' + str(session.job_id) +
-                             ' on cluster node ' + cluster_node)
-                    session.status = SESSION_STATUS_SCHEDULED
-                    session.save()
-                    response = json.dumps({'message': 'Job scheduled', 'jobId': session.job_id})
-                    status = [200, response]
-                    break
-                else:
-                    session.status = SESSION_STATUS_FAILED
-                    session.save()
-                    log.error(error)
-                    response = json.dumps({'contents': error})
-                    status = [400, response]
-                process.stdin.close()
+                with self._session_locks.hold(session.id):
+                    session.transition(SESSION_STATUS_SCHEDULING, cluster_node=cluster_node)
+
+                    log.info(1, 'Scheduling job for session ' + session.id)
+
+                    job_information.cluster_node = cluster_node
+                    command_line = self._build_allocation_command(session, job_information)
+                    job_id, error = self._request_allocation(cluster_node, command_line)
+                    if job_id is not None:
+                        session.transition(SESSION_STATUS_SCHEDULED, job_id=job_id)
+                        response = json.dumps({'message': 'Job scheduled', 'jobId': session.job_id})
+                        status = [200, response]
+                        break
+                    else:
+                        session.transition(SESSION_STATUS_FAILED)
+                        response = json.dumps({'contents': error})
+                        status = [400, response]
             except OSError as e:
                 log.error(str(e))
                 response = json.dumps({'contents': str(e)})
                 status = [400, response]
-            finally:
-                if self._mutex.locked():
-                    self._mutex.release()
         return status
 
+    def host_statistics(self):
+        """
+        Returns the allocation statistics of the cluster nodes
+        :return: A dictionary containing, for each cluster node, the number of allocation
+                 attempts, the number of granted allocations and the average allocation latency
+        """
+        with self._statistics_mutex:
+            return dict([(node, dict(values)) for node, values in self._host_statistics.items()])
+
+    def _ordered_cluster_nodes(self):
+        """
+        Returns the cluster nodes, sorted by decreasing allocation success rate and increasing
+        allocation latency
+        :return: A list of cluster nodes
+        """
+        cluster_nodes = global_settings.SLURM_HOSTS
+        if isinstance(cluster_nodes, basestring):
+            cluster_nodes = cluster_nodes.replace(',', ' ').split()
+
+        def key(cluster_node):
+            """
+            Sort key of a cluster node. Nodes without statistics get a neutral success rate
+            """
+            values = self._host_statistics.get(cluster_node)
+            if values is None:
+                return -0.5, 0.0
+            success_rate = (values['granted'] + 1.0) / (values['attempts'] + 2.0)
+            return -success_rate, values['latency']
+
+        with self._statistics_mutex:
+            return sorted(cluster_nodes, key=key)
+
+    def _record_allocation(self, cluster_node, granted, latency):
+        """
+        Updates the allocation statistics of a cluster node
+        :param cluster_node: Cluster node
+        :param granted: True if the allocation was granted
+        :param latency: Time taken by the allocation request (in seconds)
+        """
+        with self._statistics_mutex:
+            values = self._host_statistics.setdefault(
+                cluster_node, {'attempts': 0, 'granted': 0, 'latency': latency})
+            values['attempts'] += 1
+            if granted:
+                values['granted'] += 1
+            values['latency'] += settings.SLURM_ALLOCATION_LATENCY_SMOOTHING * \
+                (latency - values['latency'])
+
+    def _request_allocation(self, cluster_node, command_line):
+        """
+        Runs the allocation command on the given cluster node
+        :param cluster_node: Cluster node
+        :param command_line: Allocation command line
+        :return: A tuple containing the allocated job id (None if the allocation failed) and
+                 the output of the allocation command
+        """
+        start_time = time.time()
+        error = globalSshConnectionPool.execute(cluster_node, command_line)[1]
+        job_id = None
+        if len(re.findall('Granted', error)) != 0:
+            job_id = re.findall('\\d+', error)[0]
+            log.info(1, 'Allocated job ' + str(job_id) + ' on cluster node ' + cluster_node)
+        else:
+            log.error(error)
+        self._record_allocation(cluster_node, job_id is not None, time.time() - start_time)
+        return job_id, error
+
+    def _race_allocation(self, session, job_information, cluster_nodes):
+        """
+        Submits the allocation to all given cluster nodes at the same time. The first granted
+        allocation is kept, and allocations granted later on other nodes are cancelled
+        :param session: Current user session
+        :param job_information: Information about the job
+        :param cluster_nodes: Cluster nodes competing for the allocation
+        :return: A Json response containing on ok status or a description of the error
+        """
+        with self._session_locks.hold(session.id):
+            session.transition(SESSION_STATUS_SCHEDULING)
+            log.info(1, 'Racing job allocation for session ' + session.id +
+                     ' on ' + ', '.join(cluster_nodes))
+
+            results = Queue.Queue()
+            command_line = self._build_allocation_command(session, job_information)
+            for cluster_node in cluster_nodes:
+                thread = Thread(target=self._race_allocation_request,
+                                args=(cluster_node, command_line, results))
+                thread.setDaemon(True)
+                thread.start()
+
+            errors = []
+            remaining = len(cluster_nodes)
+            deadline = time.time() + settings.SLURM_ALLOCATION_RACE_TIMEOUT
+            while remaining > 0:
+                try:
+                    cluster_node, job_id, error = results.get(
+                        timeout=max(0, deadline - time.time()))
+                except Queue.Empty:
+                    errors.append('No allocation granted within ' +
+                                  str(settings.SLURM_ALLOCATION_RACE_TIMEOUT) + ' seconds')
+                    break
+                remaining -= 1
+                if job_id is None:
+                    errors.append(cluster_node + ': ' + error)
+                    continue
+                job_information.cluster_node = cluster_node
+                session.transition(
+                    SESSION_STATUS_SCHEDULED, cluster_node=cluster_node, job_id=job_id)
+                # Losers still running are cancelled in the background as they complete
+                self._start_cancelling_race_losers(results, remaining)
+                response = json.dumps({'message': 'Job scheduled', 'jobId': session.job_id})
+                return [200, response]
+
+            session.transition(SESSION_STATUS_FAILED)
+            # Allocations granted after the race timed out must not be left behind
+            self._start_cancelling_race_losers(results, remaining)
+            response = json.dumps({'contents': '\n'.join(errors)})
+            return [400, response]
+
+    def _race_allocation_request(self, cluster_node, command_line, results):
+        """
+        Runs one of the competing allocation requests and posts its result. A result is always
+        posted, whatever the outcome of the request
+        :param cluster_node: Cluster node
+        :param command_line: Allocation command line
+        :param results: Queue receiving the result of the allocation
+        """
+        try:
+            job_id, error = self._request_allocation(cluster_node, command_line)
+        # pylint: disable=W0703
+        except Exception as e:
+            log.error(traceback.format_exc(e))
+            job_id, error = None, str(e)
+        results.put((cluster_node, job_id, error))
+
+    def _start_cancelling_race_losers(self, results, count):
+        """
+        Cancels, in the background, the allocations still expected from an allocation race
+        :param results: Queue receiving the results of the competing allocations
+        :param count: Number of results still expected
+        """
+        if count == 0:
+            return
+        thread = Thread(target=self._cancel_race_losers, args=(results, count))
+        thread.setDaemon(True)
+        thread.start()
+
+    @staticmethod
+    def _cancel_race_losers(results, count):
+        """
+        Cancels the allocations granted after the winner of an allocation race
+        :param results: Queue receiving the results of the competing allocations
+        :param count: Number of results still expected
+        """
+        for _ in range(count):
+            cluster_node, job_id, _ = results.get()
+            if job_id is not None:
+                log.info(1, 'Cancelling job ' + job_id + ' on ' + cluster_node +
+                         ', allocated after the allocation race was won')
+                try:
+                    globalSshConnectionPool.execute(cluster_node, 'scancel ' + job_id)
+                except OSError as e:
+                    log.error(str(e))
+
     def start(self, session, job_information):
         """
         Start the rendering resource using the job allocated by the schedule method. If successful,
@@ -141,69 +296,61 @@ class SlurmJobManager(object):
         :return: A Json response containing on ok status or a description of the error
         """
         try:
-            self._mutex.acquire()
-            session.status = SESSION_STATUS_STARTING
-            session.save()
-
-            rr_settings = \
-                manager.RenderingResourceSettingsManager.get_by_id(session.configuration_id.lower())
-
-            # Modules
-            full_command = '\'source /etc/profile &&  module purge && '
-            if rr_settings.modules is not None:
-                values = rr_settings.modules.split()
-                for module in values:
-                    full_command += 'module load ' + module.strip() + ' && '
-
-            # Environment variables
-            if rr_settings.environment_variables is not None:
-                values = rr_settings.environment_variables.split()
-                values += job_information.environment.split()
-                for variable in values:
-                    full_command += variable + ' '
-
-            # Command lines parameters
-            rest_parameters = manager.RenderingResourceSettingsManager.format_rest_parameters(
-                str(rr_settings.scheduler_rest_parameters_format),
-                str(session.http_host),
-                str(session.http_port),
-                'rest' + str(rr_settings.id + session.id),
-                str(session.job_id))
-            full_command += rr_settings.command_line
-            values = rest_parameters.split()
-            values += job_information.params.split()
-            for parameter in values:
-                full_command += ' ' + parameter
-
-            # Output redirection
-            full_command += ' > ' + self._file_name(session, settings.SLURM_OUT_FILE)
-            full_command += ' 2> ' + self._file_name(session, settings.SLURM_ERR_FILE)
-            full_command += '\''
-
-            command_line = Template(' "srun --jobid=$job_id /bin/bash -c $full_command"').\
-                substitute(job_id=session.job_id, full_command=full_command)
-
-            ssh_command = SLURM_SSH_COMMAND + session.cluster_node + command_line
-
-            subprocess.Popen([ssh_command], shell=True, stdout=subprocess.PIPE,
-                             stderr=subprocess.PIPE)
-
-            log.info(1, 'Connect to frontend machine with command: ' + ssh_command)
-
-            if rr_settings.wait_until_running:
-                session.status = SESSION_STATUS_STARTING
-            else:
-                session.status = SESSION_STATUS_RUNNING
-            session.save()
-            response = json.dumps({'message': session.configuration_id + ' successfully started'})
-            return [200, response]
+            with self._session_locks.hold(session.id):
+                session.transition(SESSION_STATUS_STARTING)
+
+                rr_settings = manager.RenderingResourceSettingsManager.get_by_id(
+                    session.configuration_id.lower())
+
+                # Modules
+                full_command = '\'source /etc/profile &&  module purge && '
+                if rr_settings.modules is not None:
+                    values = rr_settings.modules.split()
+                    for module in values:
+                        full_command += 'module load ' + module.strip() + ' && '
+
+                # Environment variables
+                if rr_settings.environment_variables is not None:
+                    values = rr_settings.environment_variables.split()
+                    values += job_information.environment.split()
+                    for variable in values:
+                        full_command += variable + ' '
+
+                # Command lines parameters
+                rest_parameters = manager.RenderingResourceSettingsManager.format_rest_parameters(
+                    str(rr_settings.scheduler_rest_parameters_format),
+                    str(session.http_host),
+                    str(session.http_port),
+                    'rest' + str(rr_settings.id + session.id),
+                    str(session.job_id))
+                full_command += rr_settings.command_line
+                values = rest_parameters.split()
+                values += job_information.params.split()
+                for parameter in values:
+                    full_command += ' ' + parameter
+
+                # Output redirection
+                full_command += ' > ' + self._file_name(session, settings.SLURM_OUT_FILE)
+                full_command += ' 2> ' + self._file_name(session, settings.SLURM_ERR_FILE)
+                full_command += '\''
+
+                command_line = Template('"srun --jobid=$job_id /bin/bash -c $full_command"').\
+                    substitute(job_id=session.job_id, full_command=full_command)
+
+                globalSshConnectionPool.spawn(session.cluster_node, command_line)
+
+                log.info(1, 'Connect to frontend machine ' + session.cluster_node +
+                         ' with command: ' + command_line)
+
+                if not rr_settings.wait_until_running:
+                    session.transition(SESSION_STATUS_RUNNING)
+                response = json.dumps(
+                    {'message': session.configuration_id + ' successfully started'})
+                return [200, response]
         except OSError as e:
             log.error(str(e))
             response = json.dumps({'contents': str(e)})
             return [400, response]
-        finally:
-            if self._mutex.locked():
-                self._mutex.release()
 
     def stop(self, session):
         """
@@ -213,36 +360,38 @@ class SlurmJobManager(object):
         """
         result = [500, 'Unexpected error']
         try:
-            self._mutex.acquire()
-            # pylint: disable=E1101
-            setting = \
-                manager.RenderingResourceSettings.objects.get(
-                    id=session.configuration_id)
-            if setting.graceful_exit:
-                log.info(1, 'Gracefully exiting rendering resource')
-                try:
-                    url = 'http://' + session.http_host + \
-                          ':' + str(session.http_port) + '/' + \
-                          settings.RR_SPECIFIC_COMMAND_EXIT
-                    log.info(1, url)
-                    r = requests.put(
-                        url=url,
-                        timeout=global_settings.REQUEST_TIMEOUT)
-                    r.close()
-                # pylint: disable=W0702
-                except requests.exceptions.RequestException as e:
-                    log.error(traceback.format_exc(e))
-            result = self.kill(session)
+            with self._session_locks.hold(session.id):
+                setting = manager.RenderingResourceSettingsManager.get_by_id(
+                    session.configuration_id.lower())
+                if setting.graceful_exit:
+                    log.info(1, 'Gracefully exiting rendering resource')
+                    try:
+                        url = 'http://' + session.http_host + \
+                              ':' + str(session.http_port) + '/' + \
+                              settings.RR_SPECIFIC_COMMAND_EXIT
+                        log.info(1, url)
+                        r = requests.put(
+                            url=url,
+                            timeout=global_settings.REQUEST_TIMEOUT)
+                        r.close()
+                    # pylint: disable=W0702
+                    except requests.exceptions.RequestException as e:
+                        log.error(traceback.format_exc(e))
+                result = self.kill(session)
         except OSError as e:
             msg = str(e)
             log.error(msg)
             response = json.dumps({'contents': msg})
             result = [400, response]
-        finally:
-            if self._mutex.locked():
-                self._mutex.release()
         return result
 
+    def lock_statistics(self):
+        """
+        Returns the contention counters of the per-session locks
+        :return: A dictionary containing the lock contention counters
+        """
+        return self._session_locks.statistics()
+
     @staticmethod
     def kill(session):
         """
@@ -253,15 +402,9 @@ class SlurmJobManager(object):
         result = [500, 'Unexpected error']
         if session.job_id is not None:
             try:
-                command_line = SLURM_SSH_COMMAND + session.cluster_node + \
-                               ' scancel ' + session.job_id
                 log.info(1, 'Stopping job ' + session.job_id)
-                process = subprocess.Popen(
-                    [command_line],
-                    shell=True,
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE)
-                output = process.communicate()[0]
+                output = globalSshConnectionPool.execute(
+                    session.cluster_node, 'scancel ' + session.job_id)[0]
                 log.info(1, output)
                 msg = 'Job successfully cancelled'
                 log.info(1, msg)
@@ -277,13 +420,20 @@ class SlurmJobManager(object):
     def hostname(self, session):
         """
         Retrieve the hostname for the host of the given job is allocated.
-        Note: this uses ssh and scontrol on the SLURM_HOST
+        Note: this reads the job state table maintained by the job poller, and falls back to
+        ssh and scontrol on the SLURM_HOST if no up-to-date state is available
         Note: Due to DNS migration of CSCS compute nodes to bbp.epfl.ch domain
         it uses hardcoded value based on the front-end dns name (which was not migrated)
         :param session: Current user session
         :return: The hostname of the host if the job is running, empty otherwise
         """
-        hostname = self._query(session, 'BatchHost')
+        job_state = globalSlurmJobPoller.job_state(session.job_id)
+        if job_state is not None:
+            hostname = ''
+            if job_state.state not in ['', 'CANCELLED']:
+                hostname = job_state.batch_host
+        else:
+            hostname = self._query(session, 'BatchHost')
         if hostname != '':
             domain = self._get_domain(session)
             if domain == 'cscs.ch':
@@ -298,6 +448,9 @@ class SlurmJobManager(object):
         :param session: Current user session
         :return: A string containing the status of the job
         """
+        job_state = globalSlurmJobPoller.job_state(session.job_id)
+        if job_state is not None:
+            return str(job_state)
         return self._query(session)
 
     def rendering_resource_out_log(self, session):
@@ -327,15 +480,8 @@ class SlurmJobManager(object):
         value = ''
         if session.job_id is not None:
             try:
-                command_line = SLURM_SSH_COMMAND + session.cluster_node + \
-                               ' scontrol show job ' + str(session.job_id)
-                process = subprocess.Popen(
-                    [command_line],
-                    shell=True,
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE)
-                output = process.communicate()[0]
+                output = globalSshConnectionPool.execute(
+                    session.cluster_node, 'scontrol show job ' + str(session.job_id))[0]
                 if attribute is None:
                     return output
                 status = re.search(r'JobState=(\w+)', output).group(1)
@@ -374,16 +520,9 @@ class SlurmJobManager(object):
             result = 'Not currently available'
             if session.status in [SESSION_STATUS_STARTING, SESSION_STATUS_RUNNING]:
                 filename = self._file_name(session, extension)
-                command_line = SLURM_SSH_COMMAND + session.cluster_node + \
-                               ' cat ' + filename
-                log.info(1, 'Querying log: ' + command_line)
-                process = subprocess.Popen(
-                    [command_line],
-                    shell=True,
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE)
-                output = process.communicate()[0]
-                result = output
+                log.info(1, 'Querying log: ' + filename + ' on ' + session.cluster_node)
+                result = globalSshConnectionPool.execute(
+                    session.cluster_node, 'cat ' + filename)[0]
             return result
         except OSError as e:
             return str(e)
@@ -405,7 +544,7 @@ class SlurmJobManager(object):
         Builds the SLURM allocation command line
         :param session: Current user session
         :param job_information: Information about the job
-        :return: A string containing the SLURM command
+        :return: A string containing the SLURM command, run on the cluster node of the session
         """
 
         rr_settings = \
@@ -453,8 +592,7 @@ class SlurmJobManager(object):
         log.info(1, 'Scheduling job for session ' + session.id)
 
         job_name = session.owner + '_' + rr_settings.id
-        command_line = SLURM_SSH_COMMAND + session.cluster_node + \
-                       ' salloc --no-shell' + \
+        command_line = 'salloc --no-shell' + \
                        ' --immediate=' + str(settings.SLURM_ALLOCATION_TIMEOUT) + \
                        ' --account=' + rr_settings.project + \
                        ' --job-name=' + job_name + \
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=W0403
+# pylint: disable=E1101
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+"""
+The Slurm job poller periodically queries each cluster node once for the state of all the
+jobs owned by the service account, and keeps the result in an in-memory job state table
+"""
+
+import threading
+import time
+
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
+import rendering_resource_manager_service.utils.custom_logging as log
+import rendering_resource_manager_service.service.settings as global_settings
+from rendering_resource_manager_service.utils.cache import LocalCache
+from rendering_resource_manager_service.session.models import Session
+from rendering_resource_manager_service.session.management.ssh_connection_pool import \
+    globalSshConnectionPool
+
+
+# squeue output format: job id, job state, batch host and time left. Fields are comma
+# separated so that the format does not need quoting through the local and remote shells
+SQUEUE_FORMAT = '%i,%T,%B,%L'
+
+
+class JobState(object):
+    """
+    State of a Slurm job, as reported by squeue
+    """
+
+    def __init__(self, job_id, state='', batch_host='', time_left=''):
+        """
+        Initialization
+        :param job_id: Slurm job identifier
+        :param state: Job state (PENDING, RUNNING, etc). Empty if the job is not in the queue
+        :param batch_host: Host on which the job is running, empty if not yet allocated
+        :param time_left: Remaining allocation time
+        """
+        self.job_id = job_id
+        self.state = state
+        self.batch_host = batch_host
+        self.time_left = time_left
+        self.timestamp = time.time()
+
+    def __str__(self):
+        return 'JobId=%s JobState=%s BatchHost=%s TimeLeft=%s' % (
+            self.job_id, self.state, self.batch_host, self.time_left)
+
+
+class SlurmJobPoller(threading.Thread):
+    """
+    Background thread maintaining the job state table
+    """
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.signal = True
+        # Job states expire when they have not been refreshed for SLURM_JOB_STATE_STALENESS
+        # seconds, which also drops the jobs that do not belong to any session anymore
+        self._job_states = LocalCache(
+            'slurm-job-states', settings.SLURM_JOB_STATE_STALENESS,
+            settings.SLURM_JOB_STATE_MAX_ENTRIES)
+
+    def run(self):
+        """
+        Polls the cluster nodes every SLURM_POLL_FREQUENCY seconds
+        """
+        log.info(1, 'Slurm job poller started...')
+        while self.signal:
+            try:
+                self.poll()
+            # pylint: disable=W0703
+            except Exception as e:
+                log.error(str(e))
+            time.sleep(settings.SLURM_POLL_FREQUENCY)
+
+    def poll(self):
+        """
+        Issues one squeue per cluster node holding sessions, and updates the job state table
+        """
+        known_jobs = dict()
+        for cluster_node, job_id in Session.objects.exclude(job_id='').exclude(
+                cluster_node='').values_list('cluster_node', 'job_id'):
+            known_jobs.setdefault(cluster_node, []).append(str(job_id))
+
+        for cluster_node, job_ids in known_jobs.items():
+            command = 'squeue -h -u ' + global_settings.SLURM_USERNAME + \
+                      ' -o ' + SQUEUE_FORMAT
+            try:
+                output, error = globalSshConnectionPool.execute(cluster_node, command)
+            except OSError as e:
+                log.error(str(e))
+                continue
+            if error:
+                log.error(error)
+                if not output:
+                    continue
+            job_states = self.parse_squeue_output(output)
+            # Jobs that are not in the queue anymore are recorded with an empty state
+            for job_id in job_ids:
+                if job_id not in job_states:
+                    job_states[job_id] = JobState(job_id)
+            for job_id, job_state in job_states.items():
+                self._job_states.set(job_id, job_state)
+
+    def job_state(self, job_id):
+        """
+        Returns the state of the given job if it is not older than SLURM_JOB_STATE_STALENESS
+        seconds
+        :param job_id: Slurm job identifier
+        :return: A JobState instance, or None if no up-to-date state is available
+        """
+        job_state = self._job_states.get(str(job_id))
+        if job_state is None or \
+                time.time() - job_state.timestamp > settings.SLURM_JOB_STATE_STALENESS:
+            return None
+        return job_state
+
+    @staticmethod
+    def parse_squeue_output(output):
+        """
+        Parses the output of squeue formatted according to SQUEUE_FORMAT
+        :param output: squeue output
+        :return: A dictionary of JobState instances indexed by job id
+        """
+        job_states = dict()
+        for line in output.splitlines():
+            values = line.strip().split(',')
+            if len(values) != 4:
+                continue
+            job_id, state, batch_host, time_left = values
+            if batch_host in ['n/a', '(null)']:
+                batch_host = ''
+            job_states[job_id] = JobState(job_id, state, batch_host, time_left)
+        return job_states
+
+
+# Global job poller, started by the WSGI application when Slurm is the resource allocator
+globalSlurmJobPoller = SlurmJobPoller()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=W0403
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+"""
+The SSH connection pool keeps one long-lived OpenSSH ControlMaster connection per cluster
+node, so that commands sent to the Slurm front-ends are multiplexed over an already
+authenticated channel instead of paying a full SSH handshake every time.
+"""
+
+import os
+import subprocess
+import time
+from contextlib import contextmanager
+from threading import Lock, BoundedSemaphore
+
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
+import rendering_resource_manager_service.utils.custom_logging as log
+import rendering_resource_manager_service.service.settings as global_settings
+
+
+class SshConnectionPool(object):
+    """
+    Pool of multiplexed SSH connections, keyed by cluster node
+    """
+
+    def __init__(self):
+        """
+        Setup the connection pool
+        """
+        self._mutex = Lock()
+        self._semaphores = dict()
+        self._last_used = dict()
+        self._last_checked = dict()
+        self._contentions = 0
+
+    @staticmethod
+    def control_path(cluster_node=None):
+        """
+        Returns the ControlPath used for the master sockets. Without cluster node, the
+        template is returned and %r and %h are expanded by ssh to the remote user and host
+        :param cluster_node: Optional cluster node for which the socket path is returned
+        :return: A string containing the control path
+        """
+        if cluster_node is None:
+            return os.path.join(settings.SLURM_SSH_CONTROL_DIR, 'rrm-%r@%h')
+        return os.path.join(settings.SLURM_SSH_CONTROL_DIR,
+                            'rrm-' + global_settings.SLURM_USERNAME + '@' + cluster_node)
+
+    @staticmethod
+    def options():
+        """
+        Returns the ssh options enabling connection multiplexing
+        :return: A string containing the ssh options
+        """
+        return ' -i ' + global_settings.SLURM_SSH_KEY + \
+               ' -o ControlMaster=auto' + \
+               ' -o ControlPath=' + SshConnectionPool.control_path() + \
+               ' -o ControlPersist=' + str(settings.SLURM_SSH_CONTROL_PERSIST) + ' '
+
+    @staticmethod
+    def command_prefix():
+        """
+        Returns the ssh command prefix, to which the cluster node and the remote command
+        are appended
+        :return: A string containing the ssh command prefix
+        """
+        return '/usr/bin/ssh' + SshConnectionPool.options() + global_settings.SLURM_USERNAME + '@'
+
+    @contextmanager
+    def channel(self, cluster_node):
+        """
+        Reserves one of the channels of the master connection to the given cluster node.
+        The number of concurrent channels per node is bounded by SLURM_SSH_MAX_CHANNELS
+        :param cluster_node: Cluster node the command is sent to
+        """
+        self.evict_idle()
+        semaphore = self._semaphore(cluster_node)
+        if not semaphore.acquire(False):
+            with self._mutex:
+                self._contentions += 1
+            log.info(2, 'All SSH channels to ' + cluster_node + ' are busy')
+            semaphore.acquire()
+        try:
+            self._check(cluster_node)
+            yield
+        finally:
+            with self._mutex:
+                self._last_used[cluster_node] = time.time()
+            semaphore.release()
+
+    def execute(self, cluster_node, command, stdin=None):
+        """
+        Executes a command on the given cluster node through the master connection
+        :param cluster_node: Cluster node on which the command is executed
+        :param command: Remote command
+        :param stdin: Optional content sent to the standard input of the remote command
+        :return: A tuple containing the standard output and error of the command
+        """
+        with self.channel(cluster_node):
+            process = subprocess.Popen(
+                [self.command_prefix() + cluster_node + ' ' + command],
+                shell=True,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE)
+            return process.communicate(stdin)
+
+    def spawn(self, cluster_node, command):
+        """
+        Starts a command on the given cluster node through the master connection, without
+        waiting for it to complete. The channel is only reserved while the command is started
+        :param cluster_node: Cluster node on which the command is executed
+        :param command: Remote command
+        :return: The local ssh process
+        """
+        with self.channel(cluster_node):
+            return subprocess.Popen(
+                [self.command_prefix() + cluster_node + ' ' + command],
+                shell=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE)
+
+    def evict_idle(self):
+        """
+        Stops the master connections that have not been used for more than
+        SLURM_SSH_IDLE_TIMEOUT seconds
+        """
+        now = time.time()
+        with self._mutex:
+            idle_nodes = [node for node, last_used in self._last_used.items()
+                          if now - last_used > settings.SLURM_SSH_IDLE_TIMEOUT]
+            for node in idle_nodes:
+                del self._last_used[node]
+                self._last_checked.pop(node, None)
+        for node in idle_nodes:
+            log.info(1, 'Closing idle SSH master connection to ' + node)
+            self._control(node, 'stop')
+
+    def close(self):
+        """
+        Stops all master connections
+        """
+        with self._mutex:
+            nodes = self._last_used.keys()
+            self._last_used.clear()
+            self._last_checked.clear()
+        for node in nodes:
+            self._control(node, 'stop')
+
+    def statistics(self):
+        """
+        Returns the pool usage counters
+        :return: A dictionary containing the number of connected cluster nodes and the
+                 number of commands that had to wait for a free channel
+        """
+        with self._mutex:
+            return {
+                'nodes': len(self._last_used),
+                'contentions': self._contentions
+            }
+
+    def _semaphore(self, cluster_node):
+        """
+        Returns the semaphore bounding the number of channels to the given cluster node
+        :param cluster_node: Cluster node
+        :return: A bounded semaphore
+        """
+        with self._mutex:
+            semaphore = self._semaphores.get(cluster_node)
+            if semaphore is None:
+                semaphore = BoundedSemaphore(settings.SLURM_SSH_MAX_CHANNELS)
+                self._semaphores[cluster_node] = semaphore
+            return semaphore
+
+    def _check(self, cluster_node):
+        """
+        Verifies, at most every SLURM_SSH_CHECK_INTERVAL seconds, that the master
+        connection to the given cluster node is still alive. A dead master is shut down and
+        its socket removed, so that the next command transparently establishes a new one
+        :param cluster_node: Cluster node
+        """
+        now = time.time()
+        with self._mutex:
+            last_checked = self._last_checked.get(cluster_node)
+            if last_checked is not None and \
+                    now - last_checked < settings.SLURM_SSH_CHECK_INTERVAL:
+                return
+            self._last_checked[cluster_node] = now
+        if last_checked is not None and self._control(cluster_node, 'check') != 0:
+            log.info(1, 'SSH master connection to ' + cluster_node + ' is stale, resetting')
+            if self._control(cluster_node, 'stop') != 0:
+                try:
+                    os.remove(self.control_path(cluster_node))
+                except OSError as e:
+                    log.debug(1, str(e))
+
+    def _control(self, cluster_node, operation):
+        """
+        Sends a control command to the master connection of the given cluster node. Note that
+        'stop' only prevents new channels from being opened, so that renderers started through
+        the master connection keep running until they exit
+        :param cluster_node: Cluster node
+        :param operation: Control operation (check or stop)
+        :return: The return code of the ssh control command
+        """
+        try:
+            process = subprocess.Popen(
+                ['/usr/bin/ssh -O ' + operation + self.options() +
+                 global_settings.SLURM_USERNAME + '@' + cluster_node],
+                shell=True,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE)
+            process.communicate()
+            return process.returncode
+        except OSError as e:
+            log.error(str(e))
+            return -1
+
+
+# Global SSH connection pool used for all Slurm commands
+globalSshConnectionPool = SshConnectionPool()
@@ -30,7 +30,6 @@ The Unicore job manager is in charge of managing Unicore jobs.
 """
 
 import requests
-from threading import Lock
 import json
 import re
 
@@ -41,6 +40,12 @@ from rendering_resource_manager_service.session.models import \
     SESSION_STATUS_STARTING, SESSION_STATUS_RUNNING, \
     SESSION_STATUS_STOPPING, SESSION_STATUS_SCHEDULED
 import rendering_resource_manager_service.service.settings as global_settings
+from rendering_resource_manager_service.utils.keyed_lock import KeyedLock
+
+# The manager keeps the registry, the working directory and the authentication token of the job
+# being handled, and an allocation clears all the jobs of the user. Unicore state transitions are
+# therefore serialized for the whole manager rather than per session
+UNICORE_LOCK_KEY = 'unicore'
 
 
 class UnicoreJobManager(object):
@@ -50,9 +55,9 @@ class UnicoreJobManager(object):
 
     def __init__(self):
         """
-        Setup job manager
+        Setup job manager. State transitions are serialized for the whole manager
         """
-        self._mutex = Lock()
+        self._locks = KeyedLock('Unicore')
         self._base_url = None
         self._registry_url = None
         self._http_proxies = global_settings.UNICORE_DEFAULT_HTTP_PROXIES
@@ -240,49 +245,49 @@ class UnicoreJobManager(object):
             self.upload(self._work_dir + "/files", input_file)
         log.info(1, r.content)
 
-    def allocate(self, session, job_information):
+    def allocate(self, session, job_information, auth_token=None):
         """
         Allocates a job according to rendering resource configuration. If the allocation is
         successful, the session job_id is populated and the session status is set to
         SESSION_STATUS_SCHEDULED
         :param session: Current user session
         :param job_information: Information about the job
+        :param auth_token: Token for Unicore authentication, the current one is used if None
         :return: A Json response containing on ok status or a description of the error
         """
         try:
-            self._mutex.acquire()
-            self._registry_url = self.get_sites()[global_settings.UNICORE_DEFAULT_SITE]
-            # get information about the current user, e.g.
-            # role, Unix login and group(s)
-            props = self.get_properties(self._registry_url)
-            if not 'user' == props['client']['role']['selected']:
-                log.error('Account is not registered on the selected site')
-            self.clear_jobs(props)
-            # setup the job - please refer to the following link
-            # https://unicore-dev.zam.kfa-juelich.de/documentation/
-            #   ucc-7.8.0/ucc-manual.html#ucc_jobdescription
-            job_information.job = dict()
-
-            # Use a shell script, often it is better to setup a server-side 'Application' for a
-            # simulation code and invoke that
-            job_information.job['ApplicationName'] = 'Bash shell'
-            job_information.job['Parameters'] = {'SOURCE': 'input.sh'}
-            # Request resources nodes etc
-            job_information.job['Resources'] = {'Nodes': max(1, job_information.nb_nodes)}
-
-            # Submit the job
-            self.submit(session, job_information)
-            session.status = SESSION_STATUS_SCHEDULED
-            session.save()
-            response = 'Job submitted to %s' % session.job_id
-            log.info(1, response)
-            return [200, response]
+            with self._locks.hold(UNICORE_LOCK_KEY):
+                if auth_token is not None:
+                    self._auth_token = auth_token
+                self._registry_url = self.get_sites()[global_settings.UNICORE_DEFAULT_SITE]
+                # get information about the current user, e.g.
+                # role, Unix login and group(s)
+                props = self.get_properties(self._registry_url)
+                if not 'user' == props['client']['role']['selected']:
+                    log.error('Account is not registered on the selected site')
+                self.clear_jobs(props)
+                # setup the job - please refer to the following link
+                # https://unicore-dev.zam.kfa-juelich.de/documentation/
+                #   ucc-7.8.0/ucc-manual.html#ucc_jobdescription
+                job_information.job = dict()
+
+                # Use a shell script, often it is better to setup a server-side 'Application' for a
+                # simulation code and invoke that
+                job_information.job['ApplicationName'] = 'Bash shell'
+                job_information.job['Parameters'] = {'SOURCE': 'input.sh'}
+                # Request resources nodes etc
+                job_information.job['Resources'] = {'Nodes': max(1, job_information.nb_nodes)}
+
+                # Submit the job
+                self.submit(session, job_information)
+                session.status = SESSION_STATUS_SCHEDULED
+                session.save(update_fields=['job_id', 'status'])
+                response = 'Job submitted to %s' % session.job_id
+                log.info(1, response)
+                return [200, response]
         except RuntimeError as e:
             log.info(1, e)
             return [403, str(e)]
-        finally:
-            if self._mutex.locked():
-                self._mutex.release()
 
     def schedule(self, session, job_information, auth_token):
         """
@@ -293,8 +298,7 @@ class UnicoreJobManager(object):
         :param auth_token: Token for Unicore authentication
         :return: A Json response containing on ok status or a description of the error
         """
-        self._auth_token = auth_token
-        return self.allocate(session, job_information)
+        return self.allocate(session, job_information, auth_token)
 
     @staticmethod
     def _build_start_command_line(session, job_information):
@@ -351,16 +355,16 @@ class UnicoreJobManager(object):
         :return: A Json response containing on ok status or a description of the error
         """
         try:
-            self._mutex.acquire()
-            self.invoke_action(session.job_id, 'start')
-
-            rr_settings = \
-                manager.RenderingResourceSettingsManager.get_by_id(session.configuration_id.lower())
-            if not rr_settings.wait_until_running:
-                session.status = SESSION_STATUS_RUNNING
-                session.save()
-            response = json.dumps({'message': session.configuration_id + ' successfully started'})
-            return [200, response]
+            with self._locks.hold(UNICORE_LOCK_KEY):
+                self.invoke_action(session.job_id, 'start')
+
+                rr_settings = manager.RenderingResourceSettingsManager.get_by_id(
+                    session.configuration_id.lower())
+                if not rr_settings.wait_until_running:
+                    session.transition(SESSION_STATUS_RUNNING)
+                response = json.dumps(
+                    {'message': session.configuration_id + ' successfully started'})
+                return [200, response]
         except RuntimeError as e:
             log.error(str(e))
             response = json.dumps({'contents': str(e)})
@@ -369,9 +373,6 @@ class UnicoreJobManager(object):
             log.error(str(e))
             response = json.dumps({'contents': str(e)})
             return [400, response]
-        finally:
-            if self._mutex.locked():
-                self._mutex.release()
 
     def stop(self, session):
         """
@@ -380,11 +381,9 @@ class UnicoreJobManager(object):
         :return: A Json response containing on ok status or a description of the error
         """
         result = [500, 'Unexpected error']
-        try:
+        with self._locks.hold(UNICORE_LOCK_KEY):
             self._work_dir = None
-            self._mutex.acquire()
-            session.status = SESSION_STATUS_STOPPING
-            session.save()
+            session.transition(SESSION_STATUS_STOPPING)
 
             # make sure UNICORE does not start the job before we have uploaded data
             r = requests.delete(session.job_id, proxies=self._http_proxies,
@@ -396,11 +395,15 @@ class UnicoreJobManager(object):
                     obj = json.loads(r.content)
                     message = obj['errorMessage']
                 raise RuntimeError('Error deleting job: ' + message)
-        finally:
-            if self._mutex.locked():
-                self._mutex.release()
         return result
 
+    def lock_statistics(self):
+        """
+        Returns the contention counters of the manager lock
+        :return: A dictionary containing the lock contention counters
+        """
+        return self._locks.statistics()
+
     @staticmethod
     def kill(session):
         """
@@ -450,8 +453,7 @@ class UnicoreJobManager(object):
                         log.info(1, 'Log: ' + log_file)
                         value = re.search(r'HOSTNAME=(\w+)', log_file).group(1)
                         log.info(1, 'HOSTNAME=' + str(value))
-                        session.status = SESSION_STATUS_STARTING
-                        session.save()
+                        session.transition(SESSION_STATUS_STARTING)
                     except AttributeError as e:
                         value = ''
         except KeyError as e:
@@ -25,7 +25,10 @@
 This modules defines the data model for the rendering resource manager
 """
 
+import hashlib
+
 from django.db import models
+from django.dispatch import Signal
 
 
 SESSION_STATUS_STOPPED = 0
@@ -38,33 +41,117 @@ SESSION_STATUS_STOPPING = 6
 SESSION_STATUS_FAILED = 7
 SESSION_STATUS_BUSY = 8
 
+# Sent when the status of a session is modified through Session.transition
+session_status_changed = Signal(providing_args=['session', 'previous_status'])
+
+
+def job_key(job_id):
+    """
+    Computes the indexed key of a job identifier. Job identifiers can be long URLs, too long
+    to be indexed efficiently, so sessions are looked up by the SHA-1 digest of their job id
+    :param job_id: Job identifier
+    :return: The hexadecimal digest of the job identifier, or an empty string if there is no job
+    """
+    if not job_id:
+        return ''
+    return hashlib.sha1(str(job_id)).hexdigest()
+
 
 class Session(models.Model):
     """
     An user session
     """
 
-    id = models.CharField(max_length=20, primary_key=True)
+    # Session ids are UUIDs (36 characters), and hosts fully qualified domain names
+    id = models.CharField(max_length=64, primary_key=True)
     created = models.DateTimeField(auto_now_add=True)
-    valid_until = models.DateTimeField(auto_now_add=False)
-    owner = models.CharField(max_length=20)
-    configuration_id = models.CharField(default='undefined', max_length=50)
+    valid_until = models.DateTimeField(auto_now_add=False, db_index=True)
+    owner = models.CharField(max_length=128, db_index=True)
+    configuration_id = models.CharField(default='undefined', max_length=50, db_index=True)
     job_id = models.CharField(max_length=2048, default='')
+    job_key = models.CharField(max_length=40, default='', db_index=True)
     process_pid = models.IntegerField(default=-1)
-    http_host = models.CharField(default='localhost', max_length=20)
+    http_host = models.CharField(default='localhost', max_length=255)
     http_port = models.IntegerField(default=0)
     command = models.CharField(max_length=20, default='')
     parameters = models.CharField(max_length=2048, default='')
-    status = models.IntegerField(default=0)
-    cluster_node = models.CharField(max_length=512, default='')
+    status = models.IntegerField(default=0, db_index=True)
+    cluster_node = models.CharField(max_length=512, default='', db_index=True)
 
     class Meta(object):
         """
         A Meta object for the Session
         """
         ordering = ('id', 'created',)
+        # Expired sessions are looked up by status and validity
+        index_together = [('status', 'valid_until')]
 
     def __str__(self):
         return '%s, %s' % (self.owner, self.configuration_id)
 
+    @classmethod
+    def by_job_id(cls, job_id):
+        """
+        :param job_id: Job identifier
+        :return: A query set of the sessions holding the given job, using the job key index
+        """
+        # pylint: disable=E1101
+        return cls.objects.filter(job_key=job_key(job_id), job_id=job_id)
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the session, keeping the job key in line with the job id
+        """
+        self.job_key = job_key(self.job_id)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'job_id' in update_fields and \
+                'job_key' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['job_key']
+        super(Session, self).save(*args, **kwargs)
+
+    def transition(self, status=None, expected=None, **changes):
+        """
+        Writes the given changes to the database. Only modified columns are written, and
+        nothing is written if no value changes. When expected statuses are given, the update
+        only applies if the status stored in the database is one of them, so that concurrent
+        requests cannot undo each other's transitions. They are checked against the database
+        even if no value changes, since the session may be stale
+        :param status: New status of the session, None to keep the current one
+        :param expected: Status, or list of statuses, the session must currently be in
+        :param changes: Other fields to modify, with their new values
+        :return: True if the changes were applied, False if the session does not exist or
+                 was not in one of the expected statuses. In the latter case, the status is
+                 reloaded from the database
+        """
+        if status is not None:
+            changes['status'] = status
+        changes = dict([(name, value) for name, value in changes.items()
+                        if getattr(self, name) != value])
+        if not changes and expected is None:
+            return True
+        if 'job_id' in changes:
+            changes['job_key'] = job_key(changes['job_id'])
+        # pylint: disable=E1101
+        sessions = Session.objects.filter(id=self.id)
+        if expected is not None:
+            if not isinstance(expected, (list, tuple)):
+                expected = [expected]
+            sessions = sessions.filter(status__in=expected)
+        if changes:
+            applied = sessions.update(**changes) != 0
+        else:
+            applied = sessions.exists()
+        if not applied:
+            for current_status in Session.objects.filter(id=self.id).values_list(
+                    'status', flat=True):
+                self.status = current_status
+            return False
+        previous_status = self.status
+        for name, value in changes.items():
+            setattr(self, name, value)
+        if 'status' in changes:
+            session_status_changed.send(
+                sender=Session, session=self, previous_status=previous_status)
+        return True
+
     __unicode__ = __str__
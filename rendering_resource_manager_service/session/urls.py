@@ -29,7 +29,7 @@ Defines application URLs
 
 from django.conf.urls import patterns, url
 from rendering_resource_manager_service.session.views import \
-    SessionViewSet, CommandViewSet, SessionDetailsViewSet
+    SessionViewSet, CommandViewSet, SessionDetailsViewSet, SessionBulkViewSet
 from rest_framework.urlpatterns import format_suffix_patterns
 
 session_list = SessionViewSet.as_view({
@@ -40,6 +40,20 @@ session_list = SessionViewSet.as_view({
 session_details = SessionDetailsViewSet.as_view({
     'get': 'get_session',
 })
+session_bulk = SessionBulkViewSet.as_view({
+    'post': 'execute',
+    'put': 'execute',
+})
+session_status_stream = CommandViewSet.as_view({
+    'get': 'status_stream',
+})
+session_tunnel = CommandViewSet.as_view({
+    'get': 'tunnel',
+})
+session_batch = CommandViewSet.as_view({
+    'post': 'batch',
+    'put': 'batch',
+})
 session_command = CommandViewSet.as_view({
     'get': 'execute',
     'put': 'execute',
@@ -49,6 +63,10 @@ urlpatterns = patterns(
     '',
     url(r'/session/$', session_list),
     url(r'/session/(?P<pk>[a-zA-Z0-9]+)/$', session_details),
+    url(r'/session/status/stream$', session_status_stream),
+    url(r'/session/bulk/(?P<command>[a-zA-Z0-9]+)$', session_bulk),
+    url(r'/session/tunnel/(?P<path>.*)$', session_tunnel),
+    url(r'/session/batch$', session_batch),
     url(r'/session/(?P<command>[a-zA-Z0-9]+)', session_command),
 )
 
@@ -29,13 +29,18 @@
 This modules defines the data structure used by the rendering resource manager to manager
 user session
 """
+import base64
 import requests
 import random
 import json
 import traceback
+import hashlib
+import socket
+import time
 
-from rest_framework import serializers, viewsets
-from django.http import HttpResponse
+from rest_framework import serializers, viewsets, renderers
+from rest_framework.settings import api_settings
+from django.http import HttpResponse, StreamingHttpResponse
 import management.session_manager_settings as consts
 import rendering_resource_manager_service.service.settings as settings
 import rendering_resource_manager_service.utils.custom_logging as log
@@ -43,9 +48,20 @@ import rendering_resource_manager_service.utils.tools as tools
 from rendering_resource_manager_service.session.models import Session
 from rendering_resource_manager_service.session.management import job_manager
 from rendering_resource_manager_service.session.management import process_manager
+from rendering_resource_manager_service.session.management.renderer_connection_pool import \
+    globalRendererConnectionPool
+from rendering_resource_manager_service.session.management.renderer_request_coalescer import \
+    globalRendererRequestCoalescer
+from rendering_resource_manager_service.session.management.renderer_tunnel import \
+    globalRendererTunnels, handshake
+from rendering_resource_manager_service.session.management.session_routing_table import \
+    Route, globalSessionRoutingTable
+from rendering_resource_manager_service.session.management.session_status_notifier import \
+    globalSessionStatusNotifier
 import management.session_manager as session_manager
 from rendering_resource_manager_service.session.models import \
-    SESSION_STATUS_GETTING_HOSTNAME, SESSION_STATUS_SCHEDULED, SESSION_STATUS_STARTING
+    SESSION_STATUS_GETTING_HOSTNAME, SESSION_STATUS_SCHEDULED, SESSION_STATUS_STARTING, \
+    SESSION_STATUS_SCHEDULING, SESSION_STATUS_STOPPED, SESSION_STATUS_FAILED
 
 
 class SessionSerializer(serializers.ModelSerializer):
@@ -191,16 +207,35 @@ class SessionViewSet(viewsets.ModelViewSet):
             return HttpResponse(status=401, content='Unexpected exception')
 
     @classmethod
-    # pylint: disable=W0613
     def list_sessions(cls, request):
         """
-        List all session
-        :param : request: request containing the launching parameters of the rendering resource
-        :rtype : An HTTP response containing on ok status or a description of the error
-        """
-        sm = session_manager.SessionManager()
-        status = sm.list_sessions(SessionSerializer)
-        return HttpResponse(status=status[0], content=status[1])
+        Lists the sessions, one page at a time. The query parameters filter the sessions
+        (owner, status, configuration_id, cluster_node), select the returned fields (fields,
+        a comma separated list of session details) and the page (cursor, limit)
+        :param : request: request containing the listing parameters
+        :rtype : An HTTP response containing the sessions and the cursor of the next page, or a
+                 description of the error
+        """
+        parameters = request.QUERY_PARAMS
+        filters = dict()
+        for name in consts.SESSION_LIST_FILTERS:
+            if name in parameters:
+                filters[name] = parameters[name]
+        fields = SessionSerializer.Meta.fields
+        if parameters.get('fields'):
+            fields = parameters['fields'].split(',')
+        try:
+            if 'status' in filters:
+                filters['status'] = int(filters['status'])
+            sm = session_manager.SessionManager()
+            status = sm.list_sessions(
+                SessionDetailsSerializer, filters=filters, fields=fields,
+                cursor=parameters.get('cursor'), limit=parameters.get('limit'))
+        except ValueError as e:
+            log.error(str(e))
+            response = json.dumps({'contents': 'Invalid request: ' + str(e)})
+            return HttpResponse(status=400, content=response)
+        return HttpResponse(status=status[0], content=status[1], content_type='application/json')
 
     @classmethod
     def destroy_session(cls, request):
@@ -217,6 +252,79 @@ class SessionViewSet(viewsets.ModelViewSet):
         return HttpResponse(status=status[0], content=status[1])
 
 
+class SessionBulkViewSet(viewsets.ModelViewSet):
+    """
+    Applies session operations to several sessions at once
+    """
+
+    queryset = Session.objects.all()
+    serializer_class = SessionSerializer
+
+    @classmethod
+    def execute(cls, request, command):
+        """
+        Executes a bulk command. The body of the request contains the number of sessions to
+        create (create), or the ids of the sessions to process (schedule, status, delete)
+        :param : request: The REST request
+        :param : command: Bulk command to execute
+        :rtype : An HTTP response containing the result of the command for every session
+        """
+        sm = session_manager.SessionManager()
+        body = request.DATA
+        try:
+            if command == 'create':
+                status = sm.create_sessions(
+                    body['owner'], body['configuration_id'], int(body.get('count', 1)))
+            elif command == 'schedule':
+                status = sm.schedule_jobs(
+                    body['session_ids'], parse_job_information(body),
+                    sm.get_authentication_token_from_request(request))
+            elif command == 'status':
+                status = sm.query_statuses(body['session_ids'])
+            elif command == 'delete':
+                status = sm.delete_sessions(body['session_ids'])
+            else:
+                response = json.dumps({'contents': 'Unknown bulk command ' + command})
+                return HttpResponse(status=404, content=response)
+        except (KeyError, TypeError, ValueError) as e:
+            log.error(str(e))
+            response = json.dumps({'contents': 'Invalid request: ' + str(e)})
+            return HttpResponse(status=400, content=response)
+        return HttpResponse(status=status[0], content=status[1])
+
+
+def parse_job_information(body):
+    """
+    Builds the job information from the body of a scheduling request
+    :param : body: Dictionary containing the job parameters
+    :rtype : The job information
+    """
+    job_information = job_manager.JobInformation()
+    job_information.params = body.get('params')
+    job_information.environment = body.get('environment')
+    job_information.reservation = body.get('reservation')
+    job_information.nb_cpus = body.get('nb_cpus', 0)
+    job_information.nb_gpus = body.get('nb_gpus', 0)
+    job_information.nb_nodes = body.get('nb_nodes', 0)
+    job_information.memory = body.get('memory', 0)
+    job_information.queue = body.get('queue')
+    job_information.exclusive_allocation = body.get('exclusive', False)
+    job_information.allocation_time = body.get('allocation_time', settings.SLURM_DEFAULT_TIME)
+    return job_information
+
+
+class EventStreamRenderer(renderers.BaseRenderer):
+    """
+    Declares the text/event-stream media type, so that requests for server-sent events pass
+    the content negotiation. The events themselves are generated by the view
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
 class CommandViewSet(viewsets.ModelViewSet):
     """
     ViewSets define the view behavior
@@ -224,6 +332,10 @@ class CommandViewSet(viewsets.ModelViewSet):
 
     queryset = Session.objects.all()
     serializer_class = CommandSerializer
+    renderer_classes = list(api_settings.DEFAULT_RENDERER_CLASSES) + [EventStreamRenderer]
+
+    # Commands handled by the service. Other commands are forwarded to the rendering resource
+    SESSION_COMMANDS = ('schedule', 'open', 'status', 'log', 'err', 'job')
 
     @classmethod
     def execute(cls, request, command):
@@ -237,6 +349,17 @@ class CommandViewSet(viewsets.ModelViewSet):
         try:
             session_id = session_manager.SessionManager().get_session_id_from_request(request)
             log.info(2, 'Processing command <' + command + '> for session ' + str(session_id))
+            if command not in cls.SESSION_COMMANDS:
+                # Commands for running sessions are forwarded without reading the session
+                route = globalSessionRoutingTable.lookup(session_id)
+                if route is not None:
+                    response = cls.__forward_routed_request(
+                        session_id, route, cls.__renderer_command(request), request)
+                    if response is not None:
+                        # Commands keep the session alive, as status queries do
+                        session_manager.SessionManager.keep_alive_session(
+                            session_id, check_existence=False)
+                        return response
             session = Session.objects.get(id=session_id)
             response = None
             if command == 'schedule':
@@ -257,10 +380,7 @@ class CommandViewSet(viewsets.ModelViewSet):
                 status = cls.__job_information(session)
                 response = HttpResponse(status=status[0], content=status[1])
             else:
-                url = request.get_full_path()
-                prefix = settings.BASE_URL_PREFIX + '/session/'
-                cmd = url[url.find(prefix) + len(prefix) + 1: len(url)]
-                response = cls.__forward_request(session, cmd, request)
+                response = cls.__forward_request(session, cls.__renderer_command(request), request)
             return response
         except (KeyError, TypeError) as e:
             log.debug(1, str(traceback.format_exc(e)))
@@ -281,33 +401,273 @@ class CommandViewSet(viewsets.ModelViewSet):
             response = json.dumps({'contents': str(msg)})
             return HttpResponse(status=500, content=response)
 
+    @classmethod
+    def status_stream(cls, request):
+        """
+        Streams the status of a session. Clients accepting text/event-stream receive a
+        server-sent event for every status change. Other clients get a long-poll: the request
+        is held until the status differs from the version given in the If-None-Match header
+        (or the version parameter), or until SESSION_STATUS_LONG_POLL_TIMEOUT seconds have
+        elapsed, in which case 304 is returned. The status is only read again when the session
+        status notifier reports a change, or every SESSION_STATUS_STREAM_RECHECK seconds.
+        Waiting requests hold a worker: serve this endpoint with the asynchronous engine, or
+        with workers dedicated to it, so that idle viewers do not exhaust the threaded workers
+        :param : request: The REST request
+        :rtype : An HTTP response containing the status of the session
+        """
+        try:
+            session_id = session_manager.SessionManager().get_session_id_from_request(request)
+        except KeyError:
+            response = json.dumps({'contents': 'Cookie is missing'})
+            return HttpResponse(status=404, content=response)
+
+        if 'text/event-stream' in request.META.get('HTTP_ACCEPT', ''):
+            response = StreamingHttpResponse(
+                cls.__status_events(session_id, request.META.get('HTTP_LAST_EVENT_ID')),
+                content_type='text/event-stream')
+            response['Cache-Control'] = 'no-cache'
+            return response
+
+        version = request.META.get('HTTP_IF_NONE_MATCH', '').strip('"')
+        version = request.QUERY_PARAMS.get('version', version)
+        now = time.time()
+        deadline = now + consts.SESSION_STATUS_LONG_POLL_TIMEOUT
+        changed = True
+        recheck = now
+        while True:
+            if changed or now >= recheck:
+                notifier_version = globalSessionStatusNotifier.version(session_id)
+                status = cls.__current_status(session_id)
+                status_version = cls.__status_version(status)
+                recheck = now + consts.SESSION_STATUS_STREAM_RECHECK
+                if status_version != version:
+                    response = HttpResponse(status=status[0], content=status[1])
+                    break
+            if now >= deadline:
+                response = HttpResponse(status=304)
+                break
+            changed = globalSessionStatusNotifier.wait(
+                session_id, notifier_version, min(deadline, recheck) - now)
+            now = time.time()
+        response['ETag'] = '"' + status_version + '"'
+        return response
+
+    @classmethod
+    def tunnel(cls, request, path):
+        """
+        Tunnels an upgraded connection, typically a WebSocket, between the viewer and the
+        rendering resource. The session is verified once, then the upgrade request is sent to
+        the rendering resource and data is relayed in both directions, including the
+        handshake response, until either side closes the connection
+        :param : request: The upgrade request
+        :param : path: Path of the endpoint on the rendering resource
+        :rtype : An HTTP response if the tunnel could not be opened
+        """
+        try:
+            session_id = session_manager.SessionManager().get_session_id_from_request(request)
+        except KeyError:
+            response = json.dumps({'contents': 'Cookie is missing'})
+            return HttpResponse(status=404, content=response)
+
+        if 'HTTP_UPGRADE' not in request.META or \
+                'upgrade' not in request.META.get('HTTP_CONNECTION', '').lower():
+            response = json.dumps({'contents': 'Upgrade request expected'})
+            return HttpResponse(status=400, content=response)
+
+        # The connection of the viewer is taken over from the WSGI server
+        client = request.META.get('gunicorn.socket')
+        if client is None:
+            response = json.dumps({'contents': 'Tunnels are not supported by this server'})
+            return HttpResponse(status=501, content=response)
+
+        route, response = cls.__renderer_route(session_id)
+        if response is not None:
+            return response
+        http_host, http_port = route.http_host, route.http_port
+
+        query = request.META.get('QUERY_STRING', '')
+        if query:
+            path += '?' + query
+        try:
+            tunnel = globalRendererTunnels.open(
+                session_id, client, http_host, http_port,
+                handshake(request.method, path, tools.get_request_headers(request),
+                          http_host, http_port))
+        except socket.error as e:
+            if route.version is not None:
+                globalSessionRoutingTable.remove(session_id, route.version)
+            response = json.dumps({'contents': str(e)})
+            return HttpResponse(status=503, content=response)
+
+        log.info(1, 'Tunnel of session ' + str(session_id) + ' opened to ' +
+                 http_host + ':' + str(http_port) + '/' + path)
+        globalRendererTunnels.relay(tunnel)
+        # The connection has been closed by the tunnel, the WSGI server has nothing to send
+        return HttpResponse(status=101)
+
+    @classmethod
+    def batch(cls, request):
+        """
+        Executes an ordered list of commands on the rendering resource of a session. The
+        session is looked up once and the commands are pipelined to the rendering resource
+        over a single keep-alive connection. The body of the request contains the commands,
+        each with its name (including the query string), and optionally its HTTP method
+        (defaults to the method of the batch) and body. When stop_on_failure is set, the
+        commands following a failed one are not executed
+        :param : request: The REST request
+        :rtype : An HTTP response containing, for every command, its status, the content type
+                 of its response and its base64 encoded response
+        """
+        try:
+            session_id = session_manager.SessionManager().get_session_id_from_request(request)
+        except KeyError:
+            response = json.dumps({'contents': 'Cookie is missing'})
+            return HttpResponse(status=404, content=response)
+
+        try:
+            body = request.DATA
+            stop_on_failure = bool(body.get('stop_on_failure', False))
+            commands = []
+            for command in body['commands']:
+                data = command.get('body', '')
+                if not isinstance(data, basestring):
+                    data = json.dumps(data)
+                commands.append((str(command.get('method', request.method)).upper(),
+                                 str(command['command']).lstrip('/'), data))
+        except (KeyError, TypeError, AttributeError) as e:
+            response = json.dumps({'contents': 'Invalid request: ' + str(e)})
+            return HttpResponse(status=400, content=response)
+        if len(commands) == 0 or len(commands) > consts.SESSION_BATCH_MAX_COMMANDS:
+            response = json.dumps({'contents': 'A batch contains from 1 to ' + str(
+                consts.SESSION_BATCH_MAX_COMMANDS) + ' commands'})
+            return HttpResponse(status=400, content=response)
+
+        route, response = cls.__renderer_route(session_id)
+        if response is not None:
+            return response
+        log.info(1, 'Sending ' + str(len(commands)) + ' commands to ' + route.http_host + ':' +
+                 str(route.http_port))
+        headers = tools.get_request_headers(request)
+        results = globalRendererConnectionPool.pipeline(
+            route.http_host, route.http_port, commands, headers, stop_on_failure,
+            settings.REQUEST_TIMEOUT)
+        if results[-1][0] is None and route.version is not None:
+            globalSessionRoutingTable.remove(session_id, route.version)
+
+        contents = []
+        for index, (_, command, _) in enumerate(commands):
+            if index < len(results):
+                status, content_type, content = results[index]
+                if status is None:
+                    status, content_type = 503, 'text/plain'
+            else:
+                status, content_type, content = \
+                    424, 'text/plain', 'Not executed after a failed command'
+            # Responses can be binary, images or compressed data for instance
+            contents.append({'command': command, 'status': status,
+                             'contentType': content_type, 'contents': base64.b64encode(content)})
+        return HttpResponse(status=200, content=json.dumps({'contents': contents}))
+
+    @classmethod
+    def __status_events(cls, session_id, last_version):
+        """
+        Generates a server-sent event for every status change of the given session. The
+        stream ends when the session is stopped, has failed or does not exist anymore, and
+        after SESSION_STATUS_STREAM_DURATION seconds
+        :param : session_id: Id of the session
+        :param : last_version: Version of the last status received by the client, if any
+        :rtype : A generator of server-sent events
+        """
+        yield 'retry: ' + str(consts.SESSION_STATUS_STREAM_RETRY) + '\n\n'
+        now = time.time()
+        deadline = now + consts.SESSION_STATUS_STREAM_DURATION
+        last_sent = now
+        changed = True
+        recheck = now
+        while now < deadline:
+            if changed or now >= recheck:
+                notifier_version = globalSessionStatusNotifier.version(session_id)
+                status = cls.__current_status(session_id)
+                status_version = cls.__status_version(status)
+                recheck = now + consts.SESSION_STATUS_STREAM_RECHECK
+                if status_version != last_version:
+                    content = status[1]
+                    if status[0] != 200:
+                        content = json.dumps({'http_code': status[0], 'contents': status[1]})
+                    yield 'id: ' + status_version + '\nevent: status\ndata: ' + content + \
+                          '\n\n'
+                    last_version = status_version
+                    last_sent = now
+                    if status[0] != 200 or \
+                            json.loads(status[1])['code'] in [SESSION_STATUS_STOPPED,
+                                                              SESSION_STATUS_FAILED]:
+                        return
+            if now - last_sent >= consts.SESSION_STATUS_STREAM_HEARTBEAT:
+                # Comment lines keep proxies from closing idle connections
+                yield ': keep-alive\n\n'
+                last_sent = now
+            changed = globalSessionStatusNotifier.wait(
+                session_id, notifier_version,
+                min(deadline, recheck, last_sent + consts.SESSION_STATUS_STREAM_HEARTBEAT) - now)
+            now = time.time()
+
+    @classmethod
+    def __current_status(cls, session_id):
+        """
+        Returns the current status of the given session
+        :param : session_id: Id of the session
+        :rtype : A list containing the HTTP code and the JSON status of the session
+        """
+        try:
+            session = Session.objects.get(id=session_id)
+        except Session.DoesNotExist:
+            return [404, json.dumps({'contents': 'Session does not exist'})]
+        return cls.__session_status(session)
+
+    @staticmethod
+    def __status_version(status):
+        """
+        Computes a version token identifying a session status. The age of the renderer probe
+        is ignored, so that the token only changes on actual transitions
+        :param : status: List containing the HTTP code and the JSON status of the session
+        :rtype : A string containing the version token
+        """
+        content = status[1]
+        try:
+            values = json.loads(content)
+            values.pop('age', None)
+            content = json.dumps(values, sort_keys=True)
+        except (ValueError, AttributeError):
+            pass
+        return hashlib.md5(str(status[0]) + content).hexdigest()[:16]
+
     @classmethod
     def __schedule_job(cls, session, request):
         """
-        Starts a rendering resource by scheduling a slurm job
+        Starts a rendering resource by queuing the scheduling of a slurm job. The job is
+        scheduled in the background and its progress is reported by the session status
         :param : session: Session holding the rendering resource
         :param : request: HTTP request with a body containing a JSON representation of the job
                  parameters
-        :rtype : An HTTP response containing the status and description of the command
+        :rtype : An HTTP response containing the status and description of the command. 202 if
+                 the job submission was queued, 503 if the submission queue is full
         """
-        job_information = job_manager.JobInformation()
-        body = request.DATA
-        job_information.params = body.get('params')
-        job_information.environment = body.get('environment')
-        job_information.reservation = body.get('reservation')
-        job_information.nb_cpus = body.get('nb_cpus', 0)
-        job_information.nb_gpus = body.get('nb_gpus', 0)
-        job_information.nb_nodes = body.get('nb_nodes', 0)
-        job_information.memory = body.get('memory', 0)
-        job_information.queue = body.get('queue')
-        job_information.exclusive_allocation = body.get('exclusive', False)
-        job_information.allocation_time = body.get('allocation_time', settings.SLURM_DEFAULT_TIME)
+        job_information = parse_job_information(request.DATA)
         sm = session_manager.SessionManager()
         auth_token = sm.get_authentication_token_from_request(request)
-        session.http_host = ''
-        session.http_port = consts.DEFAULT_RENDERER_HTTP_PORT + random.randint(0, 1000)
-        status = job_manager.globalJobManager.schedule(session, job_information, auth_token)
-        return HttpResponse(status=status[0], content=status[1])
+        session.transition(
+            SESSION_STATUS_SCHEDULING, http_host='',
+            http_port=consts.DEFAULT_RENDERER_HTTP_PORT + random.randint(0, 1000))
+        if not job_manager.submit_job(session.id, job_information, auth_token):
+            session.transition(SESSION_STATUS_STOPPED, expected=SESSION_STATUS_SCHEDULING)
+            response = HttpResponse(
+                status=503, content=json.dumps({'contents': 'Job submission queue is full'}))
+            response['Retry-After'] = str(consts.JOB_SUBMISSION_RETRY_AFTER)
+            return response
+        response = json.dumps({
+            'contents': 'Job submission queued',
+            'queueDepth': job_manager.globalJobSubmissionPool.queue_depth()})
+        return HttpResponse(status=202, content=response)
 
     @classmethod
     def __open_process(cls, session, request):
@@ -338,7 +698,7 @@ class CommandViewSet(viewsets.ModelViewSet):
             session.http_port = consts.DEFAULT_RENDERER_HTTP_PORT + random.randint(0, 1000)
             pm = process_manager.ProcessManager
             status = pm.start(session, parameters, environment)
-            session.save()
+            session.save(update_fields=['http_host', 'http_port', 'process_pid', 'status'])
             return HttpResponse(status=status[0], content=status[1])
         else:
             msg = 'process is already started'
@@ -354,18 +714,18 @@ class CommandViewSet(viewsets.ModelViewSet):
         :param : session: Session holding the rendering resource
         """
         log.info(2, 'Verifying hostname ' + session.http_host + ' for session ' + str(session.id))
+        # The conditional transition makes sure that only one request queries the hostname
         if not session.status == SESSION_STATUS_GETTING_HOSTNAME and \
-                session.job_id and session.http_host == '':
-            session.status = SESSION_STATUS_GETTING_HOSTNAME
-            session.save()
+                session.job_id and session.http_host == '' and \
+                session.transition(SESSION_STATUS_GETTING_HOSTNAME, expected=session.status):
             log.info(1, 'Querying JOB hostname for job id: ' + str(session.job_id))
             hostname = job_manager.globalJobManager.hostname(session)
             if hostname == '':
                 msg = 'Job scheduled but ' + session.configuration_id + ' is not yet running'
                 log.error(msg)
                 if session.status != SESSION_STATUS_STARTING:
-                    session.status = SESSION_STATUS_SCHEDULED
-                    session.save()
+                    session.transition(
+                        SESSION_STATUS_SCHEDULED, expected=SESSION_STATUS_GETTING_HOSTNAME)
                 response = json.dumps({'contents': str(msg)})
                 return [200, response]
             elif hostname == 'FAILED':
@@ -376,8 +736,7 @@ class CommandViewSet(viewsets.ModelViewSet):
                 response = json.dumps({'contents': str(msg)})
                 return [404, response]
             else:
-                session.http_host = hostname
-                session.save()
+                session.transition(http_host=hostname)
                 msg = 'Resolved hostname for job ' + str(session.job_id) + ' to ' + \
                       str(session.http_host)
                 log.info(1, msg)
@@ -467,17 +826,163 @@ class CommandViewSet(viewsets.ModelViewSet):
 
         try:
             # Any other command is forwarded to the rendering resource
-            url = 'http://' + session.http_host + ':' + str(session.http_port) + '/' + command
-            log.info(1, 'Querying ' + str(url))
-            headers = tools.get_request_headers(request)
-
-            response = requests.request(
-                method=request.method, timeout=settings.REQUEST_TIMEOUT,
-                url=url, headers=headers, data=request.body)
-
-            data = response.content
-            response.close()
-            return HttpResponse(status=response.status_code, content=data)
+            return cls.__send_to_renderer(
+                session.id, session.http_host, session.http_port, command, request,
+                tools.get_request_body_stream(request))
         except requests.exceptions.RequestException as e:
             response = json.dumps({'contents': str(e)})
             return HttpResponse(status=400, content=response)
+
+    @classmethod
+    def __renderer_route(cls, session_id):
+        """
+        Locates the rendering resource of a running session, from the routing table or from
+        the session status
+        :param : session_id: Id of the session
+        :rtype : A tuple containing the route of the session and None, or None and an HTTP
+                 response if the rendering resource is not available. Routes built from the
+                 session status have no version
+        """
+        route = globalSessionRoutingTable.lookup(session_id)
+        if route is not None:
+            # Routed sessions skip the status query, which would have kept them alive
+            session_manager.SessionManager.keep_alive_session(session_id, check_existence=False)
+            return route, None
+        try:
+            session = Session.objects.get(id=session_id)
+        except Session.DoesNotExist:
+            response = json.dumps({'contents': 'Session does not exist'})
+            return None, HttpResponse(status=404, content=response)
+        status = cls.__session_status(session)
+        if status[0] != 200:
+            return None, HttpResponse(status=status[0], content=status[1])
+        return Route(session.http_host, session.http_port, None), None
+
+    @classmethod
+    def __forward_routed_request(cls, session_id, route, command, request):
+        """
+        Forwards the HTTP request to the rendering resource of a running session, using the
+        routing table instead of the session status
+        :param : session_id: Id of the session
+        :param : route: Route of the session
+        :param : command: Command passed to the rendering resource
+        :param : request: HTTP request
+        :rtype : An HTTP response containing the status and description of the command, or None
+                 if the rendering resource could not be reached and the request can go through
+                 the session status
+        """
+        body = tools.get_request_body_stream(request)
+        try:
+            return cls.__send_to_renderer(
+                session_id, route.http_host, route.http_port, command, request, body)
+        except requests.exceptions.RequestException as e:
+            log.info(1, 'Route of session ' + str(session_id) + ' failed: ' + str(e))
+            globalSessionRoutingTable.remove(session_id, route.version)
+            if body is not None and body.position != 0:
+                # The request body cannot be sent twice
+                response = json.dumps({'contents': str(e)})
+                return HttpResponse(status=400, content=response)
+            return None
+
+    @classmethod
+    def __send_to_renderer(cls, session_id, http_host, http_port, command, request, body):
+        """
+        Sends the HTTP request to a rendering resource. Identical GET requests sent at the same
+        time for a session are coalesced into a single request to the rendering resource. The
+        first one is streamed, the others receive a copy of its response once complete
+        :param : session_id: Id of the session
+        :param : http_host: Hostname of the rendering resource
+        :param : http_port: Port of the rendering resource
+        :param : command: Command passed to the rendering resource
+        :param : request: HTTP request
+        :param : body: Stream of the request body, None if the request has no body
+        :rtype : An HTTP response containing the response of the rendering resource
+        """
+        log.info(1, 'Querying ' + http_host + ':' + str(http_port) + '/' + command)
+        headers = tools.get_request_headers(request)
+
+        if consts.RENDERER_COALESCING and request.method == consts.REST_VERB_GET:
+            key = globalRendererRequestCoalescer.key(session_id, command, headers)
+            if not consts.PROXY_STREAMING:
+                status, content_type, data = globalRendererRequestCoalescer.get(
+                    key, cls.__get_from_renderer, http_host, http_port, command, headers)
+                return HttpResponse(status=status, content=data, content_type=content_type)
+            shared, call = globalRendererRequestCoalescer.join(key)
+            if shared is not None:
+                status, content_type, data = shared
+                return HttpResponse(status=status, content=data, content_type=content_type)
+            if call is not None:
+                try:
+                    response = globalRendererConnectionPool.request(
+                        http_host, http_port, request.method, command,
+                        timeout=settings.REQUEST_TIMEOUT, headers=headers, stream=True)
+                # pylint: disable=W0703
+                except Exception as e:
+                    globalRendererRequestCoalescer.share(key, call, error=e)
+                    raise
+                content_type = response.headers.get('Content-Type', 'text/html; charset=utf-8')
+                return StreamingHttpResponse(
+                    streaming_content=globalRendererRequestCoalescer.stream(key, call, response),
+                    status=response.status_code, content_type=content_type)
+            # The identical request in flight takes too long, this one is not shared
+
+        if consts.PROXY_STREAMING:
+            response = globalRendererConnectionPool.request(
+                http_host, http_port, request.method, command,
+                timeout=settings.REQUEST_TIMEOUT, headers=headers, data=body, stream=True)
+            content_type = response.headers.get('Content-Type', 'text/html; charset=utf-8')
+            return StreamingHttpResponse(
+                streaming_content=cls.__stream_content(response),
+                status=response.status_code, content_type=content_type)
+
+        response = globalRendererConnectionPool.request(
+            http_host, http_port, request.method, command,
+            timeout=settings.REQUEST_TIMEOUT, headers=headers, data=request.body)
+
+        data = response.content
+        response.close()
+        return HttpResponse(status=response.status_code, content=data)
+
+    @staticmethod
+    def __get_from_renderer(http_host, http_port, command, headers):
+        """
+        Sends a GET request to a rendering resource and reads the whole response
+        :param : http_host: Hostname of the rendering resource
+        :param : http_port: Port of the rendering resource
+        :param : command: Command passed to the rendering resource
+        :param : headers: Headers of the request
+        :rtype : A tuple containing the status, the content type and the content of the response
+        """
+        response = globalRendererConnectionPool.request(
+            http_host, http_port, consts.REST_VERB_GET, command,
+            timeout=settings.REQUEST_TIMEOUT, headers=headers)
+        data = response.content
+        response.close()
+        return (response.status_code,
+                response.headers.get('Content-Type', 'text/html; charset=utf-8'), data)
+
+    @staticmethod
+    def __renderer_command(request):
+        """
+        Extracts the command passed to the rendering resource from the request URL
+        :param : request: HTTP request
+        :rtype : The command, including its query string
+        """
+        url = request.get_full_path()
+        prefix = settings.BASE_URL_PREFIX + '/session/'
+        return url[url.find(prefix) + len(prefix) + 1: len(url)]
+
+    @classmethod
+    def __stream_content(cls, response):
+        """
+        Passes the body of a rendering resource response through, chunk by chunk
+        :param : response: Streamed response from the rendering resource
+        :rtype : A generator of response chunks
+        """
+        try:
+            for chunk in response.iter_content(consts.PROXY_STREAMING_CHUNK_SIZE):
+                yield chunk
+        except requests.exceptions.RequestException as e:
+            log.error(str(e))
+        finally:
+            response.close()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+import os
+import socket
+import subprocess
+import sys
+import time
+from django.test import TestCase
+from nose import tools as nt
+from nose.plugins.skip import SkipTest
+import rendering_resource_manager_service.utils.custom_logging as log
+import rendering_resource_manager_service.service.settings as settings
+from rendering_resource_manager_service.session.management import keep_alive_thread
+from rendering_resource_manager_service.session.management import renderer_prober
+from rendering_resource_manager_service.session.management import slurm_job_poller
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeThread(object):
+    started = 0
+
+    def __init__(self, *args):
+        pass
+
+    def setDaemon(self, daemonic):
+        pass
+
+    def start(self):
+        FakeThread.started += 1
+
+
+class TestBackgroundThreads(TestCase):
+    def setUp(self):
+        self._background_threads = settings.BACKGROUND_THREADS
+        self._patched = [(keep_alive_thread, 'KeepAliveThread'),
+                         (renderer_prober, 'globalRendererProber'),
+                         (slurm_job_poller, 'globalSlurmJobPoller')]
+        self._originals = [getattr(module, name) for module, name in self._patched]
+        keep_alive_thread.KeepAliveThread = FakeThread
+        renderer_prober.globalRendererProber = FakeThread()
+        slurm_job_poller.globalSlurmJobPoller = FakeThread()
+        FakeThread.started = 0
+        # Importing the WSGI module must not start the real threads
+        settings.BACKGROUND_THREADS = settings.BACKGROUND_THREADS_NONE
+        from rendering_resource_manager_service.service import wsgi
+        self._wsgi = wsgi
+
+    def tearDown(self):
+        settings.BACKGROUND_THREADS = self._background_threads
+        for (module, name), original in zip(self._patched, self._originals):
+            setattr(module, name, original)
+        self._wsgi._background_threads_started = False
+
+    def test_selected_engine_only(self):
+        log.debug(1, 'test_selected_engine_only')
+        settings.BACKGROUND_THREADS = settings.BACKGROUND_THREADS_ASYNC
+        nt.assert_false(self._wsgi.start_background_threads(settings.BACKGROUND_THREADS_THREADED))
+        nt.assert_true(FakeThread.started == 0)
+        nt.assert_true(self._wsgi.start_background_threads(settings.BACKGROUND_THREADS_ASYNC))
+        nt.assert_true(FakeThread.started >= 2)
+        # Threads are started once per process
+        started = FakeThread.started
+        nt.assert_false(self._wsgi.start_background_threads(settings.BACKGROUND_THREADS_ASYNC))
+        nt.assert_true(FakeThread.started == started)
+
+    def test_disabled(self):
+        log.debug(1, 'test_disabled')
+        for engine in [settings.BACKGROUND_THREADS_THREADED, settings.BACKGROUND_THREADS_ASYNC]:
+            nt.assert_false(self._wsgi.start_background_threads(engine))
+        nt.assert_true(FakeThread.started == 0)
+
+
+class TestAsyncEngine(TestCase):
+    def test_serve(self):
+        log.debug(1, 'test_serve')
+        if subprocess.call([sys.executable, '-c', 'import gevent']) != 0:
+            raise SkipTest('gevent is not installed, see requirements_async.txt')
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        environment = dict(os.environ)
+        environment['RRM_BACKGROUND_THREADS'] = settings.BACKGROUND_THREADS_NONE
+        environment['PYTHONPATH'] = ROOT_DIR + os.pathsep + environment.get('PYTHONPATH', '')
+        engine = subprocess.Popen(
+            [sys.executable, '-m', 'rendering_resource_manager_service.service.async_wsgi',
+             '127.0.0.1:' + str(port)], env=environment, cwd=ROOT_DIR,
+            stdout=open(os.devnull, 'w'), stderr=subprocess.STDOUT)
+        try:
+            response = ''
+            deadline = time.time() + 30
+            while time.time() < deadline and not response:
+                try:
+                    connection = socket.create_connection(('127.0.0.1', port), 1)
+                except socket.error:
+                    time.sleep(0.1)
+                    continue
+                connection.sendall('GET /rendering-resource-manager/v1/unknown HTTP/1.0\r\n\r\n')
+                response = connection.recv(4096)
+                connection.close()
+            # The request reached the application, which does not know the URL
+            nt.assert_true(response.startswith('HTTP/1.1 404'))
+        finally:
+            engine.terminate()
+            engine.wait()
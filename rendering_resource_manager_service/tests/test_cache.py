@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+import time
+from django.core.cache import get_cache
+from django.test import TestCase
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+from rendering_resource_manager_service.utils import cache
+
+
+class TestCache(TestCase):
+    def setUp(self):
+        # Processes share invalidations through a local memory stand-in
+        cache.set_shared_cache(get_cache(
+            'django.core.cache.backends.locmem.LocMemCache', LOCATION='test-shared'))
+
+    def tearDown(self):
+        cache.set_shared_cache(None)
+
+    def test_local_cache(self):
+        log.debug(1, 'test_local_cache')
+        local_cache = cache.LocalCache('test', 60, 2)
+        local_cache.set('a', 1)
+        local_cache.set('b', 2)
+        # Reading a marks it as recently used, so that b is evicted
+        nt.assert_true(local_cache.get('a') == 1)
+        local_cache.set('c', 3)
+        nt.assert_true(local_cache.get('b') is None)
+        nt.assert_true(local_cache.get('c') == 3)
+        nt.assert_true(local_cache.statistics()['evictions'] == 1)
+        # Expired and too old entries are not returned
+        local_cache.set('d', 4, timeout=-1)
+        nt.assert_true(local_cache.get('d', 'expired') == 'expired')
+        nt.assert_true(local_cache.get_entry('c', max_age=0) is None)
+        nt.assert_true(local_cache.get_entry('c')[0] == 3)
+
+    def test_read_through_cache(self):
+        log.debug(1, 'test_read_through_cache')
+        values = {'key': 1}
+        namespace = 'test-%f' % time.time()
+        process_caches = [
+            cache.ReadThroughCache(namespace, values.get, timeout=60) for _ in range(2)]
+        for process_cache in process_caches:
+            nt.assert_true(process_cache.get('key') == 1)
+        values['key'] = 2
+        nt.assert_true(process_caches[1].get('key') == 1)
+        # An invalidation made by one process is seen by the other at its next generation check
+        process_caches[0].invalidate('key')
+        nt.assert_true(process_caches[0].get('key') == 2)
+        process_caches[1]._last_generation_check = 0
+        nt.assert_true(process_caches[1].get('key') == 2)
+        nt.assert_true(process_caches[1].statistics()['misses'] == 2)
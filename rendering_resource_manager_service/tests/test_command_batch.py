@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+
+import base64
+import BaseHTTPServer
+import gzip
+import json
+import SocketServer
+import StringIO
+import threading
+from django.test import TestCase
+from django.test.client import Client
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
+from rendering_resource_manager_service.session.management.renderer_connection_pool import \
+    globalRendererConnectionPool
+from rendering_resource_manager_service.session.management.session_routing_table import \
+    globalSessionRoutingTable
+from rendering_resource_manager_service.session.models import SESSION_STATUS_RUNNING
+
+BATCH_URL = '/rendering-resource-manager/v1/session/batch?session_id=batched'
+JPEG_HEADER = '\xff\xd8\xff\xe0JFIF'
+
+
+class RendererHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+    drop = False
+
+    def setup(self):
+        RendererHandler.connections += 1
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+
+    def do_PUT(self):
+        if RendererHandler.drop:
+            # Keep-alive timeout of the rendering resource, reached as the request arrives
+            RendererHandler.drop = False
+            self.close_connection = 1
+            return
+        body = self.rfile.read(int(self.headers.getheader('Content-Length', 0)))
+        content = self.path + ':' + body
+        self.send_response(500 if self.path == '/fail' else 200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        # Binary frames, which are not valid UTF-8
+        content = JPEG_HEADER + self.path
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        if 'gzip' in self.headers.getheader('Accept-Encoding', ''):
+            buffer = StringIO.StringIO()
+            with gzip.GzipFile(fileobj=buffer, mode='wb') as compressed:
+                compressed.write(content)
+            content = buffer.getvalue()
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class RendererServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class TestCommandBatch(TestCase):
+    def setUp(self):
+        self.server = RendererServer(('localhost', 0), RendererHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        globalSessionRoutingTable.update(
+            'batched', SESSION_STATUS_RUNNING, 'localhost', self.server.server_address[1])
+
+    def tearDown(self):
+        globalSessionRoutingTable.remove('batched')
+        globalRendererConnectionPool.evict('localhost', self.server.server_address[1])
+        self.server.shutdown()
+        self.thread.join(5)
+        self.server.server_close()
+
+    def batch(self, commands, stop_on_failure=False):
+        response = Client().put(BATCH_URL, json.dumps({
+            'commands': commands, 'stop_on_failure': stop_on_failure}),
+                                content_type='application/json')
+        nt.assert_true(response.status_code == 200)
+        return [(result['status'], base64.b64decode(result['contents']))
+                for result in json.loads(response.content)['contents']]
+
+    def test_pipeline(self):
+        log.debug(1, 'test_pipeline')
+        RendererHandler.connections = 0
+        commands = [{'command': 'camera', 'body': {'origin': [0, 0, 1]}},
+                    {'command': 'fail'},
+                    {'command': 'frame?id=1', 'body': 'next'}]
+        nt.assert_true(self.batch(commands) == [
+            (200, '/camera:{"origin": [0, 0, 1]}'), (500, '/fail:'), (200, '/frame?id=1:next')])
+        # The commands following a failure are not executed
+        nt.assert_true(self.batch(commands, True) == [
+            (200, '/camera:{"origin": [0, 0, 1]}'), (500, '/fail:'),
+            (424, 'Not executed after a failed command')])
+        # Both batches went through the same pooled connection
+        nt.assert_true(RendererHandler.connections == 1)
+
+    def test_binary_responses(self):
+        log.debug(1, 'test_binary_responses')
+        commands = [{'command': 'frame?id=' + str(index), 'method': 'GET'} for index in range(3)]
+        # Contents are not compressed, even if the client accepts it
+        response = Client().put(BATCH_URL, json.dumps({'commands': commands}),
+                                content_type='application/json', HTTP_ACCEPT_ENCODING='gzip')
+        nt.assert_true(response.status_code == 200)
+        for index, result in enumerate(json.loads(response.content)['contents']):
+            nt.assert_true(result['status'] == 200)
+            nt.assert_true(result['contentType'] == 'image/jpeg')
+            nt.assert_true(base64.b64decode(result['contents']) ==
+                           JPEG_HEADER + '/frame?id=' + str(index))
+
+    def test_closed_connection(self):
+        log.debug(1, 'test_closed_connection')
+        RendererHandler.connections = 0
+        commands = [{'command': 'camera'}, {'command': 'frame'}]
+        nt.assert_true(self.batch(commands) == [(200, '/camera:'), (200, '/frame:')])
+        # The rendering resource closes the pooled connection without answering
+        RendererHandler.drop = True
+        nt.assert_true(self.batch(commands) == [(200, '/camera:'), (200, '/frame:')])
+        nt.assert_true(RendererHandler.connections == 2)
+
+    def test_pipeline_depth(self):
+        log.debug(1, 'test_pipeline_depth')
+        # Bodies larger than the socket buffers, more numerous than the pipeline depth
+        body = 'x' * (1024 * 1024)
+        commands = [{'command': 'large' + str(index), 'body': body}
+                    for index in range(settings.RENDERER_PIPELINE_DEPTH * 2)]
+        results = self.batch(commands)
+        nt.assert_true(len(results) == len(commands))
+        for index, (status, content) in enumerate(results):
+            nt.assert_true(status == 200)
+            nt.assert_true(content == '/large' + str(index) + ':' + body)
+
+    def test_invalid_batch(self):
+        log.debug(1, 'test_invalid_batch')
+        client = Client()
+        response = client.put(BATCH_URL, json.dumps({'commands': []}),
+                              content_type='application/json')
+        nt.assert_true(response.status_code == 400)
+        response = client.put(BATCH_URL, json.dumps({'commands': [{'body': 'x'}]}),
+                              content_type='application/json')
+        nt.assert_true(response.status_code == 400)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+import datetime
+from django.test import TestCase
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
+from rendering_resource_manager_service.session.management.keep_alive_thread import \
+    SessionExpiryIndex, KeepAliveThread, globalSessionExpiryIndex
+from rendering_resource_manager_service.session.management.keep_alive_buffer import \
+    KeepAliveBuffer
+from rendering_resource_manager_service.session.models import Session, \
+    SESSION_STATUS_RUNNING, SESSION_STATUS_STOPPING
+
+
+class TestSessionExpiryIndex(TestCase):
+    def test_pop_expired(self):
+        log.debug(1, 'test_pop_expired')
+        now = datetime.datetime.now()
+        index = SessionExpiryIndex()
+        index.schedule('a', now - datetime.timedelta(seconds=10))
+        index.schedule('b', now + datetime.timedelta(seconds=10))
+        index.schedule('c', now - datetime.timedelta(seconds=5))
+        # Session c was kept alive after its initial deadline was indexed
+        index.schedule('c', now + datetime.timedelta(seconds=20))
+        nt.assert_true(index.pop_expired(now) == ['a'])
+        nt.assert_true(len(index) == 2)
+        nt.assert_true(index.pop_expired(now + datetime.timedelta(seconds=15)) == ['b'])
+        index.remove('c')
+        nt.assert_true(index.pop_expired(now + datetime.timedelta(seconds=30)) == [])
+        nt.assert_true(len(index) == 0)
+
+    def test_reset(self):
+        log.debug(1, 'test_reset')
+        now = datetime.datetime.now()
+        index = SessionExpiryIndex()
+        index.schedule('a', now)
+        index.reset({'b': now, 'c': now + datetime.timedelta(seconds=10)})
+        nt.assert_true(index.deadline('a') is None)
+        nt.assert_true(index.pop_expired(now) == ['b'])
+
+    def test_wait_grace_period(self):
+        log.debug(1, 'test_wait_grace_period')
+        index = SessionExpiryIndex()
+        index.schedule('a', datetime.datetime.now() - datetime.timedelta(seconds=1))
+        # The deadline has passed, but not its grace period
+        start = datetime.datetime.now()
+        index.wait(0.2, 10)
+        nt.assert_true((datetime.datetime.now() - start).total_seconds() >= 0.2)
+
+
+class TestKeepAliveBuffer(TestCase):
+    def test_flush(self):
+        log.debug(1, 'test_flush')
+        now = datetime.datetime.now().replace(microsecond=0)
+        Session(id='keepalive', owner='user', valid_until=now).save(force_insert=True)
+        # The buffer is only flushed by the test, not by a background thread
+        buffer = KeepAliveBuffer(background_flush=False)
+        buffer.record('keepalive', now + datetime.timedelta(seconds=20))
+        buffer.record('keepalive', now + datetime.timedelta(seconds=10))
+        nt.assert_true(len(buffer.pending()) == 1)
+        # Nothing is written before the buffer is flushed
+        nt.assert_true(Session.objects.get(id='keepalive').valid_until == now)
+        buffer.flush()
+        nt.assert_true(len(buffer.pending()) == 0)
+        nt.assert_true(Session.objects.get(id='keepalive').valid_until ==
+                       now + datetime.timedelta(seconds=20))
+        nt.assert_true(buffer.statistics()['updates'] == 1)
+
+
+class TestKeepAliveThread(TestCase):
+    def test_expiry_grace_period(self):
+        log.debug(1, 'test_expiry_grace_period')
+        now = datetime.datetime.now().replace(microsecond=0)
+        Session(id='buffered', owner='user', status=SESSION_STATUS_RUNNING,
+                valid_until=now - datetime.timedelta(seconds=1)).save(force_insert=True)
+        thread = KeepAliveThread(Session.objects)
+        expired_before = now - datetime.timedelta(seconds=settings.SESSION_EXPIRY_GRACE_PERIOD)
+        try:
+            # Another process may still hold a keep-alive message for the session in its
+            # buffer, the session is closed once the grace period is over
+            thread.teardown('buffered', expired_before)
+            nt.assert_true(Session.objects.filter(id='buffered').exists())
+            thread.teardown('buffered', now)
+            nt.assert_false(Session.objects.filter(id='buffered').exists())
+        finally:
+            globalSessionExpiryIndex.reset(dict())
+
+    def test_stopping_sessions(self):
+        log.debug(1, 'test_stopping_sessions')
+        now = datetime.datetime.now().replace(microsecond=0)
+        grace = datetime.timedelta(seconds=settings.SESSION_STOPPING_GRACE_PERIOD)
+        for session_id, status, valid_until in [
+                ('expired', SESSION_STATUS_RUNNING, now - datetime.timedelta(seconds=1)),
+                ('stopping', SESSION_STATUS_STOPPING, now - datetime.timedelta(seconds=1)),
+                ('stuck', SESSION_STATUS_STOPPING, now - grace)]:
+            Session(id=session_id, owner='user', status=status,
+                    valid_until=valid_until).save(force_insert=True)
+        thread = KeepAliveThread(Session.objects)
+        try:
+            # Sessions being stopped are indexed with their grace period
+            thread.synchronize()
+            nt.assert_true(globalSessionExpiryIndex.deadline('stopping') ==
+                           now - datetime.timedelta(seconds=1) + grace)
+            for session_id in ['expired', 'stopping', 'stuck']:
+                thread.teardown(session_id, now)
+        finally:
+            globalSessionExpiryIndex.reset(dict())
+        # A session left in the stopping status is closed once its grace period is over
+        nt.assert_true(list(Session.objects.values_list('id', flat=True)) == ['stopping'])
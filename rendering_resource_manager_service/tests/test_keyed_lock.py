@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+import threading
+from django.test import TestCase
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+from rendering_resource_manager_service.utils.keyed_lock import KeyedLock
+
+
+class TestKeyedLock(TestCase):
+    def test_same_key_is_serialized(self):
+        log.debug(1, 'test_same_key_is_serialized')
+        locks = KeyedLock('Test')
+        acquired = threading.Event()
+
+        def contender():
+            with locks.hold('a'):
+                acquired.set()
+
+        with locks.hold('a'):
+            thread = threading.Thread(target=contender)
+            thread.start()
+            nt.assert_false(acquired.wait(0.2))
+        thread.join(5)
+        nt.assert_true(acquired.is_set())
+        statistics = locks.statistics()
+        nt.assert_true(statistics['acquisitions'] == 2)
+        nt.assert_true(statistics['contentions'] == 1)
+        nt.assert_true(statistics['wait_time'] > 0)
+
+    def test_different_keys_are_independent(self):
+        log.debug(1, 'test_different_keys_are_independent')
+        locks = KeyedLock('Test')
+        acquired = threading.Event()
+
+        def other():
+            with locks.hold('b'):
+                acquired.set()
+
+        with locks.hold('a'):
+            thread = threading.Thread(target=other)
+            thread.start()
+            nt.assert_true(acquired.wait(5))
+            thread.join(5)
+        nt.assert_true(locks.statistics()['contentions'] == 0)
+
+    def test_locks_are_discarded(self):
+        log.debug(1, 'test_locks_are_discarded')
+        locks = KeyedLock('Test')
+        try:
+            with locks.hold('a'):
+                nt.assert_true('a' in locks._locks)
+                raise RuntimeError('failure')
+        except RuntimeError:
+            pass
+        nt.assert_true(len(locks._locks) == 0)
+        # The lock has been released by the failing holder
+        with locks.hold('a'):
+            pass
+        nt.assert_true(locks.statistics()['acquisitions'] == 2)
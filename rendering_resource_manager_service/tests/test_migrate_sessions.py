@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+from rendering_resource_manager_service.session.models import Session, job_key
+
+
+class TestMigrateSessions(TestCase):
+    def test_job_key(self):
+        log.debug(1, 'test_job_key')
+        session = Session(id='keyed', owner='user', valid_until='2016-01-01 00:00:00',
+                          job_id='12345')
+        session.save(force_insert=True)
+        nt.assert_true(job_key('') == '')
+        nt.assert_true(Session.objects.get(id='keyed').job_key == job_key('12345'))
+        nt.assert_true([s.id for s in Session.by_job_id('12345')] == ['keyed'])
+        # Transitions keep the job key in line with the job id
+        nt.assert_true(session.transition(job_id='67890'))
+        nt.assert_true(Session.by_job_id('12345').count() == 0)
+        nt.assert_true([s.id for s in Session.by_job_id('67890')] == ['keyed'])
+
+    def test_migrate_sessions(self):
+        log.debug(1, 'test_migrate_sessions')
+        Session(id='migrated', owner='user', valid_until='2016-01-01 00:00:00',
+                job_id='12345').save(force_insert=True)
+        # Sessions written before the job key existed
+        Session.objects.filter(id='migrated').update(job_key='')
+        nt.assert_true(Session.by_job_id('12345').count() == 0)
+        output = StringIO.StringIO()
+        call_command('migrate_sessions', stdout=output)
+        nt.assert_true('Job keys computed for 1 sessions' in output.getvalue())
+        nt.assert_true([s.id for s in Session.by_job_id('12345')] == ['migrated'])
+        # The migration can be applied again
+        output = StringIO.StringIO()
+        call_command('migrate_sessions', stdout=output)
+        nt.assert_true('Job keys computed for 0 sessions' in output.getvalue())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+
+import BaseHTTPServer
+import json
+import SocketServer
+import threading
+from django.test import TestCase
+from django.test.client import Client
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+from rendering_resource_manager_service.session.management.renderer_connection_pool import \
+    RendererConnectionPool
+
+STATISTICS_URL = '/rendering-resource-manager/v1/admin/statistics'
+
+
+class RendererHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+
+    def setup(self):
+        RendererHandler.connections += 1
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write('ok')
+
+    def log_message(self, *args):
+        pass
+
+
+class RendererServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class TestRendererConnectionPool(TestCase):
+    def test_sessions(self):
+        log.debug(1, 'test_sessions')
+        pool = RendererConnectionPool()
+        session = pool.session('host', 3000)
+        nt.assert_true(pool.session('host', '3000') is session)
+        nt.assert_true(pool.session('host', 3001) is not session)
+        nt.assert_true(pool.statistics() == {'hits': 1, 'misses': 2, 'endpoints': 2})
+        pool.evict('host', 3000)
+        # Evicting an unknown endpoint is harmless
+        pool.evict('other', 3000)
+        nt.assert_true(pool.statistics()['endpoints'] == 1)
+        nt.assert_true(pool.session('host', 3000) is not session)
+        nt.assert_true(pool.statistics()['misses'] == 3)
+
+    def test_keep_alive(self):
+        log.debug(1, 'test_keep_alive')
+        server = RendererServer(('localhost', 0), RendererHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        port = server.server_address[1]
+        pool = RendererConnectionPool()
+        try:
+            RendererHandler.connections = 0
+            for _ in range(3):
+                response = pool.request('localhost', port, 'GET', 'image', timeout=5)
+                nt.assert_true(response.content == 'ok')
+            # Borrowed connections come from the same pool
+            with pool.connection('localhost', port, 5) as connection:
+                connection.request('GET', '/image')
+                nt.assert_true(connection.getresponse().read() == 'ok')
+            nt.assert_true(RendererHandler.connections == 1)
+        finally:
+            pool.evict('localhost', port)
+            server.shutdown()
+            thread.join(5)
+            server.server_close()
+
+    def test_statistics_view(self):
+        log.debug(1, 'test_statistics_view')
+        response = Client().get(STATISTICS_URL)
+        nt.assert_true(response.status_code == 200)
+        statistics = json.loads(response.content)
+        for name in ['renderer_connections', 'renderer_liveness', 'renderer_requests',
+                     'renderer_tunnels', 'settings_cache', 'job_locks']:
+            nt.assert_true(name in statistics)
+        nt.assert_true('hit_ratio' in statistics['settings_cache'])
+        nt.assert_true('fan_out' in statistics['renderer_requests'])
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+
+import threading
+from django.test import TestCase
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+from rendering_resource_manager_service.session.management.renderer_liveness_cache import \
+    RendererLivenessCache
+
+
+class TestRendererLivenessCache(TestCase):
+    def test_concurrent_probes(self):
+        log.debug(1, 'test_concurrent_probes')
+        cache = RendererLivenessCache()
+        release = threading.Event()
+        results = []
+
+        def probe(session_id):
+            release.wait()
+            return [200, session_id]
+
+        def poll():
+            results.append(cache.probe('session', probe)[0])
+
+        threads = [threading.Thread(target=poll) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        while cache.statistics()['shared'] < 3:
+            release.wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        nt.assert_true(results == [[200, 'session']] * 4)
+        nt.assert_true(cache.statistics()['executions'] == 1)
+        nt.assert_true(cache.statistics()['shared'] == 3)
+
+    def test_probe_ttl(self):
+        log.debug(1, 'test_probe_ttl')
+        cache = RendererLivenessCache()
+        probes = []
+
+        def probe(session_id):
+            probes.append(session_id)
+            return [503, 'busy']
+
+        nt.assert_true(cache.probe('session', probe)[0] == [503, 'busy'])
+        nt.assert_true(cache.probe('session', probe)[0] == [503, 'busy'])
+        nt.assert_true(len(probes) == 1)
+        cache.invalidate('session')
+        cache.probe('session', probe)
+        nt.assert_true(len(probes) == 2)
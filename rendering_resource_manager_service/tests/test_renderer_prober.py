@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+
+import datetime
+from django.test import TestCase
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+from rendering_resource_manager_service.session.management.renderer_prober import \
+    RendererProber
+from rendering_resource_manager_service.session.management.session_routing_table import \
+    globalSessionRoutingTable
+from rendering_resource_manager_service.session.models import Session, \
+    SESSION_STATUS_RUNNING, SESSION_STATUS_BUSY, session_status_changed
+
+
+class TestRendererProber(TestCase):
+    def test_unresponsive_renderer(self):
+        log.debug(1, 'test_unresponsive_renderer')
+        # Nothing listens on port 1, the renderer is considered busy
+        Session(id='probed', owner='user', valid_until=datetime.datetime.now(),
+                status=SESSION_STATUS_RUNNING, http_host='127.0.0.1',
+                http_port=1).save(force_insert=True)
+        changes = []
+
+        def on_session_status_changed(sender, session, previous_status, **kwargs):
+            changes.append((session.id, previous_status, session.status))
+
+        session_status_changed.connect(on_session_status_changed)
+        self.addCleanup(session_status_changed.disconnect, on_session_status_changed)
+        globalSessionRoutingTable.update('probed', SESSION_STATUS_RUNNING, '127.0.0.1', 1)
+        prober = RendererProber()
+        # Probes are executed by worker threads, which do not share the test database. The
+        # probe scheduled by the prober is therefore executed by the test thread
+        prober._in_flight['127.0.0.1'] = 1
+        prober.probe('probed', SESSION_STATUS_RUNNING, '127.0.0.1', 1)
+        nt.assert_true(prober.statistics()['probes'] == 1)
+        nt.assert_true(prober.statistics()['transitions'] == 1)
+        nt.assert_true(Session.objects.get(id='probed').status == SESSION_STATUS_BUSY)
+        # The status change goes through Session.transition and its receivers
+        nt.assert_true(changes == [('probed', SESSION_STATUS_RUNNING, SESSION_STATUS_BUSY)])
+        nt.assert_true(globalSessionRoutingTable.lookup('probed') is None)
+        nt.assert_true(len(prober._in_flight) == 0)
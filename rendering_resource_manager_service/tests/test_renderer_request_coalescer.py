@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+
+import threading
+from django.test import TestCase
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
+from rendering_resource_manager_service.session.management.renderer_request_coalescer import \
+    RendererRequestCoalescer
+
+
+class StreamedResponse(object):
+    def __init__(self, chunks):
+        self.status_code = 200
+        self.headers = {'Content-Type': 'image/jpeg'}
+        self.chunks = chunks
+        self.closed = False
+
+    def iter_content(self, _):
+        return iter(self.chunks)
+
+    def close(self):
+        self.closed = True
+
+
+class TestRendererRequestCoalescer(TestCase):
+    def test_concurrent_gets(self):
+        log.debug(1, 'test_concurrent_gets')
+        coalescer = RendererRequestCoalescer()
+        release = threading.Event()
+        results = []
+
+        def get(command):
+            release.wait()
+            return 200, 'image/jpeg', command
+
+        def view(accept):
+            key = coalescer.key('session', 'image?quality=90', {'Accept': accept})
+            results.append(coalescer.get(key, get, 'image?quality=90'))
+
+        threads = [threading.Thread(target=view, args=('image/jpeg',)) for _ in range(4)]
+        # Requests accepting another content type are not merged
+        threads.append(threading.Thread(target=view, args=('image/png',)))
+        for thread in threads:
+            thread.start()
+        while coalescer.statistics()['shared'] < 3 or \
+                coalescer.statistics()['in_flight'] < 2:
+            release.wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        nt.assert_true(results == [(200, 'image/jpeg', 'image?quality=90')] * 5)
+        statistics = coalescer.statistics()
+        nt.assert_true(statistics['executions'] == 2)
+        nt.assert_true(statistics['requests'] == 5)
+        nt.assert_true(statistics['fan_out'] == 2.5)
+
+    def test_micro_cache(self):
+        log.debug(1, 'test_micro_cache')
+        coalescer = RendererRequestCoalescer()
+        responses = [(503, 'text/plain', 'busy'), (200, 'image/jpeg', 'image')]
+        window = settings.RENDERER_COALESCING_WINDOW
+        settings.RENDERER_COALESCING_WINDOW = 60
+        try:
+            key = coalescer.key('session', 'image', {})
+            # Failed responses are not reused
+            nt.assert_true(coalescer.get(key, responses.pop, 0)[0] == 503)
+            nt.assert_true(coalescer.get(key, responses.pop, 0)[0] == 200)
+            nt.assert_true(coalescer.get(key, responses.pop, 0)[0] == 200)
+        finally:
+            settings.RENDERER_COALESCING_WINDOW = window
+        nt.assert_true(coalescer.statistics()['cached'] == 1)
+        nt.assert_true(coalescer.statistics()['executions'] == 2)
+        # Without window, every request reaches the rendering resource
+        responses = [(200, 'image/jpeg', 'image')] * 2
+        coalescer.get(key, responses.pop, 0)
+        coalescer.get(key, responses.pop, 0)
+        nt.assert_true(len(responses) == 0)
+
+    def test_streamed_get(self):
+        log.debug(1, 'test_streamed_get')
+        coalescer = RendererRequestCoalescer()
+        key = coalescer.key('session', 'image', {'Cookie': 'token=1'})
+        # Cookies are forwarded to the rendering resource, so they are part of the key
+        nt.assert_true(key != coalescer.key('session', 'image', {'Cookie': 'token=2'}))
+        _, call = coalescer.join(key)
+        results = []
+
+        def view():
+            results.append(coalescer.join(key))
+
+        thread = threading.Thread(target=view)
+        thread.start()
+        while coalescer.statistics()['shared'] < 1:
+            thread.join(0.01)
+        # The first command is passed through while the others wait for the whole body
+        response = StreamedResponse(['ima', 'ge'])
+        stream = coalescer.stream(key, call, response)
+        nt.assert_true(next(stream) == 'ima')
+        nt.assert_true(len(results) == 0)
+        nt.assert_true(list(stream) == ['ge'])
+        stream.close()
+        thread.join()
+        nt.assert_true(response.closed)
+        nt.assert_true(results == [((200, 'image/jpeg', 'image'), None)])
+        nt.assert_true(coalescer.statistics()['executions'] == 1)
+
+    def test_abandoned_stream(self):
+        log.debug(1, 'test_abandoned_stream')
+        coalescer = RendererRequestCoalescer()
+        key = coalescer.key('session', 'image', {})
+        _, call = coalescer.join(key)
+        results = []
+
+        def view():
+            results.append(coalescer.get(key, lambda: (200, 'image/jpeg', 'image')))
+
+        thread = threading.Thread(target=view)
+        thread.start()
+        while coalescer.statistics()['shared'] < 1:
+            thread.join(0.01)
+        # A body that was not read entirely is not shared: the waiting command is sent again
+        stream = coalescer.stream(key, call, StreamedResponse(['ima', 'ge']))
+        next(stream)
+        stream.close()
+        thread.join()
+        nt.assert_true(results == [(200, 'image/jpeg', 'image')])
+        nt.assert_true(coalescer.statistics()['executions'] == 2)
+
+    def test_stalled_stream(self):
+        log.debug(1, 'test_stalled_stream')
+        coalescer = RendererRequestCoalescer()
+        key = coalescer.key('session', 'image', {})
+        _, call = coalescer.join(key)
+        # The client of the first command never reads the streamed body
+        stream = coalescer.stream(key, call, StreamedResponse(['image']))
+        results = []
+
+        def view():
+            results.append(coalescer.get(key, lambda: (200, 'image/jpeg', 'image')))
+
+        timeout = settings.RENDERER_COALESCING_TIMEOUT
+        settings.RENDERER_COALESCING_TIMEOUT = 0.1
+        try:
+            threads = [threading.Thread(target=view) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+            # The waiting commands sent their own request
+            nt.assert_true(results == [(200, 'image/jpeg', 'image')] * 2)
+            nt.assert_true(coalescer.join(key) == (None, None))
+        finally:
+            settings.RENDERER_COALESCING_TIMEOUT = timeout
+            stream.close()
+        nt.assert_true(coalescer.statistics()['in_flight'] == 0)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+
+import socket
+import struct
+import threading
+from django.test import TestCase
+from django.test.client import Client
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+from rendering_resource_manager_service.session.management.renderer_tunnel import \
+    WebSocketFrameCounter, globalRendererTunnels
+from rendering_resource_manager_service.session.management.session_routing_table import \
+    globalSessionRoutingTable
+from rendering_resource_manager_service.session.models import SESSION_STATUS_RUNNING
+
+TUNNEL_URL = '/rendering-resource-manager/v1/session/tunnel/ws'
+HANDSHAKE_RESPONSE = 'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n' \
+                     'Connection: Upgrade\r\n\r\n'
+
+
+def frame(payload, masked=False):
+    header = chr(0x82)
+    mask = 0x80 if masked else 0
+    if len(payload) < 126:
+        header += chr(mask | len(payload))
+    elif len(payload) < 65536:
+        header += chr(mask | 126) + struct.pack('!H', len(payload))
+    else:
+        header += chr(mask | 127) + struct.pack('!Q', len(payload))
+    if masked:
+        # A zero masking key leaves the payload unchanged
+        header += '\0\0\0\0'
+    return header + payload
+
+
+def receive(sock, length):
+    data = ''
+    while len(data) < length:
+        chunk = sock.recv(length - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def echo_renderer(server, requests):
+    connection, _ = server.accept()
+    request = ''
+    while '\r\n\r\n' not in request:
+        request += connection.recv(1024)
+    requests.append(request)
+    connection.sendall(HANDSHAKE_RESPONSE)
+    while True:
+        data = connection.recv(1024)
+        if not data:
+            break
+        connection.sendall(data)
+    connection.close()
+
+
+def viewer(sock, frames, received):
+    received.append(receive(sock, len(HANDSHAKE_RESPONSE)))
+    data = ''.join(frames)
+    sock.sendall(data)
+    received.append(receive(sock, len(data)))
+    sock.close()
+
+
+class TestRendererTunnel(TestCase):
+    def test_frame_counter(self):
+        log.debug(1, 'test_frame_counter')
+        stream = HANDSHAKE_RESPONSE + frame('a') + frame('b' * 300, True) + \
+            frame('c' * 70000) + frame('')
+        counter = WebSocketFrameCounter(skip_http_header=True)
+        # Frames and handshake are split across chunks
+        for i in range(0, len(stream), 7):
+            counter.feed(stream[i:i + 7])
+        nt.assert_true(counter.frames == 4)
+        counter = WebSocketFrameCounter()
+        counter.feed(frame('d', True) + frame('e'))
+        nt.assert_true(counter.frames == 2)
+
+    def test_tunnel(self):
+        log.debug(1, 'test_tunnel')
+        server = socket.socket()
+        server.bind(('localhost', 0))
+        server.listen(1)
+        requests = []
+        renderer = threading.Thread(target=echo_renderer, args=(server, requests))
+        renderer.start()
+        globalSessionRoutingTable.update(
+            'tunneled', SESSION_STATUS_RUNNING, 'localhost', server.getsockname()[1])
+
+        # The view takes over the server side of the viewer connection
+        viewer_side, server_side = socket.socketpair()
+        frames = [frame('hello', True), frame('x' * 1000, True)]
+        received = []
+        viewer_thread = threading.Thread(target=viewer, args=(viewer_side, frames, received))
+        viewer_thread.start()
+        before = globalRendererTunnels.statistics()
+        response = Client().get(TUNNEL_URL, {'session_id': 'tunneled'}, **{
+            'HTTP_UPGRADE': 'websocket', 'HTTP_CONNECTION': 'Upgrade',
+            'HTTP_SEC_WEBSOCKET_KEY': 'dGhlIHNhbXBsZSBub25jZQ==',
+            'gunicorn.socket': server_side})
+        viewer_thread.join(5)
+        renderer.join(5)
+        server.close()
+        globalSessionRoutingTable.remove('tunneled')
+
+        nt.assert_true(response.status_code == 101)
+        nt.assert_true(requests[0].startswith('GET /ws?session_id=tunneled HTTP/1.1\r\n'))
+        nt.assert_true('Sec-Websocket-Key: dGhlIHNhbXBsZSBub25jZQ==' in requests[0])
+        nt.assert_true(received == [HANDSHAKE_RESPONSE, ''.join(frames)])
+        after = globalRendererTunnels.statistics()
+        nt.assert_true(after['active'] == 0)
+        nt.assert_true(after['opened'] - before['opened'] == 1)
+        nt.assert_true(after['frames_up'] - before['frames_up'] == 2)
+        nt.assert_true(after['frames_down'] - before['frames_down'] == 2)
+        nt.assert_true(after['bytes_up'] - before['bytes_up'] == len(''.join(frames)))
+        nt.assert_true(after['bytes_down'] - before['bytes_down'] ==
+                       len(HANDSHAKE_RESPONSE) + len(''.join(frames)))
+
+    def test_tunnel_errors(self):
+        log.debug(1, 'test_tunnel_errors')
+        client = Client()
+        upgrade = {'HTTP_UPGRADE': 'websocket', 'HTTP_CONNECTION': 'Upgrade'}
+        response = client.get(TUNNEL_URL, {'session_id': 'tunneled'})
+        nt.assert_true(response.status_code == 400)
+        # The test server does not hand over its connections
+        response = client.get(TUNNEL_URL, {'session_id': 'tunneled'}, **upgrade)
+        nt.assert_true(response.status_code == 501)
+        upgrade['gunicorn.socket'] = socket.socket()
+        response = client.get(TUNNEL_URL, {'session_id': 'unknown'}, **upgrade)
+        upgrade['gunicorn.socket'].close()
+        nt.assert_true(response.status_code == 404)
@@ -247,6 +247,45 @@ class TestSessionManager(TestCase):
         nt.assert_true(settings.scheduler_rest_parameters_format ==
                        '--rest $SLURMD_NODENAME:${rest_port}')
 
+    def test_settings_cache(self):
+        log.debug(1, 'test_settings_cache')
+        manager = RenderingResourceSettingsManager()
+        params = dict()
+        params['id'] = 'livre'
+        params['command_line'] = 'livre'
+        params['environment_variables'] = ''
+        params['modules'] = ''
+        params['process_rest_parameters_format'] = '--rest {$rest_hostname}:${rest_port}'
+        params['scheduler_rest_parameters_format'] = '--rest $SLURMD_NODENAME:${rest_port}'
+        params['project'] = 'project'
+        params['queue'] = 'test'
+        params['exclusive'] = False
+        params['nb_nodes'] = 1
+        params['nb_cpus'] = 1
+        params['nb_gpus'] = 1
+        params['memory'] = 0
+        params['graceful_exit'] = True
+        params['wait_until_running'] = True
+        params['name'] = 'name'
+        params['description'] = 'description'
+        status = manager.create(params)
+        nt.assert_true(status[0] == 201)
+
+        hits = manager.cache_statistics()['hits']
+        nt.assert_true(manager.get_by_id('livre').command_line == 'livre')
+        nt.assert_true(manager.get_by_id('livre').command_line == 'livre')
+        nt.assert_true(manager.cache_statistics()['hits'] == hits + 1)
+
+        # Updated settings must not be served from the cache
+        params['command_line'] = 'livre --volume'
+        status = manager.update(params)
+        nt.assert_true(status[0] == 200)
+        nt.assert_true(manager.get_by_id('livre').command_line == 'livre --volume')
+
+        status = manager.delete('livre')
+        nt.assert_true(status[0] == 200)
+        nt.assert_raises(Exception, manager.get_by_id, 'livre')
+
     def test_format_rest_parameters(self):
         log.debug(1, 'test_format_rest_parameters')
         manager = RenderingResourceSettingsManager()
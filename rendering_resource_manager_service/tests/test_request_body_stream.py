@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+
+import BaseHTTPServer
+import threading
+from django.test import TestCase
+from django.test.client import Client, RequestFactory
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
+from rendering_resource_manager_service.session.management.renderer_connection_pool import \
+    globalRendererConnectionPool
+from rendering_resource_manager_service.session.management.session_routing_table import \
+    globalSessionRoutingTable
+from rendering_resource_manager_service.session.models import SESSION_STATUS_RUNNING
+from rendering_resource_manager_service.utils.tools import get_request_body_stream
+
+COMMAND_URL = '/rendering-resource-manager/v1/session/upload?session_id=streamed'
+
+
+class EchoHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers.getheader('Content-Length')))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRequestBodyStream(TestCase):
+    def test_chunked_reads(self):
+        log.debug(1, 'test_chunked_reads')
+        body = ''.join(chr(i % 256) for i in range(20000))
+        request = RequestFactory().put('/upload', data=body,
+                                       content_type='application/octet-stream')
+        stream = get_request_body_stream(request)
+        nt.assert_true(len(stream) == 20000)
+        nt.assert_true(stream.read(1000) == body[:1000])
+        nt.assert_true(stream.position == 1000)
+        chunks = list(stream)
+        nt.assert_true([len(chunk) for chunk in chunks] == [8192, 8192, 2616])
+        nt.assert_true(''.join(chunks) == body[1000:])
+        nt.assert_true(stream.position == 20000)
+        nt.assert_true(stream.read() == '')
+
+    def test_empty_body(self):
+        log.debug(1, 'test_empty_body')
+        factory = RequestFactory()
+        nt.assert_true(get_request_body_stream(factory.get('/image')) is None)
+        request = factory.put('/upload', data='', content_type='application/octet-stream')
+        request.META['CONTENT_LENGTH'] = '0'
+        nt.assert_true(get_request_body_stream(request) is None)
+        request = factory.put('/upload', data='data', content_type='application/octet-stream')
+        request.META['CONTENT_LENGTH'] = 'invalid'
+        nt.assert_true(get_request_body_stream(request) is None)
+
+    def test_proxy_streaming(self):
+        log.debug(1, 'test_proxy_streaming')
+        server = BaseHTTPServer.HTTPServer(('localhost', 0), EchoHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        port = server.server_address[1]
+        globalSessionRoutingTable.update('streamed', SESSION_STATUS_RUNNING, 'localhost', port)
+        body = 'x' * 100000
+        streaming = settings.PROXY_STREAMING
+        try:
+            response = Client().put(COMMAND_URL, body, content_type='application/octet-stream')
+            nt.assert_true(response.status_code == 200)
+            nt.assert_true(response.streaming)
+            nt.assert_true(response['Content-Type'] == 'application/octet-stream')
+            nt.assert_true(''.join(response.streaming_content) == body)
+            # Without streaming, bodies are buffered
+            settings.PROXY_STREAMING = False
+            response = Client().put(COMMAND_URL, body, content_type='application/octet-stream')
+            nt.assert_false(response.streaming)
+            nt.assert_true(response.content == body)
+        finally:
+            settings.PROXY_STREAMING = streaming
+            globalSessionRoutingTable.remove('streamed')
+            globalRendererConnectionPool.evict('localhost', port)
+            server.shutdown()
+            thread.join(5)
+            server.server_close()
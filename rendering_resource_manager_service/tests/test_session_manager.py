@@ -26,6 +26,10 @@ from nose import tools as nt
 import rendering_resource_manager_service.utils.custom_logging as log
 from rendering_resource_manager_service.session.views import SessionDetailsSerializer
 from rendering_resource_manager_service.session.management.session_manager import SessionManager
+from rendering_resource_manager_service.session.management import job_manager
+from rendering_resource_manager_service.session.models import Session, \
+    SESSION_STATUS_SCHEDULING, SESSION_STATUS_SCHEDULED, SESSION_STATUS_FAILED, \
+    SESSION_STATUS_RUNNING
 import json
 
 DEFAULT_USER = 'testuser'
@@ -92,15 +96,51 @@ class TestSessionManager(TestCase):
         nt.assert_true(status[0] == 200)
 
         # Decode JSON response
-        decoded = json.loads(status[1].content)
-        nt.assert_true(decoded[0]['owner'] == DEFAULT_USER)
-        nt.assert_true(decoded[0]['configuration_id'] == DEFAULT_CONFIGURATION)
+        decoded = json.loads(status[1])
+        nt.assert_true(decoded['sessions'][0]['owner'] == DEFAULT_USER)
+        nt.assert_true(decoded['sessions'][0]['configuration_id'] == DEFAULT_CONFIGURATION)
+        nt.assert_true(decoded['next'] is None)
 
         # Delete session
         sm = SessionManager()
         status = sm.delete_session(session_id)
         nt.assert_true(status[0] == 200)
 
+    def test_list_sessions_pages(self):
+        log.debug(1, 'test_list_sessions_pages')
+        sm = SessionManager()
+        status = sm.create_sessions(DEFAULT_USER, DEFAULT_CONFIGURATION, 5)
+        nt.assert_true(status[0] == 201)
+        status = sm.create_session('other', 'otheruser', DEFAULT_CONFIGURATION)
+        nt.assert_true(status[0] == 201)
+        # Walk through the sessions of the default user, two at a time
+        session_ids = []
+        cursor = None
+        while True:
+            status = sm.list_sessions(
+                SessionDetailsSerializer, filters={'owner': DEFAULT_USER},
+                fields=['id', 'status'], cursor=cursor, limit=2)
+            nt.assert_true(status[0] == 200)
+            decoded = json.loads(status[1])
+            nt.assert_true(len(decoded['sessions']) <= 2)
+            for session in decoded['sessions']:
+                nt.assert_true(sorted(session.keys()) == ['id', 'status'])
+                session_ids.append(session['id'])
+            cursor = decoded['next']
+            if cursor is None:
+                break
+        nt.assert_true(session_ids == sorted(
+            Session.objects.filter(owner=DEFAULT_USER).values_list('id', flat=True)))
+        # Projection without the id
+        status = sm.list_sessions(SessionDetailsSerializer, filters={'owner': 'otheruser'},
+                                  fields=['owner'])
+        nt.assert_true(json.loads(status[1])['sessions'] == [{'owner': 'otheruser'}])
+        # Unknown fields and filters are rejected
+        status = sm.list_sessions(SessionDetailsSerializer, fields=['parameters'])
+        nt.assert_true(status[0] == 400)
+        status = sm.list_sessions(SessionDetailsSerializer, filters={'job_id': ''})
+        nt.assert_true(status[0] == 400)
+
     def test_suspend_resume_sessions(self):
         log.debug(1, 'test_suspend_resume_sessions')
         session_id = SessionManager.get_session_id()
@@ -140,3 +180,85 @@ class TestSessionManager(TestCase):
         sm = SessionManager()
         status = sm.delete_session(session_id)
         nt.assert_true(status[0] == 200)
+
+    def test_session_transition(self):
+        log.debug(1, 'test_session_transition')
+        session_id = SessionManager.get_session_id()
+        sm = SessionManager()
+        status = sm.create_session(session_id, DEFAULT_USER, DEFAULT_CONFIGURATION)
+        nt.assert_true(status[0] == 201)
+        session = Session.objects.get(id=session_id)
+        nt.assert_true(session.transition(SESSION_STATUS_SCHEDULING, cluster_node='node'))
+        # A concurrent request has already moved the session to another status
+        stale_session = Session.objects.get(id=session_id)
+        nt.assert_true(session.transition(
+            SESSION_STATUS_FAILED, expected=SESSION_STATUS_SCHEDULING))
+        nt.assert_false(stale_session.transition(
+            SESSION_STATUS_SCHEDULED, expected=SESSION_STATUS_SCHEDULING))
+        nt.assert_true(stale_session.status == SESSION_STATUS_FAILED)
+        session = Session.objects.get(id=session_id)
+        nt.assert_true(session.status == SESSION_STATUS_FAILED)
+        nt.assert_true(session.cluster_node == 'node')
+        # A stale session already holding the new values still checks the stored status
+        stale_session = Session.objects.get(id=session_id)
+        session.transition(SESSION_STATUS_SCHEDULING)
+        nt.assert_false(stale_session.transition(
+            SESSION_STATUS_FAILED, expected=SESSION_STATUS_FAILED))
+        nt.assert_true(stale_session.status == SESSION_STATUS_SCHEDULING)
+        nt.assert_true(session.transition(
+            SESSION_STATUS_SCHEDULING, expected=SESSION_STATUS_SCHEDULING))
+        status = sm.delete_session(session_id)
+        nt.assert_true(status[0] == 200)
+
+    def test_bulk_sessions(self):
+        log.debug(1, 'test_bulk_sessions')
+        sm = SessionManager()
+        status = sm.create_sessions(DEFAULT_USER, DEFAULT_CONFIGURATION, 3)
+        nt.assert_true(status[0] == 201)
+        session_ids = [result['session_id'] for result in json.loads(status[1])['contents']]
+        nt.assert_true(Session.objects.filter(id__in=session_ids).count() == 3)
+        # Too many sessions
+        status = sm.create_sessions(DEFAULT_USER, DEFAULT_CONFIGURATION, 100000)
+        nt.assert_true(status[0] == 400)
+        # Query statuses, including an unknown session
+        status = sm.query_statuses(session_ids + ['unknown'])
+        nt.assert_true(status[0] == 200)
+        results = json.loads(status[1])['contents']
+        nt.assert_true([result['status'] for result in results] == [200, 200, 200, 404])
+        nt.assert_true(results[0]['contents']['code'] == 0)
+        # Delete two sessions and an unknown one
+        status = sm.delete_sessions(session_ids[:2] + ['unknown'])
+        nt.assert_true(status[0] == 200)
+        results = json.loads(status[1])['contents']
+        nt.assert_true([result['status'] for result in results] == [200, 200, 404])
+        nt.assert_true(list(Session.objects.values_list('id', flat=True)) == session_ids[2:])
+        # Clearing the sessions stops the remaining one
+        status = sm.clear_sessions()
+        nt.assert_true(status[0] == 200)
+        nt.assert_true(Session.objects.count() == 0)
+
+    def test_schedule_jobs(self):
+        log.debug(1, 'test_schedule_jobs')
+        sm = SessionManager()
+        status = sm.create_sessions(DEFAULT_USER, DEFAULT_CONFIGURATION, 3)
+        session_ids = [result['session_id'] for result in json.loads(status[1])['contents']]
+        Session.objects.filter(id=session_ids[1]).update(status=SESSION_STATUS_FAILED)
+        Session.objects.filter(id=session_ids[2]).update(
+            status=SESSION_STATUS_RUNNING, http_host='host')
+        submitted = []
+        submit_job = job_manager.submit_job
+        job_manager.submit_job = lambda session_id, *args: submitted.append(session_id) is None
+        try:
+            status = sm.schedule_jobs(session_ids + ['unknown'], dict())
+        finally:
+            job_manager.submit_job = submit_job
+        nt.assert_true(status[0] == 200)
+        results = json.loads(status[1])['contents']
+        nt.assert_true([result['status'] for result in results] == [202, 202, 409, 404])
+        # The running session keeps its job
+        nt.assert_true(submitted == session_ids[:2])
+        session = Session.objects.get(id=session_ids[2])
+        nt.assert_true(session.status == SESSION_STATUS_RUNNING)
+        nt.assert_true(session.http_host == 'host')
+        nt.assert_true(Session.objects.filter(
+            id__in=session_ids[:2], status=SESSION_STATUS_SCHEDULING).count() == 2)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+import BaseHTTPServer
+import socket
+import threading
+import time
+from django.test import TestCase
+from django.test.client import Client
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
+from rendering_resource_manager_service.session.management.session_manager import SessionManager
+from rendering_resource_manager_service.session.management.keep_alive_buffer import \
+    globalKeepAliveBuffer
+from rendering_resource_manager_service.session.management.keep_alive_thread import \
+    globalSessionExpiryIndex
+from rendering_resource_manager_service.session.management.session_routing_table import \
+    SessionRoutingTable, globalSessionRoutingTable
+from rendering_resource_manager_service.session.models import Session, \
+    SESSION_STATUS_RUNNING, SESSION_STATUS_BUSY
+
+COMMAND_URL = '/rendering-resource-manager/v1/session/image'
+
+
+class RendererHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '5')
+        self.end_headers()
+        self.wfile.write('image')
+
+    def log_message(self, *args):
+        pass
+
+
+def unused_port():
+    sock = socket.socket()
+    sock.bind(('localhost', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestSessionRoutingTable(TestCase):
+    def test_routes(self):
+        log.debug(1, 'test_routes')
+        table = SessionRoutingTable()
+        table.update('session', SESSION_STATUS_RUNNING, 'host', 3000)
+        route = table.lookup('session')
+        nt.assert_true((route.http_host, route.http_port) == ('host', 3000))
+        # A failure of an outdated route does not remove the new one
+        table.update('session', SESSION_STATUS_RUNNING, 'host', 3001)
+        table.remove('session', route.version)
+        nt.assert_true(table.lookup('session').http_port == 3001)
+        table.remove('session', table.lookup('session').version)
+        nt.assert_true(table.lookup('session') is None)
+        nt.assert_true(table.statistics()['failures'] == 1)
+        # Sessions that are not running are not routed
+        table.update('session', SESSION_STATUS_BUSY, 'host', 3001)
+        nt.assert_true(table.lookup('session') is None)
+
+    def test_route_expiry(self):
+        log.debug(1, 'test_route_expiry')
+        # Status changes made by other processes are not seen, routes expire instead
+        ttl = settings.SESSION_ROUTE_TTL
+        settings.SESSION_ROUTE_TTL = 0.1
+        try:
+            table = SessionRoutingTable()
+        finally:
+            settings.SESSION_ROUTE_TTL = ttl
+        table.update('session', SESSION_STATUS_RUNNING, 'host', 3000)
+        nt.assert_true(table.lookup('session') is not None)
+        time.sleep(0.2)
+        nt.assert_true(table.lookup('session') is None)
+
+    def test_transitions(self):
+        log.debug(1, 'test_transitions')
+        session_id = str(SessionManager.get_session_id())
+        sm = SessionManager()
+        status = sm.create_session(session_id, 'testuser', 'testrenderer')
+        nt.assert_true(status[0] == 201)
+        session = Session.objects.get(id=session_id)
+        session.transition(SESSION_STATUS_RUNNING, http_host='host', http_port=3000)
+        nt.assert_true(globalSessionRoutingTable.lookup(session_id).http_host == 'host')
+        session.transition(SESSION_STATUS_BUSY)
+        nt.assert_true(globalSessionRoutingTable.lookup(session_id) is None)
+        session.transition(SESSION_STATUS_RUNNING)
+        status = sm.delete_session(session_id)
+        nt.assert_true(status[0] == 200)
+        nt.assert_true(globalSessionRoutingTable.lookup(session_id) is None)
+
+    def test_forwarding(self):
+        log.debug(1, 'test_forwarding')
+        server = BaseHTTPServer.HTTPServer(('localhost', 0), RendererHandler)
+        thread = threading.Thread(target=server.handle_request)
+        thread.start()
+        client = Client()
+        # Routed commands do not need to read the session
+        globalSessionRoutingTable.update(
+            'routed', SESSION_STATUS_RUNNING, 'localhost', server.server_address[1])
+        response = client.get(COMMAND_URL, {'session_id': 'routed'})
+        thread.join(5)
+        server.server_close()
+        nt.assert_true(response.status_code == 200)
+        # Reading the streamed body entirely closes the response
+        nt.assert_true(''.join(response.streaming_content) == 'image')
+        # Routed commands keep the session alive
+        nt.assert_true('routed' in globalKeepAliveBuffer.pending())
+        nt.assert_true(globalSessionExpiryIndex.deadline('routed') is not None)
+        globalKeepAliveBuffer.discard('routed')
+        globalSessionExpiryIndex.remove('routed')
+        # When the renderer cannot be reached, the command goes through the session status
+        globalSessionRoutingTable.update(
+            'routed', SESSION_STATUS_RUNNING, 'localhost', unused_port())
+        response = client.get(COMMAND_URL, {'session_id': 'routed'})
+        nt.assert_true(response.status_code == 404)
+        nt.assert_true(globalSessionRoutingTable.lookup('routed') is None)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+
+import json
+import threading
+from django.test import TestCase
+from django.test.client import Client
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+import rendering_resource_manager_service.session.management.session_manager_settings as consts
+from rendering_resource_manager_service.session.management.session_manager import SessionManager
+from rendering_resource_manager_service.session.management.session_status_notifier import \
+    SessionStatusNotifier, globalSessionStatusNotifier
+from rendering_resource_manager_service.session.views import CommandViewSet
+
+STREAM_URL = '/rendering-resource-manager/v1/session/status/stream'
+
+
+class TestSessionStatusStream(TestCase):
+    def test_notifier(self):
+        log.debug(1, 'test_notifier')
+        notifier = SessionStatusNotifier()
+        version = notifier.version('session')
+        nt.assert_false(notifier.wait('session', version, 0.01))
+        timer = threading.Timer(0.05, notifier.notify, ['session'])
+        timer.start()
+        nt.assert_true(notifier.wait('session', version, 5))
+        timer.join()
+        # Changes made before waiting are not missed
+        version = notifier.version('session')
+        notifier.notify('session')
+        nt.assert_true(notifier.wait('session', version, 0))
+
+    def test_long_poll(self):
+        log.debug(1, 'test_long_poll')
+        session_id = SessionManager.get_session_id()
+        sm = SessionManager()
+        status = sm.create_session(session_id, 'testuser', 'testrenderer')
+        nt.assert_true(status[0] == 201)
+        client = Client()
+        response = client.get(STREAM_URL, {'session_id': session_id})
+        nt.assert_true(response.status_code == 200)
+        nt.assert_true(json.loads(response.content)['code'] == 0)
+        version = response['ETag']
+        # The status does not change, the long-poll expires
+        timeout = consts.SESSION_STATUS_LONG_POLL_TIMEOUT
+        consts.SESSION_STATUS_LONG_POLL_TIMEOUT = 0.1
+        try:
+            response = client.get(STREAM_URL, {'session_id': session_id},
+                                  HTTP_IF_NONE_MATCH=version)
+        finally:
+            consts.SESSION_STATUS_LONG_POLL_TIMEOUT = timeout
+        nt.assert_true(response.status_code == 304)
+        nt.assert_true(response['ETag'] == version)
+        status = sm.delete_session(session_id)
+        nt.assert_true(status[0] == 200)
+        response = client.get(STREAM_URL, {'session_id': session_id},
+                              HTTP_IF_NONE_MATCH=version)
+        nt.assert_true(response.status_code == 404)
+
+    def test_server_sent_events(self):
+        log.debug(1, 'test_server_sent_events')
+        session_id = SessionManager.get_session_id()
+        sm = SessionManager()
+        status = sm.create_session(session_id, 'testuser', 'testrenderer')
+        nt.assert_true(status[0] == 201)
+        client = Client()
+        response = client.get(STREAM_URL, {'session_id': session_id},
+                              HTTP_ACCEPT='text/event-stream')
+        nt.assert_true(response['Content-Type'] == 'text/event-stream')
+        # The session is stopped, the stream ends after the first event
+        events = ''.join(response.streaming_content).split('\n\n')
+        nt.assert_true(events[0].startswith('retry: '))
+        nt.assert_true(events[1].startswith('id: '))
+        data = events[1].split('\n')[2]
+        nt.assert_true(json.loads(data[len('data: '):])['code'] == 0)
+        status = sm.delete_session(session_id)
+        nt.assert_true(status[0] == 200)
+
+    def test_status_read_on_change_only(self):
+        log.debug(1, 'test_status_read_on_change_only')
+        session_id = SessionManager.get_session_id()
+        sm = SessionManager()
+        status = sm.create_session(session_id, 'testuser', 'testrenderer')
+        nt.assert_true(status[0] == 201)
+        client = Client()
+        version = client.get(STREAM_URL, {'session_id': session_id})['ETag']
+        reads = []
+        current_status = CommandViewSet.__dict__['_CommandViewSet__current_status'].__func__
+
+        def counting_current_status(cls, session_id):
+            reads.append(session_id)
+            return current_status(cls, session_id)
+
+        CommandViewSet._CommandViewSet__current_status = classmethod(counting_current_status)
+        timeout = consts.SESSION_STATUS_LONG_POLL_TIMEOUT
+        consts.SESSION_STATUS_LONG_POLL_TIMEOUT = 0.3
+        # A change notification wakes the request up, which reads the status again
+        timer = threading.Timer(0.1, globalSessionStatusNotifier.notify, [str(session_id)])
+        timer.start()
+        try:
+            response = client.get(STREAM_URL, {'session_id': session_id},
+                                  HTTP_IF_NONE_MATCH=version)
+        finally:
+            consts.SESSION_STATUS_LONG_POLL_TIMEOUT = timeout
+            CommandViewSet._CommandViewSet__current_status = classmethod(current_status)
+            timer.join()
+        nt.assert_true(response.status_code == 304)
+        # Once when the request is received, and once after the notification
+        nt.assert_true(len(reads) == 2)
+        status = sm.delete_session(session_id)
+        nt.assert_true(status[0] == 200)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+import datetime
+import threading
+from django.test import TestCase
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+import rendering_resource_manager_service.service.settings as global_settings
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
+from rendering_resource_manager_service.session.models import Session, \
+    SESSION_STATUS_SCHEDULED, SESSION_STATUS_FAILED
+from rendering_resource_manager_service.session.management.job_manager import JobInformation
+from rendering_resource_manager_service.session.management.slurm_job_manager import \
+    SlurmJobManager
+from rendering_resource_manager_service.session.management.ssh_connection_pool import \
+    globalSshConnectionPool
+
+
+class TestSlurmJobManager(TestCase):
+    def setUp(self):
+        self._slurm_hosts = global_settings.SLURM_HOSTS
+        self._race_timeout = settings.SLURM_ALLOCATION_RACE_TIMEOUT
+        self._execute = globalSshConnectionPool.execute
+        self._cancelled = []
+        self._cancelled_event = threading.Event()
+
+        def execute(cluster_node, command_line):
+            self._cancelled.append((cluster_node, command_line))
+            self._cancelled_event.set()
+            return '', ''
+
+        globalSshConnectionPool.execute = execute
+        global_settings.SLURM_HOSTS = ['node1', 'node2', 'node3']
+        Session(id='race', owner='user', valid_until=datetime.datetime.now()).save(
+            force_insert=True)
+
+    def tearDown(self):
+        global_settings.SLURM_HOSTS = self._slurm_hosts
+        settings.SLURM_ALLOCATION_RACE_TIMEOUT = self._race_timeout
+        globalSshConnectionPool.execute = self._execute
+
+    @staticmethod
+    def _job_manager(allocations):
+        """
+        Creates a job manager whose allocation requests are answered by the given function
+        """
+        job_manager = SlurmJobManager()
+        job_manager._build_allocation_command = lambda session, job_information: 'salloc'
+        job_manager._request_allocation = allocations
+        return job_manager
+
+    def test_ordered_cluster_nodes(self):
+        log.debug(1, 'test_ordered_cluster_nodes')
+        job_manager = SlurmJobManager()
+        nt.assert_true(job_manager._ordered_cluster_nodes() == ['node1', 'node2', 'node3'])
+        # node1 keeps failing, node2 and node3 always succeed but node3 answers faster
+        for _ in range(3):
+            job_manager._record_allocation('node1', False, 0.1)
+            job_manager._record_allocation('node2', True, 2.0)
+            job_manager._record_allocation('node3', True, 0.5)
+        nt.assert_true(job_manager._ordered_cluster_nodes() == ['node3', 'node2', 'node1'])
+        statistics = job_manager.host_statistics()
+        nt.assert_true(statistics['node1']['attempts'] == 3)
+        nt.assert_true(statistics['node1']['granted'] == 0)
+        nt.assert_true(statistics['node3']['granted'] == 3)
+
+    def test_race_first_grant_wins(self):
+        log.debug(1, 'test_race_first_grant_wins')
+        node2_granted = threading.Event()
+        grants = {'node1': None, 'node2': '102', 'node3': '103'}
+
+        def allocations(cluster_node, command_line):
+            if cluster_node == 'node3':
+                # Granted, but only once node2 has won the race
+                node2_granted.wait(5)
+            elif cluster_node == 'node2':
+                node2_granted.set()
+            return grants[cluster_node], 'salloc: Granted job allocation'
+
+        job_manager = self._job_manager(allocations)
+        session = Session.objects.get(id='race')
+        status = job_manager._race_allocation(
+            session, JobInformation(), ['node1', 'node2', 'node3'])
+        nt.assert_true(status[0] == 200)
+        session = Session.objects.get(id='race')
+        nt.assert_true(session.status == SESSION_STATUS_SCHEDULED)
+        nt.assert_true(session.cluster_node == 'node2')
+        nt.assert_true(session.job_id == '102')
+        # The allocation granted to the loser is cancelled
+        nt.assert_true(self._cancelled_event.wait(5))
+        nt.assert_true(self._cancelled == [('node3', 'scancel 103')])
+
+    def test_race_failing_request(self):
+        log.debug(1, 'test_race_failing_request')
+
+        def allocations(cluster_node, command_line):
+            # Unexpected errors must not prevent the race from completing
+            raise IndexError('list index out of range')
+
+        job_manager = self._job_manager(allocations)
+        session = Session.objects.get(id='race')
+        status = job_manager._race_allocation(session, JobInformation(), ['node1', 'node2'])
+        nt.assert_true(status[0] == 400)
+        nt.assert_true('list index out of range' in status[1])
+        nt.assert_true(Session.objects.get(id='race').status == SESSION_STATUS_FAILED)
+
+    def test_race_timeout(self):
+        log.debug(1, 'test_race_timeout')
+        release = threading.Event()
+
+        def allocations(cluster_node, command_line):
+            release.wait(5)
+            return '101', 'salloc: Granted job allocation'
+
+        settings.SLURM_ALLOCATION_RACE_TIMEOUT = 0.2
+        job_manager = self._job_manager(allocations)
+        session = Session.objects.get(id='race')
+        status = job_manager._race_allocation(session, JobInformation(), ['node1', 'node2'])
+        nt.assert_true(status[0] == 400)
+        # Allocations granted after the timeout are cancelled
+        release.set()
+        nt.assert_true(self._cancelled_event.wait(5))
+        nt.assert_true(('node1', 'scancel 101') in self._cancelled or
+                       ('node2', 'scancel 101') in self._cancelled)
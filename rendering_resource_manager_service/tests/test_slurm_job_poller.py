@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+from django.test import TestCase
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+from rendering_resource_manager_service.session.management.slurm_job_poller import \
+    SlurmJobPoller, JobState
+
+
+class TestSlurmJobPoller(TestCase):
+    def test_parse_squeue_output(self):
+        log.debug(1, 'test_parse_squeue_output')
+        output = '1234,RUNNING,bbpviz001,1:58:12\n' \
+                 '1235,PENDING,n/a,2:00:00\n' \
+                 'garbage\n'
+        job_states = SlurmJobPoller.parse_squeue_output(output)
+        nt.assert_true(len(job_states) == 2)
+        nt.assert_true(job_states['1234'].state == 'RUNNING')
+        nt.assert_true(job_states['1234'].batch_host == 'bbpviz001')
+        nt.assert_true(job_states['1234'].time_left == '1:58:12')
+        nt.assert_true(job_states['1235'].state == 'PENDING')
+        nt.assert_true(job_states['1235'].batch_host == '')
+
+    def test_job_state_staleness(self):
+        log.debug(1, 'test_job_state_staleness')
+        poller = SlurmJobPoller()
+        nt.assert_true(poller.job_state('42') is None)
+        job_state = JobState('42', 'RUNNING', 'bbpviz001', '1:00:00')
+        poller._job_states.set('42', job_state)
+        nt.assert_true(poller.job_state(42) == job_state)
+        job_state.timestamp = 0
+        nt.assert_true(poller.job_state('42') is None)
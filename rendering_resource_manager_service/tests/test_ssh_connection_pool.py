@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from django.test import TestCase
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+import rendering_resource_manager_service.session.management.session_manager_settings as settings
+from rendering_resource_manager_service.session.management.ssh_connection_pool import \
+    SshConnectionPool
+
+
+class FakeSshConnectionPool(SshConnectionPool):
+    """
+    Connection pool recording the control commands instead of running ssh
+    """
+
+    def __init__(self, control_status=0):
+        SshConnectionPool.__init__(self)
+        self.controls = []
+        self.control_status = control_status
+
+    def _control(self, cluster_node, operation):
+        self.controls.append((cluster_node, operation))
+        return self.control_status
+
+
+class TestSshConnectionPool(TestCase):
+    def test_channel_limit(self):
+        log.debug(1, 'test_channel_limit')
+        pool = FakeSshConnectionPool()
+        max_channels = settings.SLURM_SSH_MAX_CHANNELS
+        settings.SLURM_SSH_MAX_CHANNELS = 2
+        mutex = threading.Lock()
+        release = threading.Event()
+        active = [0, 0]
+
+        def command():
+            with pool.channel('node'):
+                with mutex:
+                    active[0] += 1
+                    active[1] = max(active[1], active[0])
+                release.wait(5)
+                with mutex:
+                    active[0] -= 1
+
+        try:
+            threads = [threading.Thread(target=command) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            while pool.statistics()['contentions'] < 2:
+                time.sleep(0.01)
+            release.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            settings.SLURM_SSH_MAX_CHANNELS = max_channels
+        nt.assert_true(active[1] == 2)
+        nt.assert_true(pool.statistics() == {'nodes': 1, 'contentions': 2})
+
+    def test_check(self):
+        log.debug(1, 'test_check')
+        control_dir = settings.SLURM_SSH_CONTROL_DIR
+        settings.SLURM_SSH_CONTROL_DIR = tempfile.mkdtemp()
+        try:
+            pool = FakeSshConnectionPool()
+            # The first command establishes the master, which is not checked
+            with pool.channel('node'):
+                pass
+            with pool.channel('node'):
+                pass
+            nt.assert_true(pool.controls == [])
+            pool._last_checked['node'] -= settings.SLURM_SSH_CHECK_INTERVAL + 1
+            with pool.channel('node'):
+                pass
+            nt.assert_true(pool.controls == [('node', 'check')])
+            # A stale master that cannot be stopped has its socket removed
+            open(pool.control_path('node'), 'w').close()
+            pool.control_status = 255
+            pool._last_checked['node'] -= settings.SLURM_SSH_CHECK_INTERVAL + 1
+            with pool.channel('node'):
+                pass
+            nt.assert_true(pool.controls[1:] == [('node', 'check'), ('node', 'stop')])
+            nt.assert_false(os.path.exists(pool.control_path('node')))
+        finally:
+            shutil.rmtree(settings.SLURM_SSH_CONTROL_DIR)
+            settings.SLURM_SSH_CONTROL_DIR = control_dir
+
+    def test_evict_idle(self):
+        log.debug(1, 'test_evict_idle')
+        pool = FakeSshConnectionPool()
+        with pool.channel('idle'):
+            pass
+        with pool.channel('busy'):
+            pass
+        pool._last_used['idle'] -= settings.SLURM_SSH_IDLE_TIMEOUT + 1
+        pool.evict_idle()
+        nt.assert_true(pool.controls == [('idle', 'stop')])
+        nt.assert_true(pool.statistics()['nodes'] == 1)
+        pool.close()
+        nt.assert_true(pool.controls[1:] == [('busy', 'stop')])
+        nt.assert_true(pool.statistics()['nodes'] == 0)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+from django.test import TestCase
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+from rendering_resource_manager_service.config.models import SystemGlobalSettings
+from rendering_resource_manager_service.config.management.system_global_settings_manager \
+    import SystemGlobalSettingsManager, SYSTEM_GLOBAL_SETTINGS_ID, global_settings_cache
+
+
+class TestSystemGlobalSettingsManager(TestCase):
+    def setUp(self):
+        log.debug(1, 'setUp')
+        # Settings cached by previous tests do not survive their database rollback
+        global_settings_cache.invalidate()
+
+    def tearDown(self):
+        log.debug(1, 'tearDown')
+        global_settings_cache.invalidate()
+
+    def test_get_defaults(self):
+        log.debug(1, 'test_get_defaults')
+        sgs = SystemGlobalSettingsManager.get()
+        nt.assert_true(sgs.id == SYSTEM_GLOBAL_SETTINGS_ID == 0)
+        nt.assert_true(sgs.session_creation)
+        nt.assert_true(sgs.session_keep_alive_timeout == 300)
+        # The settings row is created on first access
+        nt.assert_true(SystemGlobalSettings.objects.filter(id=0).count() == 1)
+
+    def test_get_is_cached(self):
+        log.debug(1, 'test_get_is_cached')
+        # Creating the settings row invalidates the cache, the first read is not cached
+        SystemGlobalSettingsManager.get()
+        SystemGlobalSettingsManager.get()
+        statistics = SystemGlobalSettingsManager.cache_statistics()
+        SystemGlobalSettingsManager.get()
+        nt.assert_true(
+            SystemGlobalSettingsManager.cache_statistics()['hits'] == statistics['hits'] + 1)
+        nt.assert_true(
+            SystemGlobalSettingsManager.cache_statistics()['misses'] == statistics['misses'])
+
+    def test_set_session_creation(self):
+        log.debug(1, 'test_set_session_creation')
+        nt.assert_true(SystemGlobalSettingsManager.get().session_creation)
+        nt.assert_true(SystemGlobalSettingsManager.set_session_creation(False))
+        nt.assert_false(SystemGlobalSettingsManager.get().session_creation)
+        nt.assert_false(SystemGlobalSettings.objects.get(id=0).session_creation)
+        # Setting the current value is not a modification
+        nt.assert_false(SystemGlobalSettingsManager.set_session_creation(False))
+        nt.assert_true(SystemGlobalSettingsManager.set_session_creation(True))
+        nt.assert_true(SystemGlobalSettingsManager.get().session_creation)
+
+    def test_external_modification(self):
+        log.debug(1, 'test_external_modification')
+        SystemGlobalSettingsManager.get()
+        sgs = SystemGlobalSettings.objects.get(id=0)
+        sgs.session_keep_alive_timeout = 60
+        sgs.save()
+        nt.assert_true(SystemGlobalSettingsManager.get().session_keep_alive_timeout == 60)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+import threading
+from django.test import TestCase
+from nose import tools as nt
+import rendering_resource_manager_service.utils.custom_logging as log
+from rendering_resource_manager_service.utils.worker_pool import WorkerPool
+
+
+class TestWorkerPool(TestCase):
+    def test_submit(self):
+        log.debug(1, 'test_submit')
+        pool = WorkerPool('Test', 2, 10)
+        done = threading.Event()
+        results = []
+
+        def task(value):
+            results.append(value)
+            if len(results) == 3:
+                done.set()
+
+        for value in range(3):
+            nt.assert_true(pool.submit(task, value))
+        done.wait(5)
+        nt.assert_true(sorted(results) == [0, 1, 2])
+
+    def test_backpressure(self):
+        log.debug(1, 'test_backpressure')
+        pool = WorkerPool('Test', 1, 1)
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocking_task():
+            started.set()
+            release.wait(5)
+
+        nt.assert_true(pool.submit(blocking_task))
+        started.wait(5)
+        # The worker is busy: one task can be queued, the next one is rejected
+        nt.assert_true(pool.submit(blocking_task))
+        nt.assert_true(pool.queue_depth() == 1)
+        nt.assert_false(pool.submit(blocking_task))
+        nt.assert_true(pool.statistics()['rejected'] == 1)
+        release.set()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+"""
+This module provides the cache tier of the service:
+- LocalCache: bounded in-process LRU cache with per-entry expiry, for per-process hot data
+- ReadThroughCache: local cache of rarely modified database records. Invalidations are
+  published in the shared cache so that all the processes serving the application drop
+  their copies
+
+The shared cache is the Django cache named by SHARED_CACHE_ALIAS. Tests can replace it with a
+local stand-in using set_shared_cache
+"""
+
+import collections
+import time
+from threading import Lock
+
+from django.core.cache import get_cache
+import rendering_resource_manager_service.service.settings as global_settings
+import rendering_resource_manager_service.utils.custom_logging as log
+
+_shared_cache = None
+
+
+def shared_cache():
+    """
+    :return: The cache shared by all the processes of the application
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = get_cache(global_settings.SHARED_CACHE_ALIAS)
+    return _shared_cache
+
+
+def set_shared_cache(cache):
+    """
+    Replaces the shared cache, for instance by a local memory cache in tests
+    :param cache: Django cache backend instance, None to go back to the configured cache
+    """
+    global _shared_cache
+    _shared_cache = cache
+
+
+class LocalCache(object):
+    """
+    Thread-safe in-process cache. Entries expire after a timeout, and the least recently used
+    entries are evicted when the cache is full
+    """
+
+    def __init__(self, namespace, timeout, max_entries=None):
+        """
+        Setup the cache
+        :param namespace: Name of the cache, used for logging
+        :param timeout: Default time to live of the entries (in seconds)
+        :param max_entries: Maximum number of entries. Defaults to LOCAL_CACHE_MAX_ENTRIES
+        """
+        self._namespace = namespace
+        self._timeout = timeout
+        self._max_entries = max_entries
+        if max_entries is None:
+            self._max_entries = global_settings.LOCAL_CACHE_MAX_ENTRIES
+        self._mutex = Lock()
+        self._entries = collections.OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key, default=None):
+        """
+        :param key: Key of the value
+        :param default: Value returned if the key is not cached or has expired
+        :return: The cached value, or the default value
+        """
+        entry = self.get_entry(key)
+        if entry is None:
+            return default
+        return entry[0]
+
+    def get_entry(self, key, max_age=None):
+        """
+        :param key: Key of the value
+        :param max_age: Maximum age of the value (in seconds). Older values are not returned
+                        but stay in the cache until they expire
+        :return: A tuple containing the cached value and its age (in seconds), or None if the
+                 key is not cached, has expired or is too old
+        """
+        now = time.time()
+        with self._mutex:
+            entry = self._entries.pop(key, None)
+            if entry is None or now >= entry[2]:
+                self._misses += 1
+                return None
+            if max_age is not None and now - entry[1] >= max_age:
+                self._entries[key] = entry
+                self._misses += 1
+                return None
+            # Re-inserting the entry marks it as the most recently used
+            self._entries[key] = entry
+            self._hits += 1
+            return entry[0], now - entry[1]
+
+    def set(self, key, value, timeout=None):
+        """
+        Stores a value, evicting the least recently used entry if the cache is full
+        :param key: Key of the value
+        :param value: Value to store
+        :param timeout: Time to live of the entry (in seconds). Defaults to the cache timeout
+        """
+        if timeout is None:
+            timeout = self._timeout
+        now = time.time()
+        with self._mutex:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, now, now + timeout)
+            while len(self._entries) > self._max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._evictions += 1
+                log.debug(2, self._namespace + ' cache is full, evicting ' + str(evicted_key))
+
+    def delete(self, key):
+        """
+        Removes a key from the cache
+        :param key: Key to remove
+        """
+        with self._mutex:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Removes all entries
+        """
+        with self._mutex:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._mutex:
+            return len(self._entries)
+
+    def statistics(self):
+        """
+        Returns the cache usage counters
+        :return: A dictionary containing the number of hits, misses, evictions, cached entries
+                 and the hit ratio
+        """
+        with self._mutex:
+            lookups = self._hits + self._misses
+            hit_ratio = 0.0
+            if lookups != 0:
+                hit_ratio = float(self._hits) / lookups
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'entries': len(self._entries),
+                'hit_ratio': hit_ratio
+            }
+
+
+class ReadThroughCache(object):
+    """
+    Local cache populated on demand by a loader function. Each invalidation increments a
+    generation counter stored in the shared cache; when another process notices that the
+    generation has changed, it clears its local entries
+    """
+
+    def __init__(self, namespace, loader, timeout=None, max_entries=None):
+        """
+        Setup the cache
+        :param namespace: Name of the cache, used to build the shared generation key
+        :param loader: Function returning the value of a key on cache miss. Exceptions raised
+                       by the loader are propagated and nothing is cached
+        :param timeout: Maximum age of an entry (in seconds). Defaults to LOCAL_CACHE_TIMEOUT
+        :param max_entries: Maximum number of entries. Defaults to LOCAL_CACHE_MAX_ENTRIES
+        """
+        self._namespace = namespace
+        self._loader = loader
+        if timeout is None:
+            timeout = global_settings.LOCAL_CACHE_TIMEOUT
+        self._entries = LocalCache(namespace, timeout, max_entries)
+        self._generation_key = namespace + ':generation'
+        self._mutex = Lock()
+        self._generation = None
+        self._last_generation_check = 0
+        self._invalidations = 0
+
+    def get(self, key):
+        """
+        Returns the value associated to the given key, loading it on cache miss
+        :param key: Key of the value
+        :return: The cached or loaded value
+        """
+        self._synchronize()
+        entry = self._entries.get_entry(key)
+        if entry is not None:
+            return entry[0]
+        with self._mutex:
+            generation = self._generation
+        value = self._loader(key)
+        with self._mutex:
+            # Do not store a value loaded before a concurrent invalidation
+            if generation == self._generation:
+                self._entries.set(key, value)
+        return value
+
+    def invalidate(self, key=None):
+        """
+        Removes the given key, or all keys, from the cache of every process
+        :param key: Key to remove. If None, the whole cache is cleared
+        """
+        with self._mutex:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.delete(key)
+            self._invalidations += 1
+        try:
+            shared_cache().add(self._generation_key, 0, None)
+            generation = shared_cache().incr(self._generation_key)
+        except ValueError as e:
+            log.error(str(e))
+            return
+        with self._mutex:
+            self._generation = generation
+            self._last_generation_check = time.time()
+
+    def statistics(self):
+        """
+        Returns the cache usage counters
+        :return: A dictionary containing the number of hits, misses, evictions,
+                 invalidations, cached entries and the hit ratio
+        """
+        statistics = self._entries.statistics()
+        with self._mutex:
+            statistics['invalidations'] = self._invalidations
+        return statistics
+
+    def _synchronize(self):
+        """
+        Clears the local entries if another process has invalidated the cache. The shared
+        generation is read at most every LOCAL_CACHE_GENERATION_CHECK_INTERVAL seconds
+        """
+        now = time.time()
+        with self._mutex:
+            if now - self._last_generation_check < \
+                    global_settings.LOCAL_CACHE_GENERATION_CHECK_INTERVAL:
+                return
+            self._last_generation_check = now
+        generation = shared_cache().get(self._generation_key, 0)
+        with self._mutex:
+            if generation != self._generation:
+                if self._generation is not None:
+                    log.info(1, self._namespace + ' cache invalidated by another process')
+                self._entries.clear()
+                self._generation = generation
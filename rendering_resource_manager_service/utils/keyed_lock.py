@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+"""
+This module provides a set of locks indexed by key, for instance one lock per session
+"""
+
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+import rendering_resource_manager_service.utils.custom_logging as log
+
+
+class KeyedLock(object):
+    """
+    Provides one lock per key. Locks are created on demand and discarded once no thread
+    holds or waits for them anymore. Contention is measured so that its effect can be
+    monitored
+    """
+
+    def __init__(self, name):
+        """
+        :param name: Name of the lock set, used for logging
+        """
+        self._name = name
+        self._mutex = Lock()
+        self._locks = dict()
+        self._acquisitions = 0
+        self._contentions = 0
+        self._wait_time = 0.0
+
+    @contextmanager
+    def hold(self, key):
+        """
+        Holds the lock associated to the given key for the duration of the context
+        :param key: Key identifying the lock
+        """
+        with self._mutex:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = [Lock(), 0]
+                self._locks[key] = entry
+            entry[1] += 1
+        lock = entry[0]
+        contended = not lock.acquire(False)
+        wait_time = 0.0
+        if contended:
+            log.info(2, self._name + ' lock for ' + str(key) + ' is contended')
+            start = time.time()
+            lock.acquire()
+            wait_time = time.time() - start
+        with self._mutex:
+            self._acquisitions += 1
+            if contended:
+                self._contentions += 1
+                self._wait_time += wait_time
+        try:
+            yield
+        finally:
+            lock.release()
+            with self._mutex:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+    def statistics(self):
+        """
+        Returns the lock contention counters
+        :return: A dictionary containing the number of acquisitions, the number of contended
+                 acquisitions and the total time spent waiting for locks (in seconds)
+        """
+        with self._mutex:
+            return {
+                'acquisitions': self._acquisitions,
+                'contentions': self._contentions,
+                'wait_time': self._wait_time
+            }
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+"""
+This module provides request coalescing: concurrent calls made with the same key share the
+result of a single execution
+"""
+
+import threading
+
+import rendering_resource_manager_service.utils.custom_logging as log
+
+
+class _Call(object):
+    """
+    Call in progress, waited for by the threads that joined it
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Executes at most one call per key at a time. Threads asking for a key while a call is in
+    flight wait for it to complete and receive the same result, or the same exception
+    """
+
+    def __init__(self, name):
+        """
+        :param name: Name of the call group, used for logging
+        """
+        self._name = name
+        self._mutex = threading.Lock()
+        self._calls = dict()
+        self._executions = 0
+        self._shared = 0
+
+    def do(self, key, function, *args):
+        """
+        Executes the function, unless a call with the same key is already in flight, in which
+        case its result is awaited
+        :param key: Key identifying equivalent calls
+        :param function: Function to execute
+        :param args: Arguments passed to the function
+        :return: The result of the function
+        """
+        call, leader = self.begin(key)
+        if not leader:
+            return self.wait(call)[1]
+        try:
+            result = function(*args)
+        # pylint: disable=W0703
+        except Exception as e:
+            self.end(key, call, error=e)
+            raise
+        self.end(key, call, result)
+        return result
+
+    def begin(self, key):
+        """
+        Joins the call in flight for the key, or registers a new one. The caller leading the
+        new call must complete it with the end method, the others wait for it
+        :param key: Key identifying equivalent calls
+        :return: A tuple containing the call and True if the caller leads it
+        """
+        with self._mutex:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._executions += 1
+            else:
+                self._shared += 1
+        if not leader:
+            log.debug(2, self._name + ' call for ' + str(key) + ' already in flight')
+        return call, leader
+
+    def end(self, key, call, result=None, error=None):
+        """
+        Completes a call started with the begin method and wakes up the threads waiting for it
+        :param key: Key of the call
+        :param call: Call returned by the begin method
+        :param result: Result shared with the waiting threads
+        :param error: Exception raised in the waiting threads instead of returning a result
+        """
+        call.result = result
+        call.error = error
+        with self._mutex:
+            del self._calls[key]
+        call.done.set()
+
+    @staticmethod
+    def wait(call, timeout=None):
+        """
+        Waits for a call in flight to complete
+        :param call: Call returned by the begin method
+        :param timeout: Maximum waiting time (in seconds), None to wait until the call completes
+        :return: A tuple containing True and the result of the call, or False and None if the
+                 call did not complete within the timeout
+        """
+        if not call.done.wait(timeout):
+            return False, None
+        if call.error is not None:
+            raise call.error
+        return True, call.result
+
+    def statistics(self):
+        """
+        Returns the coalescing counters
+        :return: A dictionary containing the number of executed calls, the number of calls
+                 that shared the result of another one and the number of calls in flight
+        """
+        with self._mutex:
+            return {
+                'executions': self._executions,
+                'shared': self._shared,
+                'in_flight': len(self._calls)
+            }
@@ -44,3 +44,58 @@ def get_request_headers(request):
                     if k.startswith("HTTP_")])
     headers["Cookie"] = "; ".join([k + "=" + v for k, v in request.COOKIES.items()])
     return headers
+
+
+class RequestBodyStream(object):
+    """
+    File-like view of the body of an incoming HTTP request. It exposes the announced content
+    length so that the body can be streamed upstream with a Content-Length header instead of
+    being read into memory first
+    """
+
+    def __init__(self, request, length):
+        """
+        :param request: HTTP request to be read
+        :param length: Length of the request body, as announced by the client
+        """
+        self._request = request
+        self._length = length
+        self._position = 0
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def position(self):
+        """
+        :return: The number of bytes read so far
+        """
+        return self._position
+
+    def __iter__(self):
+        return iter(lambda: self.read(8192), '')
+
+    def read(self, size=-1):
+        """
+        Reads up to size bytes from the request body
+        :param size: Maximum number of bytes to read. Reads everything if negative
+        :return: The bytes that were read
+        """
+        data = self._request.read(size) if size >= 0 else self._request.read()
+        self._position += len(data)
+        return data
+
+
+def get_request_body_stream(request):
+    """
+    Returns the body of the given http request as a stream
+    :param request: HTTP request to be processed
+    :return: A RequestBodyStream, or None if the request has no body
+    """
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    if length == 0:
+        return None
+    return RequestBodyStream(request, length)
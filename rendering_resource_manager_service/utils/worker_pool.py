@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2014-2015, Human Brain Project
+#                          Cyrille Favreau <cyrille.favreau@epfl.ch>
+#
+# This file is part of RenderingResourceManager
+# <https://github.com/BlueBrain/RenderingResourceManager>
+#
+# This library is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License version 3.0 as published
+# by the Free Software Foundation.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# All rights reserved. Do not distribute without further notice.
+
+"""
+This module provides a bounded pool of worker threads processing tasks in the background
+"""
+
+import Queue
+import threading
+import traceback
+
+from django.db import close_old_connections
+import rendering_resource_manager_service.utils.custom_logging as log
+
+
+class WorkerPool(object):
+    """
+    Fixed number of worker threads consuming tasks from a bounded queue. When the queue is
+    full, new tasks are rejected so that callers can apply backpressure
+    """
+
+    def __init__(self, name, nb_workers, queue_size):
+        """
+        Setup the pool. Worker threads are started on first submission
+        :param name: Name of the pool, used to name the worker threads
+        :param nb_workers: Number of worker threads
+        :param queue_size: Maximum number of pending tasks
+        """
+        self._name = name
+        self._nb_workers = nb_workers
+        self._queue = Queue.Queue(queue_size)
+        self._mutex = threading.Lock()
+        self._workers = []
+        self._active = 0
+        self._submitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+
+    def submit(self, function, *args):
+        """
+        Queues a task for background execution
+        :param function: Function to execute
+        :param args: Arguments passed to the function
+        :return: True if the task was queued, False if the queue is full
+        """
+        self._start()
+        try:
+            self._queue.put_nowait((function, args))
+        except Queue.Full:
+            with self._mutex:
+                self._rejected += 1
+            log.error(self._name + ' queue is full, rejecting task')
+            return False
+        with self._mutex:
+            self._submitted += 1
+        log.info(1, self._name + ' queue depth is ' + str(self.queue_depth()))
+        return True
+
+    def queue_depth(self):
+        """
+        :return: The number of tasks waiting for a worker
+        """
+        return self._queue.qsize()
+
+    def statistics(self):
+        """
+        Returns the pool usage counters
+        :return: A dictionary containing the queue depth and task counters
+        """
+        with self._mutex:
+            return {
+                'queue_depth': self.queue_depth(),
+                'active': self._active,
+                'submitted': self._submitted,
+                'rejected': self._rejected,
+                'completed': self._completed,
+                'failed': self._failed
+            }
+
+    def _start(self):
+        """
+        Starts the worker threads if they are not running yet
+        """
+        with self._mutex:
+            if self._workers:
+                return
+            for i in range(self._nb_workers):
+                worker = threading.Thread(target=self._run, name=self._name + '-' + str(i))
+                worker.setDaemon(True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _run(self):
+        """
+        Worker loop
+        """
+        while True:
+            function, args = self._queue.get()
+            with self._mutex:
+                self._active += 1
+            try:
+                function(*args)
+                with self._mutex:
+                    self._completed += 1
+            # pylint: disable=W0703
+            except Exception as e:
+                log.error(str(traceback.format_exc(e)))
+                with self._mutex:
+                    self._failed += 1
+            finally:
+                with self._mutex:
+                    self._active -= 1
+                # Worker threads own their database connection
+                close_old_connections()
+                self._queue.task_done()
@@ -63,8 +63,10 @@ setup(name="rendering_resource_manager_service",
                 'rendering_resource_manager_service/config',
                 'rendering_resource_manager_service/config/management',
                 'rendering_resource_manager_service/service',
+                'rendering_resource_manager_service/service/sqlite_wal',
                 'rendering_resource_manager_service/session',
                 'rendering_resource_manager_service/session/management',
+                'rendering_resource_manager_service/session/management/commands',
                 'rendering_resource_manager_service/utils'],
       url='https://github.com/bluebrain/RenderingResourceManager.git',
       author='Cyrille Favreau',